@@ -0,0 +1,346 @@
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent import futures
+from datetime import datetime
+
+# Permitir importar los módulos de src/ (aplicación Flask, servidor gRPC)
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(DIRECTORIO, '..', 'src'))
+
+from seed import MARCAS, sembrar, argumentos_escala, escala_elegida
+
+# Suite de benchmarks de la API REST (cliente de pruebas de Flask) y del servicio gRPC (servidor
+# en el mismo proceso) sobre una base de datos SQLite temporal con datos sintéticos.
+# Para cada escenario informa throughput, latencias p50/p95/p99, consultas SQL y bytes por petición,
+# y guarda los resultados en JSON para compararlos entre ejecuciones:
+#
+#   python benchmarks/run.py --escala chica
+#   python benchmarks/run.py --escala chica --comparar benchmarks/results/<anterior>.json
+
+# Fracción de las iteraciones que se usa en los escenarios pesados (catálogo completo, exportaciones)
+FRACCION_PESADOS = 50
+
+class Escenario:
+    def __init__(self, nombre, ejecutar, pesado=False, estados=(200,)):
+        self.nombre = nombre
+        self.ejecutar = ejecutar
+        self.pesado = pesado
+        self.estados = estados
+
+# Estado compartido por los escenarios de un hilo
+class Contexto:
+    def __init__(self, app, stub, escala, semilla):
+        self.cliente = app.test_client()
+        self.stub = stub
+        self.escala = escala
+        self.rng = random.Random(semilla)
+        self.semilla = semilla
+        self.secuencia = 0
+        self.creados = []
+
+    def codigo(self):
+        return f"BEN-{self.rng.randint(1, self.escala['productos']):07d}"
+
+    def sucursal(self):
+        return self.rng.randint(1, self.escala["sucursales"])
+
+    # Código nuevo y único para los escenarios que crean productos
+    def codigo_nuevo(self):
+        self.secuencia += 1
+        return f"NEW-{self.semilla}-{self.secuencia}"
+
+# Cuenta las sentencias SQL ejecutadas por todos los engines de la aplicación
+class ContadorConsultas:
+    def __init__(self, engines):
+        self.total = 0
+        self._lock = threading.Lock()
+        from sqlalchemy import event
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", self._contar)
+
+    def _contar(self, *args):
+        with self._lock:
+            self.total += 1
+
+# Cada escenario devuelve (código de estado, bytes de la respuesta)
+def _http(respuesta):
+    cuerpo = respuesta.get_data()
+    respuesta.close()
+    return respuesta.status_code, len(cuerpo)
+
+def _grpc(mensaje):
+    return 200, mensaje.ByteSize()
+
+def _producto_nuevo(ctx):
+    codigo = ctx.codigo_nuevo()
+    return {
+        "Código del producto": codigo,
+        "Marca": "Bench",
+        "Código": f"C-{codigo}",
+        "Nombre": f"Producto {codigo}",
+        "Precio": [{"Fecha": "2024-01-01T00:00:00", "Valor": 1000}]
+    }
+
+def _agregar_producto(ctx):
+    producto = _producto_nuevo(ctx)
+    resultado = _http(ctx.cliente.post("/products/add", json=producto))
+    ctx.creados.append(producto["Código del producto"])
+    return resultado
+
+def _eliminar_producto(ctx):
+    codigo = ctx.creados.pop() if ctx.creados else ctx.codigo_nuevo()
+    return _http(ctx.cliente.delete(f"/products/delete/{codigo}"))
+
+def _importar_productos(ctx):
+    lineas = "".join(json.dumps(_producto_nuevo(ctx)) + "\n" for _ in range(100))
+    return _http(ctx.cliente.post("/products/bulk", data=lineas, content_type="application/x-ndjson"))
+
+def _agregar_stock(ctx):
+    items = [{"Código del producto": ctx.codigo(), "Cantidad": ctx.rng.randint(1, 20)} for _ in range(50)]
+    return _http(ctx.cliente.post(f"/branches/{ctx.sucursal()}/stock/add?solo_modificados=true", json=items))
+
+def _grpc_agregar_producto(ctx):
+    from protos import product_pb2
+    codigo = ctx.codigo_nuevo()
+    return _grpc(ctx.stub.AddProduct(product_pb2.Product(
+        product_code=codigo, code=f"C-{codigo}", name=f"Producto {codigo}", brand="Bench"
+    )))
+
+def _grpc_obtener_productos(ctx):
+    from protos import product_pb2
+    codigos = [ctx.codigo() for _ in range(20)]
+    return _grpc(ctx.stub.GetProducts(product_pb2.GetProductsRequest(product_codes=codigos)))
+
+def _grpc_listar_productos(ctx):
+    from protos import product_pb2
+    mensajes = list(ctx.stub.ListProducts(product_pb2.ListProductsRequest(after_product_code=ctx.codigo(), limit=100)))
+    return 200, sum(mensaje.ByteSize() for mensaje in mensajes)
+
+# Cabeceras de las peticiones REST que piden respuestas protobuf length-delimited
+PROTOBUF = {"Accept": "application/x-protobuf"}
+
+ESCENARIOS = [
+    Escenario("GET /products/all?limit=100", lambda ctx: _http(ctx.cliente.get(f"/products/all?limit=100&cursor={ctx.codigo()}"))),
+    Escenario("GET /products/all", lambda ctx: _http(ctx.cliente.get("/products/all")), pesado=True),
+    Escenario("GET /products/all (protobuf)", lambda ctx: _http(ctx.cliente.get("/products/all", headers=PROTOBUF)), pesado=True),
+    Escenario("GET /products/all?precio=actual", lambda ctx: _http(ctx.cliente.get("/products/all?precio=actual")), pesado=True),
+    Escenario("GET /products/all?fields=nombre,precio&precio=actual", lambda ctx: _http(ctx.cliente.get(
+        "/products/all?fields=nombre,precio&precio=actual"
+    )), pesado=True),
+    Escenario("GET /products/changes?since=<cursor>&limit=100", lambda ctx: _http(ctx.cliente.get(
+        f"/products/changes?since={ctx.rng.randint(0, ctx.escala['productos'])}&limit=100"
+    ))),
+    Escenario("GET /products/product/<codigo>", lambda ctx: _http(ctx.cliente.get(f"/products/product/{ctx.codigo()}"))),
+    Escenario("GET /products/product/<codigo>?precio=actual", lambda ctx: _http(ctx.cliente.get(
+        f"/products/product/{ctx.codigo()}?precio=actual"
+    ))),
+    Escenario("POST /products/batch (40 códigos)", lambda ctx: _http(ctx.cliente.post(
+        "/products/batch", json=[ctx.codigo() for _ in range(40)]
+    ))),
+    Escenario("GET /products/search?q=<marca> <número>&precio&stock", lambda ctx: _http(ctx.cliente.get(
+        f"/products/search?q={ctx.rng.choice(MARCAS)[:4]}+{ctx.rng.randint(1, 999)}&precio=true&stock=true"
+    ))),
+    Escenario("GET /products/product/<codigo>/precios", lambda ctx: _http(ctx.cliente.get(f"/products/product/{ctx.codigo()}/precios"))),
+    Escenario("GET /products/product/<codigo>/precio", lambda ctx: _http(ctx.cliente.get(f"/products/product/{ctx.codigo()}/precio"))),
+    Escenario("GET /products/precios/resumen?agrupar=marca", lambda ctx: _http(ctx.cliente.get("/products/precios/resumen?agrupar=marca")), pesado=True),
+    Escenario("GET /branches/all", lambda ctx: _http(ctx.cliente.get("/branches/all"))),
+    Escenario("GET /branches/<id>/stock/all", lambda ctx: _http(ctx.cliente.get(f"/branches/{ctx.sucursal()}/stock/all")), pesado=True),
+    Escenario("GET /branches/<id>/stock/all (protobuf)", lambda ctx: _http(ctx.cliente.get(
+        f"/branches/{ctx.sucursal()}/stock/all", headers=PROTOBUF
+    )), pesado=True),
+    Escenario("GET /branches/<id>/stock/all?precio=actual", lambda ctx: _http(ctx.cliente.get(
+        f"/branches/{ctx.sucursal()}/stock/all?precio=actual"
+    )), pesado=True),
+    Escenario("GET /branches/<id>/stock/all?codigos=(10)", lambda ctx: _http(ctx.cliente.get(
+        f"/branches/{ctx.sucursal()}/stock/all?codigos={','.join(ctx.codigo() for _ in range(10))}"
+    ))),
+    Escenario("POST /branches/stock/availability (carrito de 10)", lambda ctx: _http(ctx.cliente.post(
+        "/branches/stock/availability",
+        json=[{"Código del producto": ctx.codigo(), "Cantidad": ctx.rng.randint(1, 5)} for _ in range(10)]
+    ))),
+    Escenario("POST /branches/<id>/stock/add (50 items)", _agregar_stock),
+    Escenario("POST /branches/<id>/stock/sell (5 items)", lambda ctx: _http(ctx.cliente.post(
+        f"/branches/{ctx.sucursal()}/stock/sell",
+        json=[{"Código del producto": ctx.codigo(), "Cantidad": 1} for _ in range(5)]
+    )), estados=(200, 409)),
+    Escenario("GET /branches/<id>/stock/changes?since=0&limit=100", lambda ctx: _http(ctx.cliente.get(
+        f"/branches/{ctx.sucursal()}/stock/changes?since=0&limit=100"
+    ))),
+    Escenario("POST /products/add", _agregar_producto, estados=(201,)),
+    Escenario("PUT /products/update/<codigo>", lambda ctx: _http(ctx.cliente.put(
+        f"/products/update/{ctx.codigo()}",
+        json={"Precio": [{"Fecha": datetime.now().isoformat(), "Valor": ctx.rng.randint(1000, 90000)}]}
+    ))),
+    Escenario("DELETE /products/delete/<codigo>", _eliminar_producto),
+    Escenario("POST /products/bulk (100 filas)", _importar_productos),
+    Escenario("GET /products/export", lambda ctx: _http(ctx.cliente.get("/products/export")), pesado=True),
+    Escenario("GET /branches/<id>/stock/export", lambda ctx: _http(ctx.cliente.get(f"/branches/{ctx.sucursal()}/stock/export")), pesado=True),
+    Escenario("gRPC AddProduct", _grpc_agregar_producto),
+    Escenario("gRPC GetProducts (20 códigos)", _grpc_obtener_productos),
+    Escenario("gRPC ListProducts (100)", _grpc_listar_productos),
+]
+
+def percentil(valores_ordenados, porcentaje):
+    if not valores_ordenados:
+        return 0.0
+    indice = max(0, min(len(valores_ordenados) - 1, round(porcentaje / 100 * len(valores_ordenados)) - 1))
+    return valores_ordenados[indice]
+
+# Ejecutar un escenario `iteraciones` veces repartidas entre `contextos` (un hilo por contexto)
+def medir(escenario, contextos, iteraciones, calentamiento, contador):
+    for _ in range(calentamiento):
+        escenario.ejecutar(contextos[0])
+
+    latencias = []
+    errores = {}
+    total_bytes = 0
+    lock = threading.Lock()
+    por_hilo = [iteraciones // len(contextos) + (1 if i < iteraciones % len(contextos) else 0) for i in range(len(contextos))]
+
+    def trabajar(ctx, cantidad):
+        nonlocal total_bytes
+        for _ in range(cantidad):
+            inicio = time.perf_counter()
+            estado, tamano = escenario.ejecutar(ctx)
+            duracion = time.perf_counter() - inicio
+            with lock:
+                latencias.append(duracion)
+                total_bytes += tamano
+                if estado not in escenario.estados:
+                    errores[str(estado)] = errores.get(str(estado), 0) + 1
+
+    consultas_antes = contador.total
+    inicio = time.perf_counter()
+    with futures.ThreadPoolExecutor(max_workers=len(contextos)) as ejecutor:
+        list(ejecutor.map(trabajar, contextos, por_hilo))
+    total = time.perf_counter() - inicio
+    consultas = contador.total - consultas_antes
+
+    latencias.sort()
+    return {
+        "peticiones": len(latencias),
+        "errores": sum(errores.values()),
+        "errores_por_estado": errores,
+        "peticiones_por_segundo": round(len(latencias) / total, 2) if total else 0.0,
+        "media_ms": round(sum(latencias) / len(latencias) * 1000, 3) if latencias else 0.0,
+        "p50_ms": round(percentil(latencias, 50) * 1000, 3),
+        "p95_ms": round(percentil(latencias, 95) * 1000, 3),
+        "p99_ms": round(percentil(latencias, 99) * 1000, 3),
+        "consultas_por_peticion": round(consultas / len(latencias), 2) if latencias else 0.0,
+        "bytes_por_peticion": round(total_bytes / len(latencias)) if latencias else 0,
+    }
+
+# Iniciar la aplicación Flask y un servidor gRPC en el mismo proceso sobre la base de datos indicada
+def iniciar(ruta_db):
+    import grpc
+    import grpc_server
+    from app import create_app, preparar_base_datos
+    from models import db
+    from protos import product_pb2_grpc
+    from services.grpc_metrics import InterceptorMetricas
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{ruta_db}"})
+    preparar_base_datos(app)
+
+    # Mismo servidor que grpc_server.serve(), incluido el interceptor de métricas, sobre la misma aplicación
+    servidor = grpc.server(futures.ThreadPoolExecutor(max_workers=10), interceptors=[InterceptorMetricas()])
+    product_pb2_grpc.add_ProductServiceServicer_to_server(grpc_server.ProductService(app), servidor)
+    puerto = servidor.add_insecure_port("127.0.0.1:0")
+    servidor.start()
+    stub = product_pb2_grpc.ProductServiceStub(grpc.insecure_channel(f"127.0.0.1:{puerto}"))
+
+    with app.app_context():
+        contador = ContadorConsultas(db.engines.values())
+    return app, servidor, stub, contador
+
+def commit_actual():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=DIRECTORIO, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def imprimir(resultados, anteriores=None):
+    columnas = ["peticiones_por_segundo", "p50_ms", "p95_ms", "p99_ms", "consultas_por_peticion", "bytes_por_peticion"]
+    titulos = ["req/s", "p50 ms", "p95 ms", "p99 ms", "SQL/req", "bytes/req"]
+    ancho = max(len(nombre) for nombre in resultados) + 2
+    print("".join(["Escenario".ljust(ancho)] + [titulo.rjust(12) for titulo in titulos] + ["  errores"]))
+    for nombre, datos in resultados.items():
+        fila = [nombre.ljust(ancho)] + [f"{datos[columna]:>12}" for columna in columnas] + [f"{datos['errores']:>9}"]
+        print("".join(fila))
+        previo = (anteriores or {}).get(nombre)
+        if previo:
+            cambios = []
+            for columna in columnas:
+                if previo.get(columna):
+                    cambios.append(f"{(datos[columna] - previo[columna]) / previo[columna] * 100:+.1f}%".rjust(12))
+                else:
+                    cambios.append("".rjust(12))
+            print("".join(["  vs. anterior".ljust(ancho)] + cambios))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de la API REST y del servicio gRPC")
+    argumentos_escala(parser)
+    parser.add_argument("--base-datos", help="reutilizar (o crear si no existe) esta base de datos sembrada")
+    parser.add_argument("--iteraciones", type=int, default=200, help="peticiones por escenario")
+    parser.add_argument("--calentamiento", type=int, default=5, help="peticiones previas no medidas")
+    parser.add_argument("--hilos", type=int, default=1, help="clientes concurrentes")
+    parser.add_argument("--semilla", type=int, default=42, help="semilla de los datos aleatorios de las peticiones")
+    parser.add_argument("--escenarios", help="ejecutar sólo los escenarios cuyo nombre contenga este texto")
+    parser.add_argument("--salida", default=os.path.join(DIRECTORIO, "results"), help="directorio de resultados")
+    parser.add_argument("--comparar", help="archivo de resultados anterior para comparar")
+    args = parser.parse_args()
+
+    escala = escala_elegida(args)
+    ruta_db = args.base_datos or os.path.join(tempfile.mkdtemp(prefix="ferremas-bench-"), "bench.db")
+    if not os.path.exists(ruta_db):
+        sembrar(ruta_db, **escala)
+
+    app, servidor, stub, contador = iniciar(ruta_db)
+    contextos = [Contexto(app, stub, escala, args.semilla + i) for i in range(max(args.hilos, 1))]
+
+    resultados = {}
+    try:
+        for escenario in ESCENARIOS:
+            if args.escenarios and args.escenarios.lower() not in escenario.nombre.lower():
+                continue
+            iteraciones = max(3, args.iteraciones // FRACCION_PESADOS) if escenario.pesado else args.iteraciones
+            calentamiento = min(args.calentamiento, 1) if escenario.pesado else args.calentamiento
+            print(f"[bench] {escenario.nombre} ({iteraciones} peticiones)", flush=True)
+            resultados[escenario.nombre] = medir(escenario, contextos, iteraciones, calentamiento, contador)
+    finally:
+        servidor.stop(None)
+
+    anteriores = None
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as archivo:
+            anteriores = json.load(archivo)["escenarios"]
+    imprimir(resultados, anteriores)
+
+    os.makedirs(args.salida, exist_ok=True)
+    fecha = datetime.now()
+    ruta_resultados = os.path.join(args.salida, f"bench-{fecha:%Y%m%d-%H%M%S}.json")
+    with open(ruta_resultados, "w", encoding="utf-8") as archivo:
+        json.dump({
+            "fecha": fecha.isoformat(),
+            "commit": commit_actual(),
+            "python": platform.python_version(),
+            "escala": escala,
+            "iteraciones": args.iteraciones,
+            "hilos": args.hilos,
+            "semilla": args.semilla,
+            "escenarios": resultados
+        }, archivo, ensure_ascii=False, indent=2)
+    print(f"Resultados guardados en {ruta_resultados}")
+
+if __name__ == "__main__":
+    main()
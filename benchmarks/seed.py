@@ -0,0 +1,111 @@
+import argparse
+import os
+import sys
+import time
+
+# Permitir importar los módulos de src/ (migraciones, configuración)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from sqlalchemy import create_engine
+from migrations import aplicar_migraciones
+
+# Escalas predefinidas de datos sintéticos
+ESCALAS = {
+    "chica": {"productos": 2000, "sucursales": 20, "stock": 20000, "precios": 20000},
+    "mediana": {"productos": 20000, "sucursales": 100, "stock": 500000, "precios": 500000},
+    "grande": {"productos": 100000, "sucursales": 500, "stock": 5000000, "precios": 5000000},
+}
+
+# Marcas usadas para repartir los productos (permite probar filtros y agregados por marca)
+MARCAS = ["Stanley", "Stihl", "Truper", "Bosch", "Makita", "DeWalt", "Bahco", "Irwin"]
+
+# Crear una base de datos SQLite con datos sintéticos y deterministas (la misma escala genera
+# siempre los mismos datos). Las filas se generan dentro de SQLite con CTE recursivas,
+# lo que permite llegar a millones de filas en poco tiempo.
+def sembrar(ruta, productos, sucursales, stock, precios, verbose=True):
+    if stock > productos * sucursales:
+        raise ValueError("stock no puede superar productos * sucursales (una fila por producto y sucursal)")
+
+    if os.path.exists(ruta):
+        os.remove(ruta)
+
+    engine = create_engine(f"sqlite:///{ruta}")
+    aplicar_migraciones(engine)
+    inicio = time.perf_counter()
+
+    with engine.begin() as conexion:
+        conexion.exec_driver_sql("PRAGMA journal_mode = WAL")
+        marcas = ", ".join(f"({indice}, '{marca}')" for indice, marca in enumerate(MARCAS))
+        conexion.exec_driver_sql("CREATE TEMP TABLE marcas (id INTEGER PRIMARY KEY, nombre TEXT)")
+        conexion.exec_driver_sql(f"INSERT INTO marcas (id, nombre) VALUES {marcas}")
+
+        conexion.exec_driver_sql(f"""
+            WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < {productos})
+            INSERT INTO productos (id, codigo_producto, marca, codigo, nombre)
+            SELECT i,
+                   printf('BEN-%07d', i),
+                   (SELECT nombre FROM marcas WHERE id = i % {len(MARCAS)}),
+                   printf('COD-%07d', i),
+                   printf('Producto de prueba %d', i)
+            FROM n
+        """)
+        _log(verbose, f"{productos} productos")
+
+        conexion.exec_driver_sql(f"""
+            WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < {sucursales})
+            INSERT INTO sucursales (id, nombre, direccion)
+            SELECT i, printf('Sucursal %d', i), printf('Calle %d #%d', i, i * 10) FROM n
+        """)
+        _log(verbose, f"{sucursales} sucursales")
+
+        # Los precios se reparten entre los productos; cada vuelta sobre el catálogo es un día más
+        conexion.exec_driver_sql(f"""
+            WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i < {precios} - 1)
+            INSERT INTO precios (fecha, valor, producto_id)
+            SELECT strftime('%Y-%m-%d %H:%M:%S', '2020-01-01', printf('+%d days', i / {productos})) || '.000000',
+                   ((i * 7919) % 100000) + 990,
+                   (i % {productos}) + 1
+            FROM n
+        """)
+        _log(verbose, f"{precios} precios")
+
+        # Cada sucursal recibe un bloque de productos consecutivo (módulo el catálogo),
+        # desplazado según la sucursal, por lo que no se repite (producto, sucursal)
+        por_sucursal = -(-stock // sucursales)
+        conexion.exec_driver_sql(f"""
+            WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i < {stock} - 1)
+            INSERT INTO stock (producto_id, sucursal_id, cantidad)
+            SELECT ((i % {por_sucursal}) + (i / {por_sucursal}) * 7919) % {productos} + 1,
+                   (i / {por_sucursal}) + 1,
+                   (i * 31) % 200
+            FROM n
+        """)
+        _log(verbose, f"{stock} filas de stock")
+
+        conexion.exec_driver_sql("ANALYZE")
+
+    engine.dispose()
+    _log(verbose, f"Base de datos sembrada en {time.perf_counter() - inicio:.1f} s: {ruta}")
+
+def _log(verbose, mensaje):
+    if verbose:
+        print(f"[seed] {mensaje}", flush=True)
+
+def argumentos_escala(parser):
+    parser.add_argument("--escala", choices=ESCALAS, default="chica", help="escala predefinida de datos")
+    for nombre in ("productos", "sucursales", "stock", "precios"):
+        parser.add_argument(f"--{nombre}", type=int, help=f"cantidad de {nombre} (reemplaza la de la escala)")
+
+def escala_elegida(args):
+    escala = dict(ESCALAS[args.escala])
+    for nombre in escala:
+        if getattr(args, nombre) is not None:
+            escala[nombre] = getattr(args, nombre)
+    return escala
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Genera una base de datos SQLite con datos sintéticos")
+    parser.add_argument("ruta", help="archivo SQLite a crear (se reemplaza si existe)")
+    argumentos_escala(parser)
+    args = parser.parse_args()
+    sembrar(args.ruta, **escala_elegida(args))
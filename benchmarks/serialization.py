@@ -0,0 +1,125 @@
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(DIRECTORIO, '..', 'src'))
+
+from seed import sembrar, argumentos_escala, escala_elegida
+
+# Microbenchmark de la serialización del catálogo (/products/all) y del stock de una sucursal
+# (/branches/<id>/stock/all). Compara la forma anterior (objetos del ORM con selectinload, diccionarios
+# armados a mano y el codificador JSON por defecto de Flask) con la actual (filas de services/serializers.py
+# y orjson), midiendo por separado la construcción de los objetos (consulta incluida) y la codificación:
+#
+#   python benchmarks/serialization.py --escala mediana --repeticiones 20
+
+def _precios_orm(producto):
+    return [{"Fecha": p.fecha.isoformat(), "Valor": p.valor} for p in producto.precios]
+
+def catalogo_anterior(db):
+    from sqlalchemy.orm import selectinload
+    from models.product import Producto
+    productos = db.session.query(Producto).options(selectinload(Producto.precios)).order_by(Producto.codigo_producto)
+    return [{
+        "Código del producto": producto.codigo_producto,
+        "Marca": producto.marca,
+        "Código": producto.codigo,
+        "Nombre": producto.nombre,
+        "Precio": _precios_orm(producto)
+    } for producto in productos]
+
+def catalogo_actual(db):
+    from sqlalchemy import select
+    from models.product import Producto
+    from services.serializers import COLUMNAS_PRODUCTO, productos_con_precios, productos_json
+    consulta = select(*COLUMNAS_PRODUCTO).order_by(Producto.codigo_producto)
+    return list(productos_json(db.session.execute(productos_con_precios(consulta))))
+
+def stock_anterior(db, sucursal_id):
+    from sqlalchemy.orm import contains_eager
+    from models.product import Producto
+    from models.stock import Stock
+    stock = db.session.query(Stock).join(Stock.producto).options(
+        contains_eager(Stock.producto).selectinload(Producto.precios)
+    ).filter(Stock.sucursal_id == sucursal_id).order_by(Stock.id)
+    return [{
+        "producto": {
+            "Código del producto": fila.producto.codigo_producto,
+            "Nombre": fila.producto.nombre,
+            "Marca": fila.producto.marca,
+            "Precio": _precios_orm(fila.producto)
+        },
+        "stock": {"Cantidad": fila.cantidad}
+    } for fila in stock]
+
+def stock_actual(db, sucursal_id):
+    from sqlalchemy import select
+    from models.product import Producto
+    from models.stock import Stock
+    from services.serializers import COLUMNAS_STOCK, stock_con_precios, stock_json
+    consulta = select(*COLUMNAS_STOCK).join(Producto, Producto.id == Stock.producto_id).where(
+        Stock.sucursal_id == sucursal_id
+    )
+    return list(stock_json(db.session.execute(stock_con_precios(consulta, Stock.id))))
+
+# Mediana en milisegundos de `repeticiones` ejecuciones; cada una en una sesión nueva para no reutilizar
+# objetos del ORM ya cargados
+def cronometrar(db, funcion, repeticiones):
+    tiempos = []
+    resultado = None
+    for _ in range(repeticiones):
+        db.session.remove()
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return statistics.median(tiempos) * 1000, resultado
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmark de la serialización de productos y stock")
+    argumentos_escala(parser)
+    parser.add_argument("--base-datos", help="usar una base generada con seed.py en lugar de crear una temporal")
+    parser.add_argument("--repeticiones", type=int, default=10)
+    parser.add_argument("--sucursal", type=int, default=1, help="sucursal del escenario de stock")
+    args = parser.parse_args()
+
+    ruta = args.base_datos
+    if not ruta:
+        ruta = os.path.join(tempfile.mkdtemp(prefix="ferremas-serializacion-"), "bench.db")
+        sembrar(ruta, **escala_elegida(args), verbose=False)
+
+    from flask.json.provider import DefaultJSONProvider
+    from app import create_app
+    from models import db
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{ruta}"})
+
+    codificadores = {"anterior": DefaultJSONProvider(app), "actual": app.json}
+    escenarios = [
+        ("catalogo", {"anterior": lambda: catalogo_anterior(db), "actual": lambda: catalogo_actual(db)}),
+        ("stock", {
+            "anterior": lambda: stock_anterior(db, args.sucursal),
+            "actual": lambda: stock_actual(db, args.sucursal)
+        }),
+    ]
+
+    print(f"{'escenario':<10} {'version':<9} {'objetos':>8} {'construir ms':>13} {'codificar ms':>13} {'total ms':>9} {'bytes':>10}")
+    with app.app_context():
+        for nombre, versiones in escenarios:
+            cuerpos = {}
+            for version, construir in versiones.items():
+                codificador = codificadores[version]
+                t_construir, objetos = cronometrar(db, construir, args.repeticiones)
+                t_codificar, cuerpo = cronometrar(db, lambda: codificador.dumps(objetos), args.repeticiones)
+                cuerpos[version] = codificador.loads(cuerpo)
+                print(f"{nombre:<10} {version:<9} {len(objetos):>8} {t_construir:>13.2f} {t_codificar:>13.2f} "
+                      f"{t_construir + t_codificar:>9.2f} {len(cuerpo.encode('utf-8')):>10}")
+            if cuerpos["anterior"] != cuerpos["actual"]:
+                print(f"  {nombre}: las dos versiones producen contenidos distintos")
+                sys.exit(1)
+
+if __name__ == "__main__":
+    main()
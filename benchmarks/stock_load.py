@@ -0,0 +1,153 @@
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent import futures
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(DIRECTORIO, '..', 'src'))
+
+from seed import ESCALAS, sembrar
+from run import iniciar
+
+# Prueba de carga de las operaciones de stock concurrentes: ventas, transferencias y reposiciones
+# por REST y gRPC sobre unos pocos productos y sucursales, para que choquen entre sí. Al terminar
+# verifica que no se perdieron actualizaciones: el stock final de cada producto y sucursal debe ser
+# el inicial más las reposiciones, menos las ventas, más/menos las transferencias aceptadas,
+# y nunca negativo. Termina con código 1 si encuentra diferencias.
+#
+#   python benchmarks/stock_load.py --hilos 8 --operaciones 2000
+
+PRODUCTOS = 5
+SUCURSALES = 3
+STOCK_INICIAL = 100
+
+def _codigo(i):
+    return f"BEN-{i:07d}"
+
+# Dejar un stock inicial conocido para los productos y sucursales de la prueba
+def preparar_stock(ruta):
+    conexion = sqlite3.connect(ruta)
+    with conexion:
+        conexion.executemany(
+            "INSERT INTO stock (producto_id, sucursal_id, cantidad) VALUES (?, ?, ?) "
+            "ON CONFLICT (producto_id, sucursal_id) DO UPDATE SET cantidad = excluded.cantidad",
+            [(p, s, STOCK_INICIAL) for p in range(1, PRODUCTOS + 1) for s in range(1, SUCURSALES + 1)]
+        )
+    conexion.close()
+
+def stock_final(ruta):
+    conexion = sqlite3.connect(ruta)
+    filas = conexion.execute(
+        "SELECT p.codigo_producto, s.sucursal_id, s.cantidad FROM stock s JOIN productos p ON p.id = s.producto_id "
+        "WHERE s.producto_id <= ? AND s.sucursal_id <= ?", (PRODUCTOS, SUCURSALES)
+    ).fetchall()
+    conexion.close()
+    return {(codigo, sucursal): cantidad for codigo, sucursal, cantidad in filas}
+
+class Trabajador:
+    def __init__(self, app, stub, semilla):
+        self.cliente = app.test_client()
+        self.stub = stub
+        self.rng = random.Random(semilla)
+        # Cambios de stock confirmados por el servidor, por (código, sucursal)
+        self.cambios = Counter()
+        self.resultados = Counter()
+
+    def ejecutar(self, operaciones):
+        from protos import product_pb2
+        for _ in range(operaciones):
+            codigo = _codigo(self.rng.randint(1, PRODUCTOS))
+            origen, destino = self.rng.sample(range(1, SUCURSALES + 1), 2)
+            cantidad = self.rng.randint(1, 8)
+            operacion = self.rng.choice(["venta_rest", "venta_grpc", "transferencia_rest", "transferencia_grpc", "reposicion_rest"])
+            item = [{"Código del producto": codigo, "Cantidad": cantidad}]
+
+            if operacion == "venta_rest":
+                respuesta = self.cliente.post(f"/branches/{origen}/stock/sell", json=item)
+                aceptada, rechazada = respuesta.status_code == 200, respuesta.status_code == 409
+            elif operacion == "venta_grpc":
+                respuesta = self.stub.SellStock(product_pb2.SellStockRequest(
+                    branch_id=origen, items=[product_pb2.StockItem(product_code=codigo, quantity=cantidad)]
+                ))
+                aceptada, rechazada = respuesta.success, len(respuesta.insufficient) > 0
+            elif operacion == "transferencia_rest":
+                respuesta = self.cliente.post(f"/branches/{origen}/stock/transfer", json={
+                    "Sucursal destino": destino, "Productos": item
+                })
+                aceptada, rechazada = respuesta.status_code == 200, respuesta.status_code == 409
+            elif operacion == "transferencia_grpc":
+                respuesta = self.stub.TransferStock(product_pb2.TransferStockRequest(
+                    from_branch_id=origen, to_branch_id=destino,
+                    items=[product_pb2.StockItem(product_code=codigo, quantity=cantidad)]
+                ))
+                aceptada, rechazada = respuesta.success, len(respuesta.insufficient) > 0
+            else:
+                respuesta = self.cliente.post(f"/branches/{origen}/stock/add?solo_modificados=true", json=item)
+                aceptada, rechazada = respuesta.status_code == 200, False
+
+            if aceptada:
+                if operacion.startswith("reposicion"):
+                    self.cambios[(codigo, origen)] += cantidad
+                else:
+                    self.cambios[(codigo, origen)] -= cantidad
+                if operacion.startswith("transferencia"):
+                    self.cambios[(codigo, destino)] += cantidad
+            estado = "aceptada" if aceptada else "sin_stock" if rechazada else "error"
+            self.resultados[(operacion, estado)] += 1
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga de ventas y transferencias de stock concurrentes")
+    parser.add_argument("--hilos", type=int, default=8, help="clientes concurrentes")
+    parser.add_argument("--operaciones", type=int, default=2000, help="operaciones en total")
+    parser.add_argument("--semilla", type=int, default=42)
+    args = parser.parse_args()
+
+    ruta = os.path.join(tempfile.mkdtemp(prefix="ferremas-stock-"), "stock.db")
+    sembrar(ruta, **ESCALAS["chica"], verbose=False)
+    preparar_stock(ruta)
+    app, servidor, stub, _ = iniciar(ruta)
+
+    trabajadores = [Trabajador(app, stub, args.semilla + i) for i in range(args.hilos)]
+    por_hilo = args.operaciones // args.hilos
+    inicio = time.perf_counter()
+    try:
+        with futures.ThreadPoolExecutor(max_workers=args.hilos) as ejecutor:
+            list(ejecutor.map(lambda trabajador: trabajador.ejecutar(por_hilo), trabajadores))
+    finally:
+        servidor.stop(None)
+    duracion = time.perf_counter() - inicio
+
+    cambios = Counter()
+    resultados = Counter()
+    for trabajador in trabajadores:
+        cambios.update(trabajador.cambios)
+        resultados.update(trabajador.resultados)
+
+    print(f"{por_hilo * args.hilos} operaciones con {args.hilos} hilos en {duracion:.1f} s "
+          f"({por_hilo * args.hilos / duracion:.0f} op/s)")
+    for (operacion, estado), cantidad in sorted(resultados.items()):
+        print(f"  {operacion:<20} {estado:<10} {cantidad}")
+
+    final = stock_final(ruta)
+    diferencias = []
+    for clave, cantidad in sorted(final.items()):
+        esperado = STOCK_INICIAL + cambios[clave]
+        if cantidad != esperado or cantidad < 0:
+            diferencias.append((clave, esperado, cantidad))
+
+    errores = sum(cantidad for (_, estado), cantidad in resultados.items() if estado == "error")
+    if diferencias:
+        print("Actualizaciones perdidas o stock negativo:")
+        for (codigo, sucursal), esperado, cantidad in diferencias:
+            print(f"  {codigo} en sucursal {sucursal}: esperado {esperado}, encontrado {cantidad}")
+        sys.exit(1)
+    print(f"Sin actualizaciones perdidas: {len(final)} filas de stock coinciden con las operaciones aceptadas"
+          f" ({errores} operaciones con error)")
+
+if __name__ == "__main__":
+    main()
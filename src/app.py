@@ -1,36 +1,110 @@
+import os
+import weakref
+import click
 from flask import Flask
 from flask_cors import CORS
+from config import cargar_config, opciones_engine, uri_solo_lectura, aplicar_perfil_sqlite, instance_dir
 from models import db
-from routes.products import products_bp
-from routes.branches import branches_bp
+from migrations import aplicar_migraciones
+from services.product_cache import cache_productos
+from services.compression import comprimir_respuesta
+from services.metrics import instalar_metricas
+from services.serializers import instalar_json
+from services.stock_ledger import mantener_libro_stock
 
-# Crear la aplicación Flask
-app = Flask(__name__)
-CORS(app)
+# Engines de las aplicaciones creadas en este proceso. Las conexiones abiertas antes de un fork no se pueden
+# usar desde el proceso hijo: un único hook descarta en el hijo las que heredó (sin cerrarlas, siguen siendo del
+# padre) y este abre las suyas. El WeakSet no mantiene vivas las aplicaciones que ya no se usan.
+_engines = weakref.WeakSet()
 
-# Configuración de la base de datos
-import os
+def _descartar_conexiones():
+    for engine in list(_engines):
+        engine.dispose(close=False)
+
+os.register_at_fork(after_in_child=_descartar_conexiones)
+
+# Crear la aplicación Flask. Importar este módulo no crea la aplicación ni accede a la base de datos:
+# create_app() sólo configura los pools (las conexiones se abren con la primera consulta) y el esquema
+# se actualiza aparte con preparar_base_datos() o `python manage.py migrar`. Así la aplicación se puede
+# crear en un proceso y compartir entre varios procesos hijos (gunicorn --preload, ver gunicorn.conf.py).
+#
+# `config` es opcional: una subclase de config.Config o un diccionario con valores que reemplazan
+# a los por defecto y a las variables de entorno FERREMAS_*.
+def create_app(config=None):
+    app = Flask(__name__)
+    CORS(app)
+
+    # Respuestas JSON codificadas con orjson (si está instalado): JSON equivalente al del proveedor por defecto,
+    # con los caracteres no ASCII en UTF-8 en lugar de escapados (ver services/serializers.py)
+    instalar_json(app)
+
+    # Cargar la configuración (valores por defecto de config.Config y variables de entorno FERREMAS_*)
+    app.config.from_mapping(cargar_config())
+    if isinstance(config, dict):
+        app.config.from_mapping(config)
+    elif config is not None:
+        app.config.from_object(config)
+    os.makedirs(instance_dir, exist_ok=True)  # Asegurar que el directorio exista
+
+    # Pool de conexiones principal y, si está habilitado, un pool de sólo lectura para las rutas GET
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = opciones_engine(app.config)
+    uri_lectura = uri_solo_lectura(app.config)
+    if uri_lectura:
+        app.config["SQLALCHEMY_BINDS"] = {
+            "lectura": {"url": uri_lectura, **opciones_engine(app.config, app.config["DB_READ_POOL_SIZE"])}
+        }
+
+    # Inicializar la base de datos y aplicar el perfil SQLite (WAL, busy_timeout, etc.) a cada engine
+    db.init_app(app)
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        aplicar_perfil_sqlite(engine, app.config)
+        _engines.add(engine)
+
+    # Configurar la caché de productos
+    cache_productos.configurar(app.config["PRODUCT_CACHE_SIZE"], app.config["PRODUCT_CACHE_TTL"])
+
+    # Métricas por ruta (latencia, estado, consultas SQL, bytes) en GET /metrics.
+    # Se instala antes que la compresión para medir los bytes comprimidos.
+    instalar_metricas(app)
+
+    # Compresión gzip/brotli de las respuestas grandes
+    app.after_request(comprimir_respuesta)
 
-# Obtener la ruta absoluta al directorio instance en la raíz del proyecto
-project_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
-instance_dir = os.path.join(project_dir, 'instance')
-os.makedirs(instance_dir, exist_ok=True)  # Asegurar que el directorio exista
-db_path = os.path.join(instance_dir, 'ferreteria.db')
+    # Registrar blueprints (las rutas se importan al crear la aplicación, no al importar este módulo)
+    from routes.products import products_bp
+    from routes.branches import branches_bp
+    app.register_blueprint(products_bp)
+    app.register_blueprint(branches_bp)
 
-# Configurar la URI de la base de datos
-app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{db_path}"
-app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    # Comando para aplicar las migraciones manualmente: python manage.py migrar
+    @app.cli.command("migrar")
+    def migrar():
+        aplicadas = preparar_base_datos(app)
+        print(f"Migraciones aplicadas: {aplicadas}" if aplicadas else "El esquema ya está actualizado")
 
-# Inicializar la base de datos
-db.init_app(app)
+    # Tarea periódica del libro de movimientos de stock (por ejemplo desde cron): compacta los movimientos anteriores
+    # a STOCK_LEDGER_RETENTION_HOURS y concilia el libro con la tabla stock (con --completa, todas las filas)
+    @app.cli.command("compactar-stock")
+    @click.option("--completa", is_flag=True, help="Conciliar todas las filas de stock, no sólo las que cambiaron")
+    def compactar_stock(completa):
+        with app.app_context():
+            diferencias, compactados = mantener_libro_stock(
+                db.session, app.config["STOCK_LEDGER_RETENTION_HOURS"], completa
+            )
+        print(f"Diferencias corregidas: {len(diferencias)}. Movimientos compactados: {compactados}")
 
-# Registrar blueprints
-app.register_blueprint(products_bp)
-app.register_blueprint(branches_bp)
+    return app
 
-# Crear tablas si no existen
-with app.app_context():
-    db.create_all()
+# Aplicar las migraciones pendientes del esquema y devolver la lista de versiones aplicadas.
+# Reemplaza a db.create_all(), que no modifica tablas existentes (índices, restricciones, etc.).
+# Se ejecuta una sola vez por despliegue (no en cada proceso de la API).
+def preparar_base_datos(app):
+    with app.app_context():
+        return aplicar_migraciones(db.engine)
 
 if __name__ == "__main__":
-    app.run(debug=True)
\ No newline at end of file
+    app = create_app()
+    preparar_base_datos(app)
+    app.run(debug=True)
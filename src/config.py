@@ -0,0 +1,117 @@
+import os
+from flask import Config as FlaskConfig
+from sqlalchemy import event
+
+# Obtener la ruta absoluta al directorio instance en la raíz del proyecto
+project_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+instance_dir = os.path.join(project_dir, 'instance')
+db_path = os.path.join(instance_dir, 'ferreteria.db')
+
+# Configuración por defecto de la aplicación. Cualquier valor puede cambiarse con una variable
+# de entorno del mismo nombre con el prefijo FERREMAS_ (por ejemplo FERREMAS_SQLITE_BUSY_TIMEOUT=10000
+# o FERREMAS_SQLALCHEMY_DATABASE_URI=sqlite:////tmp/otra.db), o con una subclase de Config.
+class Config:
+    SQLALCHEMY_DATABASE_URI = f"sqlite:///{db_path}"
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Perfil del motor SQLite (se aplica como PRAGMA en cada conexión nueva)
+    # WAL permite lecturas concurrentes con una escritura, y synchronous=NORMAL es seguro con WAL
+    SQLITE_JOURNAL_MODE = "WAL"
+    SQLITE_SYNCHRONOUS = "NORMAL"
+    # Milisegundos que una conexión espera a que se libere un bloqueo antes de fallar con "database is locked"
+    SQLITE_BUSY_TIMEOUT = 5000
+    # Caché de páginas por conexión, en KiB
+    SQLITE_CACHE_SIZE_KB = 65536
+    # Bytes del archivo mapeados en memoria (0 lo desactiva)
+    SQLITE_MMAP_SIZE = 268435456
+
+    # Pool de conexiones de escritura (y de las lecturas cuando no hay pool de sólo lectura)
+    DB_POOL_SIZE = 5
+    DB_MAX_OVERFLOW = 10
+    DB_POOL_TIMEOUT = 30
+    # Pool de conexiones de sólo lectura para las rutas GET (0 lo desactiva)
+    DB_READ_POOL_SIZE = 10
+
+    # Caché de /products/product/<codigo>: cantidad máxima de productos y segundos de vigencia
+    # (PRODUCT_CACHE_SIZE=0 la desactiva). Cada proceso tiene su propia caché, por lo que el TTL
+    # acota cuánto puede tardar en verse un cambio hecho desde otro proceso.
+    PRODUCT_CACHE_SIZE = 1024
+    PRODUCT_CACHE_TTL = 60
+
+    # Filas por lote (y por commit) de la importación masiva /products/bulk
+    BULK_IMPORT_CHUNK_SIZE = 1000
+
+    # Filas leídas de la base de datos por bloque en las exportaciones en streaming
+    EXPORT_BATCH_SIZE = 1000
+
+    # Compresión de respuestas: tamaño mínimo en bytes y niveles de gzip (1-9) y brotli (0-11)
+    COMPRESSION_MIN_SIZE = 1024
+    COMPRESSION_GZIP_LEVEL = 6
+    COMPRESSION_BROTLI_QUALITY = 5
+
+    # Métricas (/metrics): se registra una advertencia cuando una petición ejecuta más de
+    # METRICS_MAX_QUERIES sentencias SQL (0 lo desactiva), para detectar consultas N+1
+    METRICS_MAX_QUERIES = 50
+
+    # Monitor de stock bajo (/branches/stock-alerts)
+    STOCK_ALERTS_INTERVAL = 10
+    STOCK_ALERTS_HEARTBEAT = 15
+
+    # Horas que se conservan los movimientos de stock antes de compactarlos (python manage.py compactar-stock).
+    # Un cliente de /branches/<id>/stock/changes con un cursor más antiguo debe volver a sincronizar todo.
+    STOCK_LEDGER_RETENTION_HOURS = 168
+
+# Cargar la configuración por defecto y las variables de entorno FERREMAS_*.
+# Se usa también fuera de Flask (por ejemplo en grpc_aio_server.py).
+def cargar_config(objeto=Config):
+    config = FlaskConfig(project_dir)
+    config.from_object(objeto)
+    config.from_prefixed_env("FERREMAS")
+    return config
+
+# Opciones de create_engine para el pool de conexiones
+def opciones_engine(config, pool_size=None):
+    opciones = {
+        "pool_size": pool_size or config["DB_POOL_SIZE"],
+        "max_overflow": config["DB_MAX_OVERFLOW"],
+        "pool_timeout": config["DB_POOL_TIMEOUT"],
+    }
+    if config["SQLALCHEMY_DATABASE_URI"].startswith("sqlite"):
+        # Las conexiones del pool se comparten entre los hilos del servidor
+        opciones["connect_args"] = {"check_same_thread": False}
+    return opciones
+
+# URI de sólo lectura del mismo archivo SQLite (None si no aplica)
+def uri_solo_lectura(config):
+    uri = config["SQLALCHEMY_DATABASE_URI"]
+    if not config["DB_READ_POOL_SIZE"] or not uri.startswith("sqlite:///") or uri == "sqlite:///:memory:":
+        return None
+    ruta = uri[len("sqlite:///"):]
+    return f"sqlite:///file:{ruta}?mode=ro&uri=true"
+
+# Registrar los PRAGMA del perfil SQLite para cada conexión nueva del engine
+def aplicar_perfil_sqlite(engine, config):
+    if engine.dialect.name != "sqlite":
+        return
+
+    pragmas = [
+        f"PRAGMA busy_timeout = {int(config['SQLITE_BUSY_TIMEOUT'])}",
+        f"PRAGMA synchronous = {config['SQLITE_SYNCHRONOUS']}",
+        f"PRAGMA cache_size = {-int(config['SQLITE_CACHE_SIZE_KB'])}",
+        f"PRAGMA mmap_size = {int(config['SQLITE_MMAP_SIZE'])}",
+    ]
+    if config["SQLITE_JOURNAL_MODE"]:
+        pragmas.insert(0, f"PRAGMA journal_mode = {config['SQLITE_JOURNAL_MODE']}")
+
+    @event.listens_for(engine, "connect")
+    def _al_conectar(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            # journal_mode no se puede cambiar en una conexión de sólo lectura; se usa el del archivo
+            if pragma.startswith("PRAGMA journal_mode") and _es_solo_lectura(engine):
+                continue
+            cursor.execute(pragma)
+        cursor.close()
+
+def _es_solo_lectura(engine):
+    return "mode=ro" in str(engine.url)
@@ -0,0 +1,200 @@
+import asyncio
+import signal
+import sys
+import os
+
+import grpc
+from sqlalchemy import create_engine, select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+# Asegurarse de que el directorio src esté en el path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# Importar los módulos generados por protoc
+from protos import product_pb2, product_pb2_grpc
+
+# Importar los modelos (sin la aplicación Flask: este servidor no necesita su contexto)
+from models import Producto
+from migrations import aplicar_migraciones
+from services.product_rpc import (
+    TAMANO_LOTE_GRPC, tamano_lote, a_mensaje, a_producto, resultado_creado, resultado_error,
+    consulta_existentes, consulta_listado, consulta_por_codigos, clasificar_lote, respuesta_lote,
+    vender, transferir
+)
+from config import cargar_config, aplicar_perfil_sqlite
+from utils import en_lotes
+
+# Servidor gRPC asíncrono (grpc.aio) con acceso asíncrono a la base de datos (aiosqlite).
+# Atiende las mismas RPC que grpc_server.py sin un hilo por llamada ni el contexto de Flask.
+#
+# Variables de entorno:
+#   GRPC_PORT                 puerto de escucha (50051)
+#   GRPC_MAX_CONCURRENT_RPCS  máximo de llamadas simultáneas; el resto recibe RESOURCE_EXHAUSTED (100)
+#   GRPC_SHUTDOWN_GRACE       segundos que se espera a las llamadas en curso al detener el servidor (10)
+#   GRPC_DB_POOL_SIZE         conexiones a la base de datos del pool asíncrono (5)
+PUERTO = int(os.environ.get("GRPC_PORT", 50051))
+MAX_LLAMADAS_CONCURRENTES = int(os.environ.get("GRPC_MAX_CONCURRENT_RPCS", 100))
+TIEMPO_GRACIA = float(os.environ.get("GRPC_SHUTDOWN_GRACE", 10))
+TAMANO_POOL = int(os.environ.get("GRPC_DB_POOL_SIZE", 5))
+
+# Misma configuración que la API Flask (base de datos, perfil SQLite, variables FERREMAS_*)
+config = cargar_config()
+
+class AsyncProductService(product_pb2_grpc.ProductServiceServicer):
+    def __init__(self, sesiones):
+        self._sesiones = sesiones
+
+    async def AddProduct(self, request, context):
+        async with self._sesiones() as sesion:
+            try:
+                # Verificar si el producto ya existe
+                if await sesion.scalar(select(Producto.id).where(Producto.codigo == request.code)):
+                    return product_pb2.Response(
+                        success=False,
+                        message="Ya existe un producto con este código"
+                    )
+
+                # Crear el producto
+                producto = a_producto(request)
+                sesion.add(producto)
+                await sesion.commit()
+
+                return product_pb2.Response(
+                    success=True,
+                    message=f"Producto creado exitosamente con ID: {producto.id}"
+                )
+
+            except Exception as e:
+                await sesion.rollback()
+                return product_pb2.Response(
+                    success=False,
+                    message=f"Error al crear el producto: {str(e)}"
+                )
+
+    # Carga masiva: los productos recibidos se guardan en lotes de `batch-size` con un commit por lote
+    async def AddProducts(self, request_iterator, context):
+        tamano = tamano_lote(context.invocation_metadata())
+        resultados = []
+        vistos = set()
+        lote = []
+
+        async with self._sesiones() as sesion:
+            async for request in request_iterator:
+                lote.append(request)
+                if len(lote) >= tamano:
+                    resultados.extend(await self._guardar_lote(sesion, lote, vistos))
+                    lote = []
+            if lote:
+                resultados.extend(await self._guardar_lote(sesion, lote, vistos))
+
+        return respuesta_lote(resultados)
+
+    # Recorre el catálogo leyendo de la base de datos por bloques con un cursor de servidor
+    async def ListProducts(self, request, context):
+        async with self._sesiones() as sesion:
+            consulta = consulta_listado(request).execution_options(yield_per=TAMANO_LOTE_GRPC)
+            productos = await sesion.stream_scalars(consulta)
+            async for producto in productos:
+                yield a_mensaje(producto)
+
+    # Busca varios productos por código con consultas IN
+    async def GetProducts(self, request, context):
+        async with self._sesiones() as sesion:
+            codigos = list(dict.fromkeys(request.product_codes))
+            encontrados = {}
+            for lote in en_lotes(codigos):
+                for producto in await sesion.scalars(consulta_por_codigos(lote)):
+                    encontrados[producto.codigo_producto] = producto
+
+            return product_pb2.GetProductsResponse(
+                products=[a_mensaje(encontrados[codigo]) for codigo in codigos if codigo in encontrados],
+                not_found=[codigo for codigo in codigos if codigo not in encontrados]
+            )
+
+    # Venta y transferencia de stock: la misma lógica que el servidor síncrono, ejecutada con run_sync
+    # (las sentencias siguen siendo asíncronas; run_sync sólo adapta la interfaz de la sesión)
+    async def SellStock(self, request, context):
+        async with self._sesiones() as sesion:
+            return await sesion.run_sync(vender, request)
+
+    async def TransferStock(self, request, context):
+        async with self._sesiones() as sesion:
+            return await sesion.run_sync(transferir, request)
+
+    # Guarda los productos válidos de un lote con un solo commit
+    async def _guardar_lote(self, sesion, lote, vistos):
+        filas_existentes = (await sesion.execute(consulta_existentes(lote))).all()
+        resultados, nuevos = clasificar_lote(lote, filas_existentes, vistos)
+
+        try:
+            sesion.add_all([producto for _, producto in nuevos])
+            await sesion.commit()
+            for indice, producto in nuevos:
+                resultados[indice] = resultado_creado(producto)
+        except Exception:
+            #Si el lote falla se reintenta producto por producto para informar el error de cada uno
+            await sesion.rollback()
+            for indice, producto in nuevos:
+                resultados[indice] = await self._guardar_uno(sesion, producto)
+
+        return resultados
+
+    async def _guardar_uno(self, sesion, producto):
+        producto = Producto(
+            codigo_producto=producto.codigo_producto,
+            marca=producto.marca,
+            codigo=producto.codigo,
+            nombre=producto.nombre
+        )
+        try:
+            sesion.add(producto)
+            await sesion.commit()
+            return resultado_creado(producto)
+        except Exception as e:
+            await sesion.rollback()
+            return resultado_error(producto.codigo_producto, f"Error al crear el producto: {str(e)}")
+
+# Aplicar las migraciones pendientes con una conexión síncrona antes de iniciar el servidor
+def preparar_esquema():
+    engine = create_engine(config["SQLALCHEMY_DATABASE_URI"])
+    aplicar_perfil_sqlite(engine, config)
+    try:
+        aplicar_migraciones(engine)
+    finally:
+        engine.dispose()
+
+# Crear el servidor con su pool de conexiones asíncrono
+def crear_servidor(database_url=None, puerto=PUERTO, max_llamadas=MAX_LLAMADAS_CONCURRENTES):
+    engine = create_async_engine(
+        database_url or config["SQLALCHEMY_DATABASE_URI"].replace("sqlite://", "sqlite+aiosqlite://", 1),
+        pool_size=TAMANO_POOL
+    )
+    aplicar_perfil_sqlite(engine.sync_engine, config)
+    # expire_on_commit=False evita recargas implícitas (no permitidas en modo asíncrono) tras el commit
+    sesiones = async_sessionmaker(engine, expire_on_commit=False)
+
+    server = grpc.aio.server(maximum_concurrent_rpcs=max_llamadas)
+    product_pb2_grpc.add_ProductServiceServicer_to_server(AsyncProductService(sesiones), server)
+    puerto = server.add_insecure_port(f'[::]:{puerto}')
+    return server, engine, puerto
+
+async def serve():
+    server, engine, puerto = crear_servidor()
+    await server.start()
+    print(f"Servidor gRPC (asyncio) iniciado en el puerto {puerto}...")
+
+    # Esperar SIGINT/SIGTERM y detener el servidor de forma ordenada:
+    # se rechazan las llamadas nuevas y se espera a las que están en curso
+    detener = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for senal in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(senal, detener.set)
+    await detener.wait()
+
+    print("Deteniendo el servidor gRPC, esperando las llamadas en curso...")
+    await server.stop(TIEMPO_GRACIA)
+    await engine.dispose()
+
+if __name__ == '__main__':
+    preparar_esquema()
+    asyncio.run(serve())
@@ -1,6 +1,6 @@
 import grpc
 from concurrent import futures
-import time
+import signal
 import sys
 import os
 
@@ -10,22 +10,31 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 # Importar los módulos generados por protoc
 from protos import product_pb2, product_pb2_grpc
 
-# Importar la aplicación Flask y los modelos
-from app import app, db
-from models import Producto
+# Importar la fábrica de la aplicación Flask y los modelos
+from app import create_app, preparar_base_datos
+from models import db, Producto
+from services.product_rpc import (
+    TAMANO_LOTE_GRPC, tamano_lote, a_mensaje, resultado_creado, resultado_error,
+    consulta_existentes, consulta_listado, consulta_por_codigos, clasificar_lote, respuesta_lote,
+    vender, transferir
+)
+from services.product_cache import cache_productos
+from services.metrics import servir_metricas
+from services.grpc_metrics import InterceptorMetricas
+from utils import en_lotes
 
-# Configurar el contexto de la aplicación
-app.testing = True
-app_context = app.app_context()
-app_context.push()
-
-# Asegurarse de que las tablas estén creadas
-with app.app_context():
-    db.create_all()
+# Segundos que se espera a las llamadas en curso al detener el servidor
+TIEMPO_GRACIA = float(os.environ.get("GRPC_SHUTDOWN_GRACE", 10))
+# Puerto HTTP en el que se exponen las métricas (/metrics) del servidor gRPC (0 lo desactiva)
+PUERTO_METRICAS = int(os.environ.get("GRPC_METRICS_PORT", 0))
 
+# Cada llamada se atiende dentro de un contexto de la aplicación Flask (sesión de db, configuración)
 class ProductService(product_pb2_grpc.ProductServiceServicer):
+    def __init__(self, app):
+        self._app = app
+
     def AddProduct(self, request, context):
-        with app.app_context():
+        with self._app.app_context():
             try:
                 # Verificar si el producto ya existe
                 if Producto.query.filter_by(codigo=request.code).first():
@@ -44,6 +53,7 @@ class ProductService(product_pb2_grpc.ProductServiceServicer):
                 
                 db.session.add(producto)
                 db.session.commit()
+                cache_productos.invalidar(producto.codigo_producto)
                 
                 return product_pb2.Response(
                     success=True,
@@ -57,25 +67,118 @@ class ProductService(product_pb2_grpc.ProductServiceServicer):
                     message=f"Error al crear el producto: {str(e)}"
                 )
 
+    # Carga masiva: los productos recibidos se guardan en lotes de `batch-size` con un commit por lote
+    def AddProducts(self, request_iterator, context):
+        tamano = tamano_lote(context.invocation_metadata())
+        resultados = []
+        vistos = set()
+        lote = []
+
+        with self._app.app_context():
+            for request in request_iterator:
+                lote.append(request)
+                if len(lote) >= tamano:
+                    resultados.extend(self._guardar_lote(lote, vistos))
+                    lote = []
+            if lote:
+                resultados.extend(self._guardar_lote(lote, vistos))
+
+        return respuesta_lote(resultados)
+
+    # Recorre el catálogo ordenado por código del producto, leyendo de la base de datos por bloques
+    def ListProducts(self, request, context):
+        with self._app.app_context():
+            consulta = consulta_listado(request).execution_options(yield_per=TAMANO_LOTE_GRPC)
+            for producto in db.session.scalars(consulta):
+                yield a_mensaje(producto)
+
+    # Busca varios productos por código con consultas IN en lugar de una llamada por producto
+    def GetProducts(self, request, context):
+        with self._app.app_context():
+            codigos = list(dict.fromkeys(request.product_codes))
+            encontrados = {}
+            for lote in en_lotes(codigos):
+                for producto in db.session.scalars(consulta_por_codigos(lote)):
+                    encontrados[producto.codigo_producto] = producto
+
+            return product_pb2.GetProductsResponse(
+                products=[a_mensaje(encontrados[codigo]) for codigo in codigos if codigo in encontrados],
+                not_found=[codigo for codigo in codigos if codigo not in encontrados]
+            )
+
+    # Venta y transferencia de stock con descuentos condicionales atómicos (ver services/stock_updates.py)
+    def SellStock(self, request, context):
+        with self._app.app_context():
+            return vender(db.session, request)
+
+    def TransferStock(self, request, context):
+        with self._app.app_context():
+            return transferir(db.session, request)
+
+    # Guarda los productos válidos de un lote con un solo commit
+    def _guardar_lote(self, lote, vistos):
+        filas_existentes = db.session.execute(consulta_existentes(lote)).all()
+        resultados, nuevos = clasificar_lote(lote, filas_existentes, vistos)
+
+        try:
+            db.session.add_all([producto for _, producto in nuevos])
+            db.session.commit()
+            cache_productos.invalidar(*[producto.codigo_producto for _, producto in nuevos])
+            for indice, producto in nuevos:
+                resultados[indice] = resultado_creado(producto)
+        except Exception:
+            #Si el lote falla (por ejemplo, por una inserción concurrente) se reintenta
+            #producto por producto para informar el error de cada uno
+            db.session.rollback()
+            for indice, producto in nuevos:
+                resultados[indice] = self._guardar_uno(producto)
+
+        return resultados
+
+    def _guardar_uno(self, producto):
+        producto = Producto(
+            codigo_producto=producto.codigo_producto,
+            marca=producto.marca,
+            codigo=producto.codigo,
+            nombre=producto.nombre
+        )
+        try:
+            db.session.add(producto)
+            db.session.commit()
+            cache_productos.invalidar(producto.codigo_producto)
+            return resultado_creado(producto)
+        except Exception as e:
+            db.session.rollback()
+            return resultado_error(producto.codigo_producto, f"Error al crear el producto: {str(e)}")
+
 def serve():
-    # Crear un servidor gRPC
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    # Crear la aplicación y asegurarse de que el esquema esté actualizado
+    app = create_app()
+    preparar_base_datos(app)
+
+    # Crear un servidor gRPC (el interceptor registra latencia, estado, consultas SQL y bytes de cada llamada)
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10), interceptors=[InterceptorMetricas()])
     
     # Agregar el servicio al servidor
     product_pb2_grpc.add_ProductServiceServicer_to_server(
-        ProductService(), server
+        ProductService(app), server
     )
     
     # Escuchar en el puerto 50051
     server.add_insecure_port('[::]:50051')
     server.start()
     print("Servidor gRPC iniciado en el puerto 50051...")
+    if PUERTO_METRICAS:
+        servir_metricas(PUERTO_METRICAS)
+        print(f"Métricas disponibles en http://localhost:{PUERTO_METRICAS}/metrics")
     
+    # Al recibir SIGTERM o Ctrl+C se dejan de aceptar llamadas nuevas y se espera
+    # a que terminen las que están en curso (hasta GRPC_SHUTDOWN_GRACE segundos)
+    signal.signal(signal.SIGTERM, lambda *_: server.stop(TIEMPO_GRACIA))
     try:
-        while True:
-            time.sleep(86400)  # Un día en segundos
+        server.wait_for_termination()
     except KeyboardInterrupt:
-        server.stop(0)
+        server.stop(TIEMPO_GRACIA).wait()
 
 if __name__ == '__main__':
     serve()
\ No newline at end of file
@@ -0,0 +1,26 @@
+import os
+
+# Configuración de gunicorn para la API en varios procesos. Desde src/:
+#
+#   gunicorn
+#
+# La aplicación se crea una sola vez en el proceso principal (preload) y los workers la heredan al hacer
+# fork, por lo que arrancan sin volver a importar los módulos. Las migraciones también se aplican una
+# sola vez, en el proceso principal, antes de crear los workers. Cada worker descarta las conexiones
+# a la base de datos heredadas y abre las suyas (ver app.create_app).
+#
+# Variables de entorno: GUNICORN_BIND (0.0.0.0:5000) y GUNICORN_WORKERS (cantidad de CPU).
+# La caché de productos y las métricas (/metrics) son propias de cada worker.
+
+wsgi_app = "app:create_app()"
+preload_app = True
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("GUNICORN_WORKERS", os.cpu_count() or 1))
+# Hilos por worker: las rutas pasan la mayor parte del tiempo esperando a SQLite
+threads = 4
+
+def when_ready(server):
+    from app import preparar_base_datos
+    aplicadas = preparar_base_datos(server.app.wsgi())
+    if aplicadas:
+        server.log.info("Migraciones aplicadas: %s", aplicadas)
@@ -0,0 +1,12 @@
+from flask.cli import FlaskGroup
+from app import create_app
+
+# Comandos de administración de la aplicación, desde src/:
+#     python manage.py migrar
+#     python manage.py compactar-stock
+# Se ejecuta como script (y no con `flask --app app`) porque src/ es un paquete: Flask importaría el módulo
+# como src.app y los imports de la aplicación (config, models, services...) no se resolverían.
+cli = FlaskGroup(create_app=create_app)
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,37 @@
+from . import (
+    v001_esquema_inicial, v002_stock_unico, v003_indices, v004_versiones, v005_busqueda, v006_cambios_productos,
+    v007_movimientos_stock
+)
+
+# Migraciones del esquema en orden. La versión aplicada se guarda en PRAGMA user_version
+# de la propia base de datos, por lo que cada migración se ejecuta una sola vez.
+# Para agregar una nueva: crear el módulo vNNN_descripcion.py con una función upgrade(conexion)
+# y registrarlo al final de esta lista con el número siguiente.
+MIGRACIONES = [
+    (1, v001_esquema_inicial.upgrade),
+    (2, v002_stock_unico.upgrade),
+    (3, v003_indices.upgrade),
+    (4, v004_versiones.upgrade),
+    (5, v005_busqueda.upgrade),
+    (6, v006_cambios_productos.upgrade),
+    (7, v007_movimientos_stock.upgrade),
+]
+
+# Obtener la versión del esquema de la base de datos
+def version_actual(conexion):
+    return conexion.exec_driver_sql("PRAGMA user_version").scalar()
+
+# Aplicar las migraciones pendientes y devolver la lista de versiones aplicadas
+def aplicar_migraciones(engine):
+    aplicadas = []
+    with engine.begin() as conexion:
+        version = version_actual(conexion)
+        for numero, upgrade in MIGRACIONES:
+            if numero <= version:
+                continue
+            upgrade(conexion)
+            conexion.exec_driver_sql(f"PRAGMA user_version = {int(numero)}")
+            aplicadas.append(numero)
+    return aplicadas
+
+__all__ = ['MIGRACIONES', 'aplicar_migraciones', 'version_actual']
@@ -0,0 +1,44 @@
+# Esquema inicial, equivalente a lo que creaba db.create_all() antes de existir las migraciones.
+# Se usa IF NOT EXISTS para que las bases de datos ya creadas queden en la versión 1 sin cambios.
+def upgrade(conexion):
+    conexion.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS productos (
+            id INTEGER NOT NULL,
+            codigo_producto VARCHAR(50) NOT NULL,
+            marca VARCHAR(100) NOT NULL,
+            codigo VARCHAR(50) NOT NULL,
+            nombre VARCHAR(100) NOT NULL,
+            PRIMARY KEY (id),
+            UNIQUE (codigo_producto),
+            UNIQUE (codigo)
+        )
+    """)
+    conexion.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS sucursales (
+            id INTEGER NOT NULL,
+            nombre VARCHAR(100) NOT NULL,
+            direccion VARCHAR(255) NOT NULL,
+            PRIMARY KEY (id)
+        )
+    """)
+    conexion.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS precios (
+            id INTEGER NOT NULL,
+            fecha DATETIME NOT NULL,
+            valor FLOAT NOT NULL,
+            producto_id INTEGER NOT NULL,
+            PRIMARY KEY (id),
+            FOREIGN KEY(producto_id) REFERENCES productos (id)
+        )
+    """)
+    conexion.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS stock (
+            id INTEGER NOT NULL,
+            producto_id INTEGER NOT NULL,
+            sucursal_id INTEGER NOT NULL,
+            cantidad INTEGER NOT NULL,
+            PRIMARY KEY (id),
+            FOREIGN KEY(producto_id) REFERENCES productos (id),
+            FOREIGN KEY(sucursal_id) REFERENCES sucursales (id)
+        )
+    """)
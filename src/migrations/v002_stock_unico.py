@@ -0,0 +1,21 @@
+# Índice único (producto, sucursal) en stock, requerido por el upsert de /branches/<id>/stock/add.
+# Antes de crearlo se fusionan las filas duplicadas de un mismo producto en una misma sucursal.
+def upgrade(conexion):
+    conexion.exec_driver_sql("""
+        UPDATE stock SET cantidad = (
+            SELECT SUM(duplicado.cantidad) FROM stock AS duplicado
+            WHERE duplicado.producto_id = stock.producto_id
+              AND duplicado.sucursal_id = stock.sucursal_id
+        )
+        WHERE id IN (
+            SELECT MIN(id) FROM stock GROUP BY producto_id, sucursal_id HAVING COUNT(*) > 1
+        )
+    """)
+    conexion.exec_driver_sql("""
+        DELETE FROM stock WHERE id NOT IN (
+            SELECT MIN(id) FROM stock GROUP BY producto_id, sucursal_id
+        )
+    """)
+    conexion.exec_driver_sql(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_stock_producto_sucursal ON stock (producto_id, sucursal_id)"
+    )
@@ -0,0 +1,18 @@
+# Índices para las columnas de búsqueda más usadas.
+# - precios (producto_id, fecha): carga de precios por producto, ordenados por fecha.
+#   También cubre las búsquedas sólo por producto_id, por lo que no hace falta un índice aparte.
+# - stock (sucursal_id, producto_id): lectura del stock de una sucursal.
+#   Las búsquedas por producto_id ya las cubre uq_stock_producto_sucursal.
+# - stock (cantidad): filtro de stock bajo usado por /branches/stock-alerts.
+def upgrade(conexion):
+    conexion.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_precios_producto_fecha ON precios (producto_id, fecha)"
+    )
+    conexion.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_stock_sucursal_producto ON stock (sucursal_id, producto_id)"
+    )
+    conexion.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_stock_cantidad ON stock (cantidad)"
+    )
+    # Actualizar las estadísticas que usa el planificador de consultas para elegir índices
+    conexion.exec_driver_sql("ANALYZE")
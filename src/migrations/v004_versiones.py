@@ -0,0 +1,54 @@
+# Contadores de versión por tabla y por sucursal, usados para los ETag de las rutas GET.
+# Se mantienen con triggers para que también cuenten las escrituras hechas fuera de la API
+# (por ejemplo desde el servidor gRPC), y así un If-None-Match se resuelve con una sola lectura.
+# - 'productos': cualquier cambio en productos o precios
+# - 'sucursales': cualquier cambio en sucursales
+# - 'stock:<id>': cualquier cambio en el stock de la sucursal <id>
+def _incrementar(clave):
+    return f"""
+        INSERT INTO versiones (clave, version) VALUES ({clave}, 1)
+        ON CONFLICT (clave) DO UPDATE SET version = version + 1;
+    """
+
+def upgrade(conexion):
+    conexion.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS versiones (
+            clave VARCHAR(50) NOT NULL,
+            version INTEGER NOT NULL,
+            PRIMARY KEY (clave)
+        )
+    """)
+
+    for tabla, clave in (("productos", "'productos'"), ("precios", "'productos'"), ("sucursales", "'sucursales'")):
+        for operacion in ("INSERT", "UPDATE", "DELETE"):
+            conexion.exec_driver_sql(f"""
+                CREATE TRIGGER IF NOT EXISTS tr_version_{tabla}_{operacion.lower()}
+                AFTER {operacion} ON {tabla}
+                BEGIN
+                    {_incrementar(clave)}
+                END
+            """)
+
+    conexion.exec_driver_sql(f"""
+        CREATE TRIGGER IF NOT EXISTS tr_version_stock_insert
+        AFTER INSERT ON stock
+        BEGIN
+            {_incrementar("'stock:' || NEW.sucursal_id")}
+        END
+    """)
+    conexion.exec_driver_sql(f"""
+        CREATE TRIGGER IF NOT EXISTS tr_version_stock_update
+        AFTER UPDATE ON stock
+        BEGIN
+            {_incrementar("'stock:' || NEW.sucursal_id")}
+            UPDATE versiones SET version = version + 1
+            WHERE clave = 'stock:' || OLD.sucursal_id AND OLD.sucursal_id != NEW.sucursal_id;
+        END
+    """)
+    conexion.exec_driver_sql(f"""
+        CREATE TRIGGER IF NOT EXISTS tr_version_stock_delete
+        AFTER DELETE ON stock
+        BEGIN
+            {_incrementar("'stock:' || OLD.sucursal_id")}
+        END
+    """)
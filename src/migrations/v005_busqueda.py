@@ -0,0 +1,52 @@
+# Índice de texto completo (FTS5) sobre nombre, marca y códigos de los productos, usado por /products/search.
+# Es una tabla "external content": no duplica el texto, sólo guarda el índice y lee las columnas de productos.
+# Se mantiene sincronizada con triggers, por lo que también refleja las escrituras hechas fuera de la API
+# (servidores gRPC, importaciones). remove_diacritics permite buscar "tecnico" y encontrar "Técnico", y los
+# índices de prefijo (2 a 4 caracteres) aceleran las búsquedas por el comienzo de una palabra.
+COLUMNAS = "nombre, marca, codigo, codigo_producto"
+
+def upgrade(conexion):
+    conexion.exec_driver_sql(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS productos_fts USING fts5(
+            {COLUMNAS},
+            content='productos',
+            content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3 4'
+        )
+    """)
+
+    # Ranking por defecto (columna "rank"): bm25 con más peso para el nombre, luego la marca y los códigos.
+    # Con ORDER BY rank FTS5 puede ordenar y cortar los resultados sin leer las filas de productos.
+    conexion.exec_driver_sql(
+        "INSERT INTO productos_fts (productos_fts, rank) VALUES ('rank', 'bm25(10.0, 5.0, 2.0, 2.0)')"
+    )
+
+    nuevos = ", ".join(f"NEW.{columna}" for columna in COLUMNAS.split(", "))
+    viejos = ", ".join(f"OLD.{columna}" for columna in COLUMNAS.split(", "))
+    conexion.exec_driver_sql(f"""
+        CREATE TRIGGER IF NOT EXISTS tr_productos_fts_insert
+        AFTER INSERT ON productos
+        BEGIN
+            INSERT INTO productos_fts (rowid, {COLUMNAS}) VALUES (NEW.id, {nuevos});
+        END
+    """)
+    # En una tabla external content se borra una fila enviando el comando 'delete' con los valores anteriores
+    conexion.exec_driver_sql(f"""
+        CREATE TRIGGER IF NOT EXISTS tr_productos_fts_delete
+        AFTER DELETE ON productos
+        BEGIN
+            INSERT INTO productos_fts (productos_fts, rowid, {COLUMNAS}) VALUES ('delete', OLD.id, {viejos});
+        END
+    """)
+    conexion.exec_driver_sql(f"""
+        CREATE TRIGGER IF NOT EXISTS tr_productos_fts_update
+        AFTER UPDATE OF {COLUMNAS} ON productos
+        BEGIN
+            INSERT INTO productos_fts (productos_fts, rowid, {COLUMNAS}) VALUES ('delete', OLD.id, {viejos});
+            INSERT INTO productos_fts (rowid, {COLUMNAS}) VALUES (NEW.id, {nuevos});
+        END
+    """)
+
+    # Indexar los productos existentes
+    conexion.exec_driver_sql("INSERT INTO productos_fts (productos_fts) VALUES ('rebuild')")
@@ -0,0 +1,70 @@
+# Registro de cambios del catálogo, usado por /products/changes para la sincronización incremental.
+# Cada alta, modificación o baja de un producto y cada cambio en sus precios toma un número de secuencia
+# nuevo (AUTOINCREMENT: creciente y nunca reutilizado). Se guarda sólo el último cambio de cada código
+# (una fila por codigo_producto), por lo que la tabla no crece con la cantidad de cambios y una consulta
+# "secuencia > cursor" por la clave primaria devuelve cada producto modificado una sola vez. Las bajas quedan como marcas (eliminado = 1) para que los clientes borren su copia.
+# Se mantiene con triggers, por lo que también registra las escrituras del servidor gRPC y las importaciones.
+#
+# Se borra la fila anterior y se inserta una nueva en lugar de usar INSERT OR REPLACE: dentro de un trigger
+# la cláusula OR de la sentencia que lo dispara (por ejemplo un INSERT OR IGNORE) reemplaza a la del trigger.
+def _registrar(codigo, eliminado=0):
+    return f"""
+        DELETE FROM cambios_productos WHERE codigo_producto = {codigo};
+        INSERT INTO cambios_productos (codigo_producto, eliminado, fecha) VALUES ({codigo}, {eliminado}, CURRENT_TIMESTAMP);
+    """
+
+_CODIGO_PRECIO = "(SELECT codigo_producto FROM productos WHERE id = {fila}.producto_id)"
+
+def upgrade(conexion):
+    conexion.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS cambios_productos (
+            secuencia INTEGER PRIMARY KEY AUTOINCREMENT,
+            codigo_producto VARCHAR(50) NOT NULL,
+            eliminado BOOLEAN NOT NULL DEFAULT 0,
+            fecha DATETIME NOT NULL,
+            CONSTRAINT uq_cambios_productos_codigo UNIQUE (codigo_producto)
+        )
+    """)
+
+    conexion.exec_driver_sql(f"""
+        CREATE TRIGGER IF NOT EXISTS tr_cambios_productos_insert
+        AFTER INSERT ON productos
+        BEGIN
+            {_registrar("NEW.codigo_producto")}
+        END
+    """)
+    # Si cambia el código del producto, el código anterior queda como baja
+    conexion.exec_driver_sql(f"""
+        CREATE TRIGGER IF NOT EXISTS tr_cambios_productos_update
+        AFTER UPDATE ON productos
+        BEGIN
+            DELETE FROM cambios_productos
+            WHERE codigo_producto = OLD.codigo_producto AND OLD.codigo_producto != NEW.codigo_producto;
+            INSERT INTO cambios_productos (codigo_producto, eliminado, fecha)
+            SELECT OLD.codigo_producto, 1, CURRENT_TIMESTAMP WHERE OLD.codigo_producto != NEW.codigo_producto;
+            {_registrar("NEW.codigo_producto")}
+        END
+    """)
+    conexion.exec_driver_sql(f"""
+        CREATE TRIGGER IF NOT EXISTS tr_cambios_productos_delete
+        AFTER DELETE ON productos
+        BEGIN
+            {_registrar("OLD.codigo_producto", 1)}
+        END
+    """)
+
+    for operacion, fila in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD")):
+        conexion.exec_driver_sql(f"""
+            CREATE TRIGGER IF NOT EXISTS tr_cambios_precios_{operacion.lower()}
+            AFTER {operacion} ON precios
+            WHEN {_CODIGO_PRECIO.format(fila=fila)} IS NOT NULL
+            BEGIN
+                {_registrar(_CODIGO_PRECIO.format(fila=fila))}
+            END
+        """)
+
+    # Registrar los productos existentes, para que un cliente sin cursor (since=0) reciba todo el catálogo
+    conexion.exec_driver_sql("""
+        INSERT INTO cambios_productos (codigo_producto, eliminado, fecha)
+        SELECT codigo_producto, 0, CURRENT_TIMESTAMP FROM productos ORDER BY codigo_producto
+    """)
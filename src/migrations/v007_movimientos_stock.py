@@ -0,0 +1,94 @@
+# Libro de movimientos de stock: cada cambio en la tabla stock agrega una fila con la diferencia de
+# cantidad (ventas, reposiciones, transferencias, ajustes, filas eliminadas junto con un producto).
+# La tabla stock sigue teniendo la cantidad vigente, que es la que usan los descuentos condicionales
+# (services/stock_updates.py); los movimientos permiten a /branches/<id>/stock/changes devolver sólo lo
+# que cambió. Se escriben con triggers, por lo que incluyen las escrituras de la API, de gRPC y externas.
+#
+# Los movimientos antiguos se compactan (services/stock_ledger.py): su suma se acumula en saldos_stock y
+# se borran. En todo momento, para cada sucursal y producto:
+#     saldos_stock.cantidad + SUM(movimientos_stock.cantidad) = stock.cantidad
+# La tabla marcas_stock guarda hasta qué movimiento se compactó ('compactado') y hasta cuál se verificó
+# esa igualdad ('conciliado'), para que ambas tareas sólo procesen los movimientos nuevos.
+_CODIGO = "COALESCE((SELECT codigo_producto FROM productos WHERE id = {fila}.producto_id), '')"
+
+def _movimiento(fila, cantidad):
+    return f"""
+        INSERT INTO movimientos_stock (sucursal_id, producto_id, codigo_producto, cantidad, fecha)
+        VALUES ({fila}.sucursal_id, {fila}.producto_id, {_CODIGO.format(fila=fila)}, {cantidad}, CURRENT_TIMESTAMP);
+    """
+
+def upgrade(conexion):
+    # AUTOINCREMENT: los ids no se reutilizan después de compactar, por lo que sirven como cursor
+    conexion.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS movimientos_stock (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sucursal_id INTEGER NOT NULL,
+            producto_id INTEGER NOT NULL,
+            codigo_producto VARCHAR(50) NOT NULL,
+            cantidad INTEGER NOT NULL,
+            fecha DATETIME NOT NULL
+        )
+    """)
+    # Cambios de una sucursal posteriores a un cursor (/stock/changes) y movimientos de una fila de stock (conciliación)
+    conexion.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_movimientos_stock_sucursal_id ON movimientos_stock (sucursal_id, id)"
+    )
+    conexion.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_movimientos_stock_sucursal_producto ON movimientos_stock (sucursal_id, producto_id)"
+    )
+
+    conexion.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS saldos_stock (
+            sucursal_id INTEGER NOT NULL,
+            producto_id INTEGER NOT NULL,
+            cantidad INTEGER NOT NULL,
+            PRIMARY KEY (sucursal_id, producto_id)
+        )
+    """)
+    conexion.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS marcas_stock (
+            clave VARCHAR(20) NOT NULL,
+            movimiento INTEGER NOT NULL,
+            PRIMARY KEY (clave)
+        )
+    """)
+
+    conexion.exec_driver_sql(f"""
+        CREATE TRIGGER IF NOT EXISTS tr_movimientos_stock_insert
+        AFTER INSERT ON stock
+        BEGIN
+            {_movimiento("NEW", "NEW.cantidad")}
+        END
+    """)
+    # Si la fila cambia de sucursal o de producto se registra como una salida y una entrada
+    conexion.exec_driver_sql(f"""
+        CREATE TRIGGER IF NOT EXISTS tr_movimientos_stock_update
+        AFTER UPDATE OF cantidad, sucursal_id, producto_id ON stock
+        WHEN NEW.cantidad != OLD.cantidad OR NEW.sucursal_id != OLD.sucursal_id OR NEW.producto_id != OLD.producto_id
+        BEGIN
+            INSERT INTO movimientos_stock (sucursal_id, producto_id, codigo_producto, cantidad, fecha)
+            SELECT OLD.sucursal_id, OLD.producto_id, {_CODIGO.format(fila="OLD")}, -OLD.cantidad, CURRENT_TIMESTAMP
+            WHERE NEW.sucursal_id != OLD.sucursal_id OR NEW.producto_id != OLD.producto_id;
+            INSERT INTO movimientos_stock (sucursal_id, producto_id, codigo_producto, cantidad, fecha)
+            SELECT NEW.sucursal_id, NEW.producto_id, {_CODIGO.format(fila="NEW")},
+                   CASE WHEN NEW.sucursal_id = OLD.sucursal_id AND NEW.producto_id = OLD.producto_id
+                        THEN NEW.cantidad - OLD.cantidad ELSE NEW.cantidad END,
+                   CURRENT_TIMESTAMP;
+        END
+    """)
+    conexion.exec_driver_sql(f"""
+        CREATE TRIGGER IF NOT EXISTS tr_movimientos_stock_delete
+        AFTER DELETE ON stock
+        BEGIN
+            {_movimiento("OLD", "-OLD.cantidad")}
+        END
+    """)
+
+    # El stock existente queda como saldo compactado inicial (sin movimientos)
+    conexion.exec_driver_sql("""
+        INSERT OR IGNORE INTO saldos_stock (sucursal_id, producto_id, cantidad)
+        SELECT sucursal_id, producto_id, cantidad FROM stock
+    """)
+    conexion.exec_driver_sql(
+        "INSERT OR IGNORE INTO marcas_stock (clave, movimiento) VALUES ('compactado', 0), ('conciliado', 0)"
+    )
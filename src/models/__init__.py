@@ -1,9 +1,30 @@
+from functools import wraps
+from flask import has_request_context, request
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
 from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
 from sqlalchemy.orm import relationship
 
+# Sesión que envía las consultas al pool de sólo lectura ("lectura" en SQLALCHEMY_BINDS)
+# cuando la ruta en curso está marcada con @solo_lectura. El resto usa el pool principal.
+# La marca se guarda en la petición y no en `g`: si ya hay un contexto de aplicación activo
+# (por ejemplo el que abre grpc_server.py) Flask lo reutiliza entre peticiones y `g` quedaría marcado.
+class SesionEnrutada(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context() and getattr(request, "solo_lectura", False) and "lectura" in self._db.engines:
+            return self._db.engines["lectura"]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
 # Inicializar SQLAlchemy
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": SesionEnrutada})
+
+# Decorador para las rutas que sólo leen de la base de datos
+def solo_lectura(funcion):
+    @wraps(funcion)
+    def envoltura(*args, **kwargs):
+        request.solo_lectura = True
+        return funcion(*args, **kwargs)
+    return envoltura
 
 # Importar modelos aquí para que estén disponibles al importar desde models
 # Los modelos deben importarse después de inicializar db
@@ -13,4 +34,4 @@ from .stock import Stock
 from .sucursal import Sucursal
 
 # Hacer los modelos disponibles al importar desde models
-__all__ = ['db', 'Producto', 'Precio', 'Stock', 'Sucursal']
\ No newline at end of file
+__all__ = ['db', 'solo_lectura', 'Producto', 'Precio', 'Stock', 'Sucursal']
@@ -9,5 +9,10 @@ class Precio(db.Model):
     valor = db.Column(db.Float, nullable=False)
     producto_id = db.Column(db.Integer, db.ForeignKey('productos.id'), nullable=False)
     
+    # Índice creado en migrations/v003_indices.py
+    __table_args__ = (
+        db.Index('ix_precios_producto_fecha', 'producto_id', 'fecha'),
+    )
+    
     def __repr__(self):
         return f'<Precio {self.valor} - {self.fecha}>'
\ No newline at end of file
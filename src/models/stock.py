@@ -10,5 +10,13 @@ class Stock(db.Model):
     producto_id = db.Column(db.Integer, db.ForeignKey('productos.id'), nullable=False)
     sucursal_id = db.Column(db.Integer, db.ForeignKey('sucursales.id'), nullable=False)
     
+    # Un producto tiene una sola fila de stock por sucursal (requerido por el upsert de /stock/add)
+    # Los índices se crean en las migraciones (migrations/v002_stock_unico.py y v003_indices.py)
+    __table_args__ = (
+        db.Index('uq_stock_producto_sucursal', 'producto_id', 'sucursal_id', unique=True),
+        db.Index('ix_stock_sucursal_producto', 'sucursal_id', 'producto_id'),
+        db.Index('ix_stock_cantidad', 'cantidad'),
+    )
+    
     def __repr__(self):
         return f'<Stock {self.cantidad} unidades (Producto: {self.producto_id}, Sucursal: {self.sucursal_id})>'
\ No newline at end of file
@@ -24,7 +24,7 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\rproduct.proto\x12\x07product\"J\n\x07Product\x12\x14\n\x0cproduct_code\x18\x01 \x01(\t\x12\x0c\n\x04\x63ode\x18\x02 \x01(\t\x12\x0c\n\x04name\x18\x03 \x01(\t\x12\r\n\x05\x62rand\x18\x04 \x01(\t\",\n\x08Response\x12\x0f\n\x07message\x18\x01 \x01(\t\x12\x0f\n\x07success\x18\x02 \x01(\x08\x32\x43\n\x0eProductService\x12\x31\n\nAddProduct\x12\x10.product.Product\x1a\x11.product.Responseb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\rproduct.proto\x12\x07product\"J\n\x07Product\x12\x14\n\x0cproduct_code\x18\x01 \x01(\t\x12\x0c\n\x04\x63ode\x18\x02 \x01(\t\x12\x0c\n\x04name\x18\x03 \x01(\t\x12\r\n\x05\x62rand\x18\x04 \x01(\t\",\n\x08Response\x12\x0f\n\x07message\x18\x01 \x01(\t\x12\x0f\n\x07success\x18\x02 \x01(\x08\"G\n\rProductResult\x12\x14\n\x0cproduct_code\x18\x01 \x01(\t\x12\x0f\n\x07success\x18\x02 \x01(\x08\x12\x0f\n\x07message\x18\x03 \x01(\t\"_\n\x13\x41\x64\x64ProductsResponse\x12\x0f\n\x07\x63reated\x18\x01 \x01(\x05\x12\x0e\n\x06\x66\x61iled\x18\x02 \x01(\x05\x12\'\n\x07results\x18\x03 \x03(\x0b\x32\x16.product.ProductResult\"O\n\x13ListProductsRequest\x12\r\n\x05\x62rand\x18\x01 \x01(\t\x12\x1a\n\x12\x61\x66ter_product_code\x18\x02 \x01(\t\x12\r\n\x05limit\x18\x03 \x01(\x05\"+\n\x12GetProductsRequest\x12\x15\n\rproduct_codes\x18\x01 \x03(\t\"L\n\x13GetProductsResponse\x12\"\n\x08products\x18\x01 \x03(\x0b\x32\x10.product.Product\x12\x11\n\tnot_found\x18\x02 \x03(\t\"3\n\tStockItem\x12\x14\n\x0cproduct_code\x18\x01 \x01(\t\x12\x10\n\x08quantity\x18\x02 \x01(\x05\"H\n\x10SellStockRequest\x12\x11\n\tbranch_id\x18\x01 \x01(\x05\x12!\n\x05items\x18\x02 \x03(\x0b\x32\x12.product.StockItem\"g\n\x14TransferStockRequest\x12\x16\n\x0e\x66rom_branch_id\x18\x01 \x01(\x05\x12\x14\n\x0cto_branch_id\x18\x02 \x01(\x05\x12!\n\x05items\x18\x03 \x03(\x0b\x32\x12.product.StockItem\"\xb1\x01\n\x13StockChangeResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\x12%\n\tremaining\x18\x03 \x03(\x0b\x32\x12.product.StockItem\x12\'\n\x0b\x64\x65stination\x18\x04 \x03(\x0b\x32\x12.product.StockItem\x12(\n\x0cinsufficient\x18\x05 \x03(\x0b\x32\x12.product.StockItem\"$\n\x05Price\x12\x0c\n\x04\x64\x61te\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\x01\"R\n\rProductPrices\x12!\n\x07product\x18\x01 \x01(\x0b\x32\x10.product.Product\x12\x1e\n\x06prices\x18\x02 \x03(\x0b\x32\x0e.product.Price\"[\n\x0b\x42ranchStock\x12\x11\n\tbranch_id\x18\x01 \x01(\x05\x12\'\n\x07product\x18\x02 \x01(\x0b\x32\x16.product.ProductPrices\x12\x10\n\x08quantity\x18\x03 \x01(\x05\x32\xa4\x03\n\x0eProductService\x12\x31\n\nAddProduct\x12\x10.product.Product\x1a\x11.product.Response\x12?\n\x0b\x41\x64\x64Products\x12\x10.product.Product\x1a\x1c.product.AddProductsResponse(\x01\x12@\n\x0cListProducts\x12\x1c.product.ListProductsRequest\x1a\x10.product.Product0\x01\x12H\n\x0bGetProducts\x12\x1b.product.GetProductsRequest\x1a\x1c.product.GetProductsResponse\x12\x44\n\tSellStock\x12\x19.product.SellStockRequest\x1a\x1c.product.StockChangeResponse\x12L\n\rTransferStock\x12\x1d.product.TransferStockRequest\x1a\x1c.product.StockChangeResponseb\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -35,6 +35,30 @@ if not _descriptor._USE_C_DESCRIPTORS:
   _globals['_PRODUCT']._serialized_end=100
   _globals['_RESPONSE']._serialized_start=102
   _globals['_RESPONSE']._serialized_end=146
-  _globals['_PRODUCTSERVICE']._serialized_start=148
-  _globals['_PRODUCTSERVICE']._serialized_end=215
+  _globals['_PRODUCTRESULT']._serialized_start=148
+  _globals['_PRODUCTRESULT']._serialized_end=219
+  _globals['_ADDPRODUCTSRESPONSE']._serialized_start=221
+  _globals['_ADDPRODUCTSRESPONSE']._serialized_end=316
+  _globals['_LISTPRODUCTSREQUEST']._serialized_start=318
+  _globals['_LISTPRODUCTSREQUEST']._serialized_end=397
+  _globals['_GETPRODUCTSREQUEST']._serialized_start=399
+  _globals['_GETPRODUCTSREQUEST']._serialized_end=442
+  _globals['_GETPRODUCTSRESPONSE']._serialized_start=444
+  _globals['_GETPRODUCTSRESPONSE']._serialized_end=520
+  _globals['_STOCKITEM']._serialized_start=522
+  _globals['_STOCKITEM']._serialized_end=573
+  _globals['_SELLSTOCKREQUEST']._serialized_start=575
+  _globals['_SELLSTOCKREQUEST']._serialized_end=647
+  _globals['_TRANSFERSTOCKREQUEST']._serialized_start=649
+  _globals['_TRANSFERSTOCKREQUEST']._serialized_end=752
+  _globals['_STOCKCHANGERESPONSE']._serialized_start=755
+  _globals['_STOCKCHANGERESPONSE']._serialized_end=932
+  _globals['_PRICE']._serialized_start=934
+  _globals['_PRICE']._serialized_end=970
+  _globals['_PRODUCTPRICES']._serialized_start=972
+  _globals['_PRODUCTPRICES']._serialized_end=1054
+  _globals['_BRANCHSTOCK']._serialized_start=1056
+  _globals['_BRANCHSTOCK']._serialized_end=1147
+  _globals['_PRODUCTSERVICE']._serialized_start=1150
+  _globals['_PRODUCTSERVICE']._serialized_end=1570
 # @@protoc_insertion_point(module_scope)
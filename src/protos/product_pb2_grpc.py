@@ -40,6 +40,31 @@ class ProductServiceStub(object):
                 request_serializer=product__pb2.Product.SerializeToString,
                 response_deserializer=product__pb2.Response.FromString,
                 _registered_method=True)
+        self.AddProducts = channel.stream_unary(
+                '/product.ProductService/AddProducts',
+                request_serializer=product__pb2.Product.SerializeToString,
+                response_deserializer=product__pb2.AddProductsResponse.FromString,
+                _registered_method=True)
+        self.ListProducts = channel.unary_stream(
+                '/product.ProductService/ListProducts',
+                request_serializer=product__pb2.ListProductsRequest.SerializeToString,
+                response_deserializer=product__pb2.Product.FromString,
+                _registered_method=True)
+        self.GetProducts = channel.unary_unary(
+                '/product.ProductService/GetProducts',
+                request_serializer=product__pb2.GetProductsRequest.SerializeToString,
+                response_deserializer=product__pb2.GetProductsResponse.FromString,
+                _registered_method=True)
+        self.SellStock = channel.unary_unary(
+                '/product.ProductService/SellStock',
+                request_serializer=product__pb2.SellStockRequest.SerializeToString,
+                response_deserializer=product__pb2.StockChangeResponse.FromString,
+                _registered_method=True)
+        self.TransferStock = channel.unary_unary(
+                '/product.ProductService/TransferStock',
+                request_serializer=product__pb2.TransferStockRequest.SerializeToString,
+                response_deserializer=product__pb2.StockChangeResponse.FromString,
+                _registered_method=True)
 
 
 class ProductServiceServicer(object):
@@ -52,6 +77,41 @@ class ProductServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def AddProducts(self, request_iterator, context):
+        """Carga masiva: el cliente envía un flujo de productos que se guardan por lotes
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def ListProducts(self, request, context):
+        """Recorre el catálogo enviando los productos en un flujo
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def GetProducts(self, request, context):
+        """Obtiene varios productos por su código en una sola llamada
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def SellStock(self, request, context):
+        """Descuenta stock de una sucursal (venta) con descuentos condicionales atómicos
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def TransferStock(self, request, context):
+        """Mueve stock de una sucursal a otra
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_ProductServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -60,6 +120,31 @@ def add_ProductServiceServicer_to_server(servicer, server):
                     request_deserializer=product__pb2.Product.FromString,
                     response_serializer=product__pb2.Response.SerializeToString,
             ),
+            'AddProducts': grpc.stream_unary_rpc_method_handler(
+                    servicer.AddProducts,
+                    request_deserializer=product__pb2.Product.FromString,
+                    response_serializer=product__pb2.AddProductsResponse.SerializeToString,
+            ),
+            'ListProducts': grpc.unary_stream_rpc_method_handler(
+                    servicer.ListProducts,
+                    request_deserializer=product__pb2.ListProductsRequest.FromString,
+                    response_serializer=product__pb2.Product.SerializeToString,
+            ),
+            'GetProducts': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetProducts,
+                    request_deserializer=product__pb2.GetProductsRequest.FromString,
+                    response_serializer=product__pb2.GetProductsResponse.SerializeToString,
+            ),
+            'SellStock': grpc.unary_unary_rpc_method_handler(
+                    servicer.SellStock,
+                    request_deserializer=product__pb2.SellStockRequest.FromString,
+                    response_serializer=product__pb2.StockChangeResponse.SerializeToString,
+            ),
+            'TransferStock': grpc.unary_unary_rpc_method_handler(
+                    servicer.TransferStock,
+                    request_deserializer=product__pb2.TransferStockRequest.FromString,
+                    response_serializer=product__pb2.StockChangeResponse.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'product.ProductService', rpc_method_handlers)
@@ -98,3 +183,138 @@ class ProductService(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def AddProducts(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_unary(
+            request_iterator,
+            target,
+            '/product.ProductService/AddProducts',
+            product__pb2.Product.SerializeToString,
+            product__pb2.AddProductsResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def ListProducts(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/product.ProductService/ListProducts',
+            product__pb2.ListProductsRequest.SerializeToString,
+            product__pb2.Product.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def GetProducts(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/product.ProductService/GetProducts',
+            product__pb2.GetProductsRequest.SerializeToString,
+            product__pb2.GetProductsResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def SellStock(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/product.ProductService/SellStock',
+            product__pb2.SellStockRequest.SerializeToString,
+            product__pb2.StockChangeResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def TransferStock(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/product.ProductService/TransferStock',
+            product__pb2.TransferStockRequest.SerializeToString,
+            product__pb2.StockChangeResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
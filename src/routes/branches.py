@@ -1,16 +1,33 @@
-from flask import Blueprint, request, jsonify, Response, stream_with_context
-from models import db
+from flask import Blueprint, request, jsonify, Response, current_app, stream_with_context
+from models import db, solo_lectura
 from models.product import Producto
 from models.stock import Stock
 from models.sucursal import Sucursal
+from utils import TAMANO_LOTE_SQL, en_lotes, es_verdadero, TIPOS_EXPORTACION, linea_csv, linea_ndjson
+from services.versiones import con_etag
+from services.serializers import (
+    COLUMNAS_STOCK, stock_con_precios, stock_json, leer_proyeccion, acepta_protobuf, stock_pb, respuesta_protobuf, variar_por_accept
+)
+from services.stock_alerts import suscribir_monitor, notificar_cambio_stock
+from services.stock_updates import (
+    SUMA_STOCK, parametros_suma, ids_productos, descontar_stock, cantidades_por_codigo
+)
+from services.stock_ledger import CLAVE_VERSION, consulta_cambios_stock, consulta_stock_actual, marca, ultimo_movimiento
+from sqlalchemy import case, func, select
 import json
-import time
+import queue
 from datetime import datetime
 
 branches_bp = Blueprint("branches", __name__)
 
+#Tamaño de página de /branches/<id>/stock/changes
+LIMITE_CAMBIOS_POR_DEFECTO = 500
+LIMITE_CAMBIOS_MAXIMO = 5000
+
 #Ruta para obtener todas las sucursales registradas
 @branches_bp.route("/branches/all", methods=["GET"])
+@solo_lectura
+@con_etag(lambda: ["sucursales"])
 def get_all_branches():
     try:
         sucursales = db.session.query(Sucursal).all()
@@ -29,6 +46,7 @@ def get_all_branches():
         }), 500
 
 #Ruta para crear stock de un producto en una sucursal
+#Con ?solo_modificados=true la respuesta incluye únicamente las filas de stock afectadas
 @branches_bp.route("/branches/<int:sucursal_id>/stock/add", methods=["POST"])
 def branch_add_stock(sucursal_id):
     try:
@@ -42,64 +60,45 @@ def branch_add_stock(sucursal_id):
             }), 400
 
         #Se busca la sucursal en la base de datos
-        sucursal = db.session.query(Sucursal).get(sucursal_id)
+        sucursal = db.session.get(Sucursal, sucursal_id)
         if not sucursal:
             return jsonify({"message": "Sucursal no encontrada"}), 404
 
-        #Se procesa cada producto
-        for item in data:
-            #Validación de campos requeridos
-            if not all(key in item for key in ["Código del producto", "Cantidad"]):
-                return jsonify({
-                    "message": "Faltan campos requeridos",
-                    "error": "Cada producto debe tener Código del producto y Cantidad"
-                }), 400
-            
-            try:
-                cantidad = int(item["Cantidad"])
-                if cantidad <= 0:
-                    return jsonify({
-                        "message": "Cantidad inválida",
-                        "error": "La cantidad debe ser un número entero"
-                    }), 400
-            except ValueError:
-                return jsonify({
-                    "message": "Valor inválido",
-                    "error": "La cantidad debe ser un número"
-                }), 400
-
-            #Se busca el producto
-            producto = db.session.query(Producto).filter_by(codigo_producto=item['Código del producto']).first()
-            if not producto:
-                return jsonify({
-                    "message": f"Producto {item['Codigo del producto']} no encontrado",
-                    "error": "Producto no existe"
-                    }), 404
-
-            #Actualizar o crear stock
-            stock = db.session.query(Stock).filter_by(producto_id=producto.id, sucursal_id=sucursal_id).first()
-            if stock:
-                stock.cantidad += cantidad
-            else:
-                stock = Stock(
-                producto_id=producto.id, 
-                sucursal_id=sucursal_id, 
-                cantidad=cantidad
-                )
-                db.session.add(stock)
-                
+        #Se validan todos los productos antes de tocar la base de datos
+        cantidades, error = _cantidades_por_codigo(data)
+        if error:
+            return error
+
+        productos, error = _ids_productos(cantidades)
+        if error:
+            return error
+
+        #Actualizar o crear stock con un único INSERT ... ON CONFLICT DO UPDATE,
+        #de modo que el incremento lo calcula SQLite sin cargar las filas existentes
+        db.session.execute(SUMA_STOCK, parametros_suma(sucursal_id, productos, cantidades))
+
         #Se guardan los cambios
         db.session.commit()
+        notificar_cambio_stock()
+
+        #Obtener el stock actualizado (toda la sucursal o, con ?solo_modificados=true, sólo las filas afectadas)
+        consulta = db.session.query(Producto.codigo_producto, Producto.nombre, Stock.cantidad).join(
+            Stock, Stock.producto_id == Producto.id
+        ).filter(Stock.sucursal_id == sucursal_id)
+
+        if request.args.get("solo_modificados", default=False, type=es_verdadero):
+            filas = []
+            for lote in en_lotes(productos.values()):
+                filas.extend(consulta.filter(Stock.producto_id.in_(lote)).order_by(Stock.id).all())
+        else:
+            filas = consulta.order_by(Stock.id).all()
 
-        #Obtener el stock actualizado
-        stocks = db.session.query(Stock).filter_by(sucursal_id=sucursal_id).all()
         resultado = []
-        for stock in stocks:
-            producto = db.session.query(Producto).get(stock.producto_id)
+        for codigo_producto, nombre, cantidad in filas:
             resultado.append({
-                "Código del producto": producto.codigo_producto,
-                "Nombre": producto.nombre,
-                "Cantidad": stock.cantidad
+                "Código del producto": codigo_producto,
+                "Nombre": nombre,
+                "Cantidad": cantidad
             })
 
         return jsonify({
@@ -113,49 +112,226 @@ def branch_add_stock(sucursal_id):
             "error": str(e)
         }), 500
 
+#Ruta para registrar una venta: descuenta de la sucursal las cantidades de una lista de productos
+#Cada descuento es un UPDATE condicional (cantidad >= pedida) que calcula SQLite sin cargar la fila,
+#por lo que ventas simultáneas desde varias cajas no pierden actualizaciones ni dejan stock negativo.
+#La venta es atómica: si algún producto no tiene stock suficiente no se descuenta nada (409).
+@branches_bp.route("/branches/<int:sucursal_id>/stock/sell", methods=["POST"])
+def branch_sell_stock(sucursal_id):
+    try:
+        data = request.get_json(silent=True)
+        if not data or not isinstance(data, list):
+            return jsonify({
+                "message": "Se debe enviar una lista de productos",
+                "error": "Formato de datos incorrecto"
+            }), 400
+
+        cantidades, error = _cantidades_por_codigo(data)
+        if error:
+            return error
+
+        if not db.session.get(Sucursal, sucursal_id):
+            return jsonify({"message": "Sucursal no encontrada"}), 404
+
+        productos, error = _ids_productos(cantidades)
+        if error:
+            return error
+
+        restantes, insuficientes = descontar_stock(db.session, sucursal_id, productos, cantidades)
+        if insuficientes:
+            db.session.rollback()
+            return _stock_insuficiente(sucursal_id, productos, cantidades, insuficientes)
+
+        db.session.commit()
+        notificar_cambio_stock()
+
+        return jsonify({
+            "message": "Venta registrada correctamente",
+            "stock": [{"Código del producto": codigo, "Cantidad": restantes[codigo]} for codigo in cantidades]
+        }), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            "message": "Error interno en el servidor",
+            "error": str(e)
+        }), 500
+
+#Ruta para transferir stock de una sucursal a otra:
+#{"Sucursal destino": <id>, "Productos": [{"Código del producto": ..., "Cantidad": N}, ...]}
+#El descuento en el origen (condicional, como en una venta) y la suma en el destino (upsert) se hacen
+#en una sola transacción corta: o se mueve todo o no se mueve nada.
+@branches_bp.route("/branches/<int:sucursal_id>/stock/transfer", methods=["POST"])
+def branch_transfer_stock(sucursal_id):
+    try:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict) or not all(key in data for key in ["Sucursal destino", "Productos"]):
+            return jsonify({
+                "message": "Faltan campos requeridos",
+                "error": "Se debe enviar Sucursal destino y Productos"
+            }), 400
+
+        destino_id = data["Sucursal destino"]
+        if not isinstance(destino_id, int) or isinstance(destino_id, bool) or destino_id == sucursal_id:
+            return jsonify({
+                "message": "Sucursal destino inválida",
+                "error": "La sucursal destino debe ser el ID de otra sucursal"
+            }), 400
+
+        if not data["Productos"] or not isinstance(data["Productos"], list):
+            return jsonify({
+                "message": "Se debe enviar una lista de productos",
+                "error": "Formato de datos incorrecto"
+            }), 400
+
+        cantidades, error = _cantidades_por_codigo(data["Productos"])
+        if error:
+            return error
+
+        encontradas = db.session.query(Sucursal.id).filter(Sucursal.id.in_([sucursal_id, destino_id])).count()
+        if encontradas != 2:
+            return jsonify({"message": "Sucursal no encontrada"}), 404
+
+        productos, error = _ids_productos(cantidades)
+        if error:
+            return error
+
+        restantes, insuficientes = descontar_stock(db.session, sucursal_id, productos, cantidades)
+        if insuficientes:
+            db.session.rollback()
+            return _stock_insuficiente(sucursal_id, productos, cantidades, insuficientes)
+
+        db.session.execute(SUMA_STOCK, parametros_suma(destino_id, productos, cantidades))
+        db.session.commit()
+        notificar_cambio_stock()
+
+        en_destino = cantidades_por_codigo(db.session, destino_id, productos, list(cantidades))
+        return jsonify({
+            "message": "Transferencia realizada correctamente",
+            "stock": [
+                {
+                    "Código del producto": codigo,
+                    "Cantidad transferida": cantidades[codigo],
+                    "Cantidad en origen": restantes[codigo],
+                    "Cantidad en destino": en_destino[codigo]
+                }
+                for codigo in cantidades
+            ]
+        }), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            "message": "Error interno en el servidor",
+            "error": str(e)
+        }), 500
+
+#Respuesta 409 con las cantidades disponibles de los productos que no alcanzaron
+def _stock_insuficiente(sucursal_id, productos, cantidades, insuficientes):
+    disponibles = cantidades_por_codigo(db.session, sucursal_id, productos, insuficientes)
+    return jsonify({
+        "message": "Stock insuficiente",
+        "error": "No hay stock suficiente de algunos productos en la sucursal; no se modificó el stock",
+        "productos": [
+            {
+                "Código del producto": codigo,
+                "Cantidad solicitada": cantidades[codigo],
+                "Cantidad disponible": disponibles[codigo]
+            }
+            for codigo in insuficientes
+        ]
+    }), 409
+
+#Valida una lista de productos con Código del producto y Cantidad, sumando las cantidades de los
+#códigos que vengan repetidos; devuelve (cantidades por código, respuesta de error)
+def _cantidades_por_codigo(data):
+    cantidades = {}
+    for item in data:
+        #Validación de campos requeridos
+        if not isinstance(item, dict) or not all(key in item for key in ["Código del producto", "Cantidad"]):
+            return None, (jsonify({
+                "message": "Faltan campos requeridos",
+                "error": "Cada producto debe tener Código del producto y Cantidad"
+            }), 400)
+
+        try:
+            cantidad = int(item["Cantidad"])
+            if cantidad <= 0:
+                return None, (jsonify({
+                    "message": "Cantidad inválida",
+                    "error": "La cantidad debe ser un número entero"
+                }), 400)
+        except (ValueError, TypeError):
+            return None, (jsonify({
+                "message": "Valor inválido",
+                "error": "La cantidad debe ser un número"
+            }), 400)
+
+        codigo = item["Código del producto"]
+        cantidades[codigo] = cantidades.get(codigo, 0) + cantidad
+    return cantidades, None
+
+#Resuelve los ids de los productos con consultas IN (una por lote) en lugar de una consulta por producto;
+#devuelve (ids por código, respuesta de error si algún código no existe)
+def _ids_productos(codigos):
+    productos, faltantes = ids_productos(db.session, codigos)
+    if faltantes:
+        return None, (jsonify({
+            "message": f"Producto {faltantes[0]} no encontrado",
+            "error": "Producto no existe",
+            "codigos_no_encontrados": faltantes
+            }), 404)
+    return productos, None
+
 #Ruta para obtener todo el stock de una sucursal
+#Filtros opcionales: ?codigos=COD1,COD2 para limitar a ciertos productos y ?disponible=true para omitir stock en cero
+#Con Accept: application/x-protobuf responde mensajes BranchStock length-delimited (cuerpo vacío si no hay stock)
+#?fields= y ?precio= limitan los campos y los precios de cada producto, como en /products/all
 @branches_bp.route("/branches/<int:sucursal_id>/stock/all", methods=["GET"])
+@solo_lectura
+@con_etag(lambda sucursal_id: ["sucursales", "productos", f"stock:{sucursal_id}"])
 def branch_get_stock(sucursal_id):
     try:
+        proyeccion, error = leer_proyeccion()
+        if error:
+            return error
+
         #Buscar la sucursal en la base de datos
-        sucursal = db.session.query(Sucursal).get(sucursal_id)
+        sucursal = db.session.get(Sucursal, sucursal_id)
         if not sucursal:
             return jsonify({
                 "message": "Sucursal no encontrada",
                 "error": f"Sucursal con ID {sucursal_id} no existe"
                 }), 404
         
-        #Obtener el stock de la sucursal
-        stock_items = db.session.query(Stock).filter_by(sucursal_id=sucursal_id).all()
-        if not stock_items:
-            return jsonify({
+        #Obtener el stock de la sucursal junto con sus productos y precios en una sola consulta (JOIN + LEFT JOIN),
+        #serializado directamente desde las filas (services/serializers.py)
+        consulta = select(*COLUMNAS_STOCK).join(Producto, Producto.id == Stock.producto_id).where(
+            Stock.sucursal_id == sucursal_id
+        )
+
+        codigos = request.args.get("codigos")
+        if codigos:
+            lista_codigos = [codigo.strip() for codigo in codigos.split(",") if codigo.strip()]
+            consulta = consulta.where(Producto.codigo_producto.in_(lista_codigos))
+
+        if request.args.get("disponible", default=False, type=es_verdadero):
+            consulta = consulta.where(Stock.cantidad > 0)
+
+        filas = db.session.execute(stock_con_precios(consulta, Stock.id, precio=proyeccion.precio))
+        resultado = list(stock_json(filas, proyeccion=proyeccion))
+        if acepta_protobuf():
+            return respuesta_protobuf(stock_pb(item, sucursal_id) for item in resultado), 200
+
+        if not resultado:
+            return variar_por_accept(jsonify({
                 "message": "No hay stock registrado en esta sucursal",
                 "sucursal": {
                     "id": sucursal.id,
                     "nombre": sucursal.nombre,
                     "direccion": sucursal.direccion
                 }
-            }), 200
+            })), 200
         
-        #Mostrar una respuesta con la información detallada    
-        resultado = []
-        for stock in stock_items:
-            producto = db.session.query(Producto).get(stock.producto_id)
-            precios = [{"Fecha": p.fecha.isoformat(), "Valor": p.valor} for p in producto.precios]
-
-            resultado.append({
-                "producto": {
-                    "Código del producto": producto.codigo_producto,
-                    "Nombre": producto.nombre,
-                    "Marca": producto.marca,
-                    "Precio": precios
-                },
-                "stock": {
-                    "Cantidad": stock.cantidad
-                }
-            })
-        
-        return jsonify({
+        return variar_por_accept(jsonify({
             "message": "Stock obtenido exitósamente",
             "sucursal": {
                 "id": sucursal.id,
@@ -163,6 +339,81 @@ def branch_get_stock(sucursal_id):
                 "direccion": sucursal.direccion
             },
             "stock": resultado
+        })), 200
+    except Exception as e:
+        return jsonify({
+            "message": "Error interno en el servidor",
+            "error": str(e)
+        }), 500
+
+#Ruta para sincronizar el stock de una sucursal de forma incremental (libro de movimientos, ver migrations/v007_movimientos_stock.py)
+#- Sin cursor: todo el stock de la sucursal ("completo": true) y el cursor desde el cual pedir cambios
+#- ?since=<cursor>: productos cuyo stock cambió después del cursor, cada uno una vez con su cantidad vigente
+#  (0 y "eliminado": true si la fila de stock ya no existe), de a ?limit=N
+#El cliente guarda "siguiente_cursor" para la próxima consulta. Si el cursor es anterior a los movimientos ya
+#compactados responde 410 y el cliente debe volver a empezar sin cursor.
+#El ETag depende también de los productos (la respuesta incluye sus códigos) y del mantenimiento del libro
+#(compactar-stock puede dejar vencido el cursor o agregar ajustes)
+@branches_bp.route("/branches/<int:sucursal_id>/stock/changes", methods=["GET"])
+@solo_lectura
+@con_etag(lambda sucursal_id: ["sucursales", "productos", f"stock:{sucursal_id}", CLAVE_VERSION])
+def branch_stock_changes(sucursal_id):
+    try:
+        if not db.session.get(Sucursal, sucursal_id):
+            return jsonify({
+                "message": "Sucursal no encontrada",
+                "error": f"Sucursal con ID {sucursal_id} no existe"
+                }), 404
+
+        desde = request.args.get("since")
+        if desde is not None and not desde.isdigit():
+            return jsonify({
+                "message": "Cursor inválido",
+                "error": "since debe ser un número recibido en siguiente_cursor"
+            }), 400
+
+        limite = request.args.get("limit", default=LIMITE_CAMBIOS_POR_DEFECTO, type=int)
+        if limite <= 0 or limite > LIMITE_CAMBIOS_MAXIMO:
+            return jsonify({
+                "message": "Límite inválido",
+                "error": f"El límite debe estar entre 1 y {LIMITE_CAMBIOS_MAXIMO}"
+            }), 400
+
+        if desde is None:
+            #El cursor se lee antes que el stock: un cambio posterior se volverá a recibir con el cursor
+            cursor = ultimo_movimiento(db.session)
+            filas = db.session.execute(consulta_stock_actual(sucursal_id)).all()
+            return jsonify({
+                "sucursal": sucursal_id,
+                "completo": True,
+                "cambios": [
+                    {"Código del producto": codigo, "Cantidad": cantidad, "eliminado": False}
+                    for codigo, cantidad in filas
+                ],
+                "siguiente_cursor": cursor,
+                "hay_mas": False
+            }), 200
+
+        desde = int(desde)
+        if desde < marca(db.session, "compactado"):
+            return jsonify({
+                "message": "Cursor vencido",
+                "error": "Los movimientos posteriores a ese cursor ya se compactaron; sincronizar de nuevo sin cursor"
+            }), 410
+
+        #Se pide un cambio extra para saber si quedan más
+        filas = db.session.execute(consulta_cambios_stock(sucursal_id, desde, limite + 1)).all()
+        hay_mas = len(filas) > limite
+        filas = filas[:limite]
+        return jsonify({
+            "sucursal": sucursal_id,
+            "completo": False,
+            "cambios": [
+                {"Código del producto": codigo, "Cantidad": cantidad or 0, "eliminado": cantidad is None}
+                for _, codigo, cantidad in filas
+            ],
+            "siguiente_cursor": filas[-1][0] if filas else desde,
+            "hay_mas": hay_mas
         }), 200
     except Exception as e:
         return jsonify({
@@ -170,70 +421,187 @@ def branch_get_stock(sucursal_id):
             "error": str(e)
         }), 500
 
+#Ruta para consultar en qué sucursales hay stock de uno o varios productos, con el total de toda la red
+#- GET ?codigos=COD1,COD2&minimo=N: sucursales con al menos N unidades (por defecto 1) de cada producto
+#- POST con un carrito [{"Código del producto": ..., "Cantidad": N}, ...]: el mínimo de cada producto es su cantidad
+#La respuesta indica también qué sucursales pueden abastecer todos los productos pedidos.
+#Se resuelve con una sola consulta GROUP BY sobre stock y sucursales, en lugar de recorrer /branches/<id>/stock/all.
+@branches_bp.route("/branches/stock/availability", methods=["GET", "POST"])
+@solo_lectura
+def branch_stock_availability():
+    try:
+        if request.method == "POST":
+            minimos, error = _minimos_carrito(request.get_json(silent=True))
+        else:
+            minimos, error = _minimos_codigos()
+        if error:
+            return error
+
+        if len(minimos) > TAMANO_LOTE_SQL:
+            return jsonify({
+                "message": "Demasiados productos",
+                "error": f"Se pueden consultar hasta {TAMANO_LOTE_SQL} productos por petición"
+            }), 400
+
+        #Cantidad por producto y sucursal, total de la red (función de ventana sobre el GROUP BY)
+        #y si la sucursal alcanza el mínimo pedido para ese producto. Los productos sin stock
+        #aparecen una vez con sucursal nula gracias a los LEFT JOIN.
+        cantidad = func.coalesce(func.sum(Stock.cantidad), 0)
+        filas = db.session.query(
+            Producto.codigo_producto,
+            Sucursal.id,
+            Sucursal.nombre,
+            cantidad,
+            func.sum(cantidad).over(partition_by=Producto.id),
+            cantidad >= case(minimos, value=Producto.codigo_producto)
+        ).outerjoin(
+            Stock, Stock.producto_id == Producto.id
+        ).outerjoin(
+            Sucursal, Sucursal.id == Stock.sucursal_id
+        ).filter(
+            Producto.codigo_producto.in_(list(minimos))
+        ).group_by(Producto.id, Sucursal.id).order_by(Producto.id, Sucursal.id).all()
+
+        productos = {}
+        for codigo, sucursal_id, nombre_sucursal, cantidad_sucursal, total, alcanza in filas:
+            producto = productos.setdefault(codigo, {
+                "Código del producto": codigo,
+                "Cantidad mínima": minimos[codigo],
+                "Total": total,
+                "Sucursales": []
+            })
+            if sucursal_id is not None and alcanza:
+                producto["Sucursales"].append({
+                    "id": sucursal_id,
+                    "nombre": nombre_sucursal,
+                    "Cantidad": cantidad_sucursal
+                })
+
+        #Sucursales que alcanzan el mínimo de todos los productos pedidos
+        no_encontrados = [codigo for codigo in minimos if codigo not in productos]
+        completas = None
+        for producto in productos.values():
+            producto["Disponible"] = bool(producto["Sucursales"])
+            sucursales = {(sucursal["id"], sucursal["nombre"]) for sucursal in producto["Sucursales"]}
+            completas = sucursales if completas is None else completas & sucursales
+        if no_encontrados or completas is None:
+            completas = set()
+
+        return jsonify({
+            "productos": [productos[codigo] for codigo in minimos if codigo in productos],
+            "sucursales_con_todo": [{"id": id, "nombre": nombre} for id, nombre in sorted(completas)],
+            "codigos_no_encontrados": no_encontrados
+        }), 200
+    except Exception as e:
+        return jsonify({
+            "message": "Error interno en el servidor",
+            "error": str(e)
+        }), 500
+
+#Mínimos por producto desde ?codigos=COD1,COD2&minimo=N; devuelve (mínimos, respuesta de error)
+def _minimos_codigos():
+    codigos = [codigo.strip() for codigo in request.args.get("codigos", "").split(",") if codigo.strip()]
+    if not codigos:
+        return None, (jsonify({
+            "message": "Faltan códigos",
+            "error": "El parámetro codigos debe contener al menos un código de producto"
+        }), 400)
+
+    minimo = request.args.get("minimo", default=1, type=int)
+    if minimo < 0:
+        return None, (jsonify({
+            "message": "Cantidad inválida",
+            "error": "El mínimo no puede ser negativo"
+        }), 400)
+    return dict.fromkeys(codigos, minimo), None
+
+#Mínimos por producto desde un carrito (los códigos repetidos suman sus cantidades); devuelve (mínimos, respuesta de error)
+def _minimos_carrito(data):
+    if not isinstance(data, list) or not data:
+        return None, (jsonify({
+            "message": "Se debe enviar una lista de productos",
+            "error": "Formato de datos incorrecto"
+        }), 400)
+    return _cantidades_por_codigo(data)
+
+#Rutas para exportar el stock en streaming (?formato=ndjson|csv, por defecto ndjson), de una sucursal
+#o de todas. Las filas se leen por bloques (yield_per) y se envían a medida que se generan.
+#- NDJSON: una fila de stock por línea, con el mismo formato que /branches/<id>/stock/all (incluye precios)
+#- CSV: una fila por stock con los datos del producto y la cantidad (sin precios; ver /products/export)
+@branches_bp.route("/branches/stock/export", methods=["GET"])
+@branches_bp.route("/branches/<int:sucursal_id>/stock/export", methods=["GET"])
+@solo_lectura
+def branch_export_stock(sucursal_id=None):
+    formato = request.args.get("formato", default="ndjson")
+    if formato not in TIPOS_EXPORTACION:
+        return jsonify({
+            "message": "Formato no soportado",
+            "error": "El formato debe ser ndjson o csv"
+        }), 400
+
+    if sucursal_id is not None and not db.session.get(Sucursal, sucursal_id):
+        return jsonify({
+            "message": "Sucursal no encontrada",
+            "error": f"Sucursal con ID {sucursal_id} no existe"
+            }), 404
+
+    consulta = select(*COLUMNAS_STOCK).join(Producto, Stock.producto_id == Producto.id)
+    if sucursal_id is not None:
+        consulta = consulta.where(Stock.sucursal_id == sucursal_id)
+    if formato == "ndjson":
+        consulta = stock_con_precios(consulta, Stock.sucursal_id, Stock.id)
+    else:
+        consulta = consulta.order_by(Stock.sucursal_id, Stock.id)
+    consulta = consulta.execution_options(yield_per=current_app.config["EXPORT_BATCH_SIZE"])
+
+    def generar():
+        filas = db.session.execute(consulta)
+        if formato == "csv":
+            yield linea_csv(["Sucursal", "Código del producto", "Nombre", "Marca", "Cantidad"])
+            for fila in filas:
+                yield linea_csv([fila.sucursal_id, fila.codigo_producto, fila.nombre, fila.marca, fila.cantidad])
+            return
+
+        for stock in stock_json(filas, incluir_sucursal=True):
+            yield linea_ndjson(stock)
+
+    nombre = f"stock_sucursal_{sucursal_id}" if sucursal_id is not None else "stock"
+    return Response(
+        stream_with_context(generar()),
+        mimetype=TIPOS_EXPORTACION[formato],
+        headers={"Content-Disposition": f"attachment; filename={nombre}.{formato}"}
+    )
+
 # Ruta para monitorear stock bajo mediante SSE
+# Todos los clientes con el mismo umbral comparten un único monitor (services/stock_alerts.py),
+# que consulta la base de datos una vez por intervalo y envía sólo los cambios
 @branches_bp.route("/branches/stock-alerts", methods=["GET"])
 def stock_alerts():
     umbral = request.args.get('umbral', default=5, type=int)
+    app = current_app._get_current_object()
+    intervalo = current_app.config.get("STOCK_ALERTS_INTERVAL", 10)
+    heartbeat = current_app.config.get("STOCK_ALERTS_HEARTBEAT", 15)
     
     def generate():
         # Mensaje inicial de conexión
         yield f"data: {json.dumps({'message': 'Conexión de monitoreo establecida', 'umbral': umbral})}\n\n"
         
-        # Bucle principal para verificar stock periódicamente
+        monitor, cola = suscribir_monitor(app, umbral, intervalo)
         try:
             while True:
-                # Consultar productos con stock bajo en todas las sucursales
-                stocks_bajos = db.session.query(Stock, Producto, Sucursal).join(
-                    Producto, Stock.producto_id == Producto.id
-                ).join(
-                    Sucursal, Stock.sucursal_id == Sucursal.id
-                ).filter(Stock.cantidad < umbral).all()
-                
-                # Enviar información de diagnóstico
-                yield f"data: {json.dumps({
-                    'type': 'info', 
-                    'message': f'Verificación completada', 
-                    'productos_bajo_stock': len(stocks_bajos),
-                    'timestamp': datetime.now().isoformat()
-                })}\n\n"
-                
-                # Enviar alertas para cada producto con stock bajo
-                if stocks_bajos:
-                    for stock, producto, sucursal in stocks_bajos:
-                        data = {
-                            "message": "Stock Bajo",
-                            "producto": producto.nombre,
-                            "codigo": producto.codigo_producto,
-                            "sucursal": sucursal.nombre,
-                            "cantidad": stock.cantidad,
-                            "timestamp": datetime.now().isoformat()
-                        }
-                        yield f"data: {json.dumps(data)}\n\n"
-                else:
-                    # Notificar que no hay productos con stock bajo
-                    yield f"data: {json.dumps({
-                        'type': 'info',
-                        'message': 'No hay productos con stock bajo',
-                        'timestamp': datetime.now().isoformat()
-                    })}\n\n"
-                
-                # Heartbeat para mantener la conexión viva
-                yield f"data: {json.dumps({'type': 'heartbeat', 'timestamp': datetime.now().isoformat()})}\n\n"
-                
-                # Esperar antes de la siguiente verificación (reducido para pruebas)
-                time.sleep(10)  # Verificar cada 10 segundos
-                
-        except Exception as e:
-            # Enviar error si ocurre alguna excepción
-            error_data = {
-                "message": "Error en monitoreo",
-                "error": str(e),
-                "timestamp": datetime.now().isoformat()
-            }
-            yield f"data: {json.dumps(error_data)}\n\n"
+                try:
+                    evento = cola.get(timeout=heartbeat)
+                except queue.Empty:
+                    # Heartbeat para mantener la conexión viva cuando no hay cambios
+                    yield f"data: {json.dumps({'type': 'heartbeat', 'timestamp': datetime.now().isoformat()})}\n\n"
+                    continue
+                yield f"data: {json.dumps(evento)}\n\n"
+        finally:
+            # El cliente se desconectó
+            monitor.cancelar(cola)
     
     # Configurar los headers para SSE
-    response = Response(stream_with_context(generate()), mimetype="text/event-stream")
+    response = Response(generate(), mimetype="text/event-stream")
     response.headers['Cache-Control'] = 'no-cache'
     response.headers['Connection'] = 'keep-alive'
     response.headers['X-Accel-Buffering'] = 'no'  # Para servidores Nginx
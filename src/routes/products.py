@@ -1,16 +1,44 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
 from datetime import datetime
-from models import db
+from sqlalchemy import DateTime, bindparam, func, insert, or_, select, text, tuple_
+from models import db, solo_lectura
 from models.product import Producto
 from models.price import Precio
 from models.stock import Stock
+from services.stock_alerts import notificar_cambio_stock
+from services.product_cache import cache_productos
+from services.versiones import con_etag, version_de
+from services.product_changes import consulta_cambios
+from services.serializers import (
+    COLUMNAS_PRODUCTO, productos_con_precios, productos_json, cambios_json, leer_proyeccion,
+    acepta_protobuf, producto_pb, respuesta_protobuf, variar_por_accept
+)
+from utils import TAMANO_LOTE_SQL, TIPOS_EXPORTACION, es_verdadero, linea_csv, linea_ndjson
+import csv
+import io
+import json
+import re
 
 products_bp = Blueprint("products", __name__)
 
+#Tamaño de página para /products/all cuando se usa paginación
+LIMITE_PAGINA_POR_DEFECTO = 100
+LIMITE_PAGINA_MAXIMO = 1000
+
+#Cantidad de resultados de /products/search y máximo de palabras por búsqueda
+LIMITE_BUSQUEDA_POR_DEFECTO = 20
+LIMITE_BUSQUEDA_MAXIMO = 100
+PALABRAS_BUSQUEDA_MAXIMO = 10
+
 #Ruta para añadir un producto
+#La respuesta acepta ?fields= y ?precio= como las lecturas de productos (ver services/serializers.py)
 @products_bp.route("/products/add", methods=["POST"])
 def add_product():
     try:
+        proyeccion, error = leer_proyeccion()
+        if error:
+            return error
+
         data = request.get_json()
 
         #Validar que se hayan enviado todos los campos requeridos para añadir el producto
@@ -65,16 +93,17 @@ def add_product():
         db.session.add(nuevo_producto)
         db.session.commit()
 
-        precios = [{"Fecha": p.fecha.isoformat(), "Valor": p.valor} for p in nuevo_producto.precios]
+        resultado = {
+            "Código del producto": nuevo_producto.codigo_producto,
+            "Marca": nuevo_producto.marca,
+            "Código": nuevo_producto.codigo,
+            "Nombre": nuevo_producto.nombre,
+            "Precio": _precios_ordenados(nuevo_producto)
+        }
+        cache_productos.invalidar(nuevo_producto.codigo_producto)
         return jsonify({
             "message": "Producto añadido exitósamente",
-            "producto": {
-                "Código del producto": nuevo_producto.codigo_producto,
-                "Marca": nuevo_producto.marca,
-                "Código": nuevo_producto.codigo,
-                "Nombre": nuevo_producto.nombre,
-                "Precio": precios
-            }
+            "producto": proyeccion.aplicar(resultado)
         }), 201
     except Exception as e:
         db.session.rollback()
@@ -84,9 +113,14 @@ def add_product():
         }), 500
 
 #Ruta para actualizar un producto
+#La respuesta acepta ?fields= y ?precio= como las lecturas de productos (ver services/serializers.py)
 @products_bp.route("/products/update/<codigo>", methods=["PUT"])
 def update_product(codigo):
     try:
+        proyeccion, error = leer_proyeccion()
+        if error:
+            return error
+
         data = request.get_json()
 
         #Validar que se hayan enviado datos para actualizar el producto
@@ -140,16 +174,17 @@ def update_product(codigo):
         #Guarda el producto actualizado
         db.session.commit()
 
-        precios = [{"Fecha": p.fecha.isoformat(), "Valor": p.valor} for p in producto.precios]
+        resultado = {
+            "Código del producto": producto.codigo_producto,
+            "Marca": producto.marca,
+            "Código": producto.codigo,
+            "Nombre": producto.nombre,
+            "Precio": _precios_ordenados(producto)
+        }
+        cache_productos.invalidar(codigo, producto.codigo_producto)
         return jsonify({
             "message": "Producto actualizado exitósamente",
-            "producto": {
-                "Código del producto": producto.codigo_producto,
-                "Marca": producto.marca,
-                "Código": producto.codigo,
-                "Nombre": producto.nombre,
-                "Precio": precios
-            }
+            "producto": proyeccion.aplicar(resultado)
         }), 200
     except Exception as e:
         db.session.rollback()
@@ -178,6 +213,8 @@ def delete_product(codigo):
         #Se hace la eliminación del producto y se guardan los cambios en la base de datos
         db.session.delete(producto)
         db.session.commit()
+        cache_productos.invalidar(codigo)
+        notificar_cambio_stock()
 
         return jsonify({"message": "Producto eliminado exitosamente"}), 200
     except Exception as e:
@@ -188,45 +225,779 @@ def delete_product(codigo):
             }), 500
 
 #Ruta para obtener todos los productos
+#Acepta paginación por cursor (keyset) sobre el código del producto: ?limit=N&cursor=<último código recibido>
+#Con Accept: application/x-protobuf responde mensajes ProductPrices length-delimited (ver services/serializers.py);
+#en ese caso el cursor de la página siguiente se envía en la cabecera X-Siguiente-Cursor
+#?fields=nombre,marca,codigo,precio limita los campos de cada producto y ?precio=actual|historial|none los precios
+#(sólo el último, todos o ninguno; ver Proyeccion en services/serializers.py)
 @products_bp.route("/products/all", methods=["GET"])
+@solo_lectura
+@con_etag(lambda: ["productos"])
 def get_all_products():
     try:
-        productos = db.session.query(Producto).all()
-        result = []
-        for producto in productos:
-            precios = [{"Fecha": p.fecha.isoformat(), "Valor": p.valor} for p in producto.precios]
-            result.append({
-                "Código del producto": producto.codigo_producto,
-                "Marca": producto.marca,
-                "Código": producto.codigo,
-                "Nombre": producto.nombre,
-                "Precio": precios
-            })
-        return jsonify(result), 200
+        proyeccion, error = leer_proyeccion()
+        if error:
+            return error
+
+        limite = request.args.get("limit", type=int)
+        cursor = request.args.get("cursor")
+        paginado = limite is not None or cursor is not None
+
+        if paginado:
+            limite = limite if limite is not None else LIMITE_PAGINA_POR_DEFECTO
+            if limite <= 0 or limite > LIMITE_PAGINA_MAXIMO:
+                return jsonify({
+                    "message": "Límite inválido",
+                    "error": f"El límite debe estar entre 1 y {LIMITE_PAGINA_MAXIMO}"
+                }), 400
+
+        #Productos y precios en una sola consulta (LEFT JOIN sobre la página de productos),
+        #serializados directamente desde las filas (services/serializers.py)
+        consulta = select(*COLUMNAS_PRODUCTO).order_by(Producto.codigo_producto)
+        if paginado:
+            if cursor:
+                consulta = consulta.where(Producto.codigo_producto > cursor)
+            #Se pide un elemento extra para saber si existe una página siguiente
+            consulta = consulta.limit(limite + 1)
+
+        filas = db.session.execute(productos_con_precios(consulta, proyeccion.precio))
+        result = list(productos_json(filas, proyeccion))
+        if paginado:
+            hay_mas = len(result) > limite
+            result = result[:limite]
+
+        siguiente_cursor = result[-1]["Código del producto"] if paginado and hay_mas else None
+        if acepta_protobuf():
+            respuesta = respuesta_protobuf(producto_pb(producto) for producto in result)
+            if siguiente_cursor:
+                respuesta.headers["X-Siguiente-Cursor"] = siguiente_cursor
+            return respuesta, 200
+
+        if not paginado:
+            return variar_por_accept(jsonify(result)), 200
+
+        return variar_por_accept(jsonify({
+            "productos": result,
+            "siguiente_cursor": siguiente_cursor
+        })), 200
     except Exception as e:
         return jsonify({
             "message": "Error interno en el servidor",
             "error": str(e) 
         }), 500
 
+#Ruta para la sincronización incremental del catálogo: productos creados, modificados o eliminados después
+#del cursor ?since=<secuencia> (0 o sin cursor: todo el catálogo), en el orden en que cambiaron y de a ?limit=N.
+#Cada producto aparece una sola vez con su estado actual; los eliminados sólo con su código y "eliminado": true.
+#El cliente guarda "siguiente_cursor" para la próxima consulta; "hay_mas" indica que hay más cambios pendientes.
+#Los cambios se registran con triggers (migrations/v006_cambios_productos.py), incluidos los hechos por gRPC.
+@products_bp.route("/products/changes", methods=["GET"])
+@solo_lectura
+@con_etag(lambda: ["productos"])
+def get_product_changes():
+    try:
+        desde = request.args.get("since", default="0")
+        if not desde.isdigit():
+            return jsonify({
+                "message": "Cursor inválido",
+                "error": "since debe ser un número de secuencia recibido en siguiente_cursor"
+            }), 400
+        desde = int(desde)
+
+        limite = request.args.get("limit", default=LIMITE_PAGINA_POR_DEFECTO, type=int)
+        if limite <= 0 or limite > LIMITE_PAGINA_MAXIMO:
+            return jsonify({
+                "message": "Límite inválido",
+                "error": f"El límite debe estar entre 1 y {LIMITE_PAGINA_MAXIMO}"
+            }), 400
+
+        #Se pide un cambio extra para saber si quedan más
+        cambios = list(cambios_json(db.session.execute(consulta_cambios(desde, limite + 1))))
+        hay_mas = len(cambios) > limite
+        cambios = cambios[:limite]
+
+        return jsonify({
+            "cambios": cambios,
+            "siguiente_cursor": cambios[-1]["secuencia"] if cambios else desde,
+            "hay_mas": hay_mas
+        }), 200
+    except Exception as e:
+        return jsonify({
+            "message": "Error interno en el servidor",
+            "error": str(e)
+        }), 500
+
 #Ruta para obtener un producto por su código
+#Las respuestas se guardan serializadas en la caché de productos (services/product_cache.py) junto con la
+#versión 'productos' del ETag, y sólo se responden desde la caché mientras esa versión siga vigente
+#Con Accept: application/x-protobuf responde un mensaje ProductPrices length-delimited
+#Acepta ?fields= y ?precio= como /products/all: con otra proyección la respuesta se arma desde la caché si el
+#producto está guardado y, si no, se consulta sólo lo pedido (sin guardarlo en la caché)
 @products_bp.route("/products/product/<codigo>", methods=["GET"])
+@solo_lectura
+@con_etag(lambda codigo: ["productos"])
 def get_product(codigo):
     try:
-        producto = db.session.query(Producto).filter_by(codigo_producto=codigo).first()
+        proyeccion, error = leer_proyeccion()
+        if error:
+            return error
+
+        version = version_de("productos")
+        cuerpo = cache_productos.obtener(codigo, version)
+        if cuerpo is not None:
+            if not proyeccion.completa:
+                cuerpo = _serializar_producto(proyeccion.aplicar(current_app.json.loads(cuerpo)))
+            return _respuesta_producto(cuerpo, "HIT"), 200
+
+        consulta = select(*COLUMNAS_PRODUCTO).where(Producto.codigo_producto == codigo)
+        filas = db.session.execute(productos_con_precios(consulta, proyeccion.precio))
+        producto = next(productos_json(filas, proyeccion), None)
         if not producto:
             return jsonify({"message": "Producto no encontrado"}), 404
-        
-        precios = [{"Fecha": p.fecha.isoformat(), "Valor": p.valor} for p in producto.precios]
+
+        cuerpo = _guardar_en_cache(producto, version) if proyeccion.completa else _serializar_producto(producto)
+        return _respuesta_producto(cuerpo, "MISS"), 200
+    except Exception as e:
         return jsonify({
-            "Código del producto": producto.codigo_producto,
-            "Marca": producto.marca,
-            "Código": producto.codigo,
-            "Nombre": producto.nombre,
-            "Precio": precios
+            "message": "Error interno en el servidor",
+            "error": str(e)
+        }), 500
+
+#Rutas para obtener varios productos por código en una sola petición (por ejemplo todos los de un carrito):
+#- GET ?codigos=COD1,COD2
+#- POST con la lista de códigos ["COD1", "COD2", ...]
+#Responde {"productos": {código: producto o null si no existe}, "no_encontrados": [...]} con el formato de
+#/products/product/<codigo> (acepta ?fields= y ?precio=). Los productos que están en la caché se responden desde
+#ella y el resto se lee con una sola consulta (IN sobre el código y LEFT JOIN con los precios).
+@products_bp.route("/products/batch", methods=["GET"])
+@solo_lectura
+@con_etag(lambda: ["productos"])
+def get_products_batch():
+    try:
+        codigos = [codigo.strip() for codigo in request.args.get("codigos", "").split(",") if codigo.strip()]
+        return _productos_por_codigo(codigos)
+    except Exception as e:
+        return jsonify({
+            "message": "Error interno en el servidor",
+            "error": str(e)
+        }), 500
+
+@products_bp.route("/products/batch", methods=["POST"])
+@solo_lectura
+def post_products_batch():
+    try:
+        data = request.get_json(silent=True)
+        if not isinstance(data, list) or not all(isinstance(codigo, str) for codigo in data):
+            return jsonify({
+                "message": "Se debe enviar una lista de códigos de producto",
+                "error": "Formato de datos incorrecto"
+            }), 400
+        return _productos_por_codigo([codigo.strip() for codigo in data if codigo.strip()])
+    except Exception as e:
+        return jsonify({
+            "message": "Error interno en el servidor",
+            "error": str(e)
+        }), 500
+
+#Respuesta de /products/batch para una lista de códigos (los repetidos se responden una vez)
+def _productos_por_codigo(codigos):
+    proyeccion, error = leer_proyeccion()
+    if error:
+        return error
+
+    codigos = list(dict.fromkeys(codigos))
+    if not codigos:
+        return jsonify({
+            "message": "Faltan códigos",
+            "error": "Se debe enviar al menos un código de producto"
+        }), 400
+    if len(codigos) > TAMANO_LOTE_SQL:
+        return jsonify({
+            "message": "Demasiados productos",
+            "error": f"Se pueden consultar hasta {TAMANO_LOTE_SQL} productos por petición"
+        }), 400
+
+    #La versión se lee antes que los productos (ver services/product_cache.py)
+    version = version_de("productos")
+    productos = {}
+    for codigo in codigos:
+        cuerpo = cache_productos.obtener(codigo, version)
+        if cuerpo is not None:
+            productos[codigo] = proyeccion.aplicar(current_app.json.loads(cuerpo))
+
+    faltantes = [codigo for codigo in codigos if codigo not in productos]
+    if faltantes:
+        consulta = select(*COLUMNAS_PRODUCTO).where(Producto.codigo_producto.in_(faltantes))
+        filas = db.session.execute(productos_con_precios(consulta, proyeccion.precio))
+        for producto in productos_json(filas, proyeccion):
+            if proyeccion.completa:
+                _guardar_en_cache(producto, version)
+            productos[producto["Código del producto"]] = producto
+
+    return jsonify({
+        "productos": {codigo: productos.get(codigo) for codigo in codigos},
+        "no_encontrados": [codigo for codigo in codigos if codigo not in productos]
+    }), 200
+
+#Ruta para consultar las estadísticas de la caché de productos (aciertos, fallos, desalojos...)
+@products_bp.route("/products/cache/stats", methods=["GET"])
+def get_product_cache_stats():
+    return jsonify(cache_productos.estadisticas()), 200
+
+#Serializa un producto igual que jsonify
+def _serializar_producto(producto):
+    return f"{current_app.json.dumps(producto)}\n"
+
+#Serializa un producto y lo guarda en la caché con la versión leída antes de consultarlo; devuelve el cuerpo serializado
+def _guardar_en_cache(producto, version):
+    cuerpo = _serializar_producto(producto)
+    cache_productos.guardar(producto["Código del producto"], cuerpo, version)
+    return cuerpo
+
+#Precios de un producto ordenados por fecha, en el mismo orden que las consultas (el último es el precio actual)
+def _precios_ordenados(producto):
+    return [
+        {"Fecha": p.fecha.isoformat(), "Valor": p.valor}
+        for p in sorted(producto.precios, key=lambda p: (p.fecha, p.id))
+    ]
+
+#Respuesta de un producto a partir del cuerpo JSON guardado en la caché, en JSON o protobuf según el Accept
+def _respuesta_producto(cuerpo, estado_cache):
+    if acepta_protobuf():
+        respuesta = respuesta_protobuf([producto_pb(current_app.json.loads(cuerpo))])
+    else:
+        respuesta = variar_por_accept(current_app.response_class(cuerpo, mimetype=current_app.json.mimetype))
+    respuesta.headers["X-Cache"] = estado_cache
+    return respuesta
+
+#Ruta para buscar productos por nombre, marca o código con el índice de texto completo (FTS5, ver migrations/v005_busqueda.py)
+#?q=<texto>: cada palabra se busca como prefijo y todas deben aparecer ("mart tru" encuentra "Martillo Truper")
+#Los resultados se ordenan por relevancia y se limitan con ?limit=N. Opcionalmente incluyen el precio vigente
+#(?precio=true) y el stock (?stock=true), total de todas las sucursales o de una sola con ?sucursal=<id>.
+@products_bp.route("/products/search", methods=["GET"])
+@solo_lectura
+def search_products():
+    try:
+        consulta_fts = _consulta_fts(request.args.get("q", ""))
+        if not consulta_fts:
+            return jsonify({
+                "message": "Falta el texto a buscar",
+                "error": "El parámetro q debe contener al menos una palabra"
+            }), 400
+
+        limite = request.args.get("limit", default=LIMITE_BUSQUEDA_POR_DEFECTO, type=int)
+        if limite <= 0 or limite > LIMITE_BUSQUEDA_MAXIMO:
+            return jsonify({
+                "message": "Límite inválido",
+                "error": f"El límite debe estar entre 1 y {LIMITE_BUSQUEDA_MAXIMO}"
+            }), 400
+
+        incluir_precio = request.args.get("precio", default=False, type=es_verdadero)
+        incluir_stock = request.args.get("stock", default=False, type=es_verdadero)
+        sucursal_id = request.args.get("sucursal", type=int)
+        parametros = {"consulta": consulta_fts, "limite": limite}
+
+        #FTS5 resuelve la búsqueda, el orden y el límite sobre el índice; después se leen sólo esas filas
+        columnas = ["p.codigo_producto", "p.marca", "p.codigo", "p.nombre", "r.rank"]
+        uniones = ""
+        if incluir_precio:
+            #El precio vigente es el último con fecha anterior o igual a ahora (una fila del índice por producto)
+            columnas += ["pr.fecha", "pr.valor"]
+            uniones = """
+                LEFT JOIN precios pr ON pr.id = (
+                    SELECT id FROM precios WHERE producto_id = p.id AND fecha <= :ahora
+                    ORDER BY fecha DESC, id DESC LIMIT 1
+                )"""
+            parametros["ahora"] = datetime.now()
+        if incluir_stock:
+            filtro_sucursal = " AND sucursal_id = :sucursal_id" if sucursal_id is not None else ""
+            columnas.append(f"(SELECT COALESCE(SUM(cantidad), 0) FROM stock WHERE producto_id = p.id{filtro_sucursal})")
+            if sucursal_id is not None:
+                parametros["sucursal_id"] = sucursal_id
+
+        consulta = text(f"""
+            SELECT {", ".join(columnas)}
+            FROM (
+                SELECT rowid, rank FROM productos_fts
+                WHERE productos_fts MATCH :consulta
+                ORDER BY rank LIMIT :limite
+            ) r
+            JOIN productos p ON p.id = r.rowid{uniones}
+            ORDER BY r.rank
+        """)
+        if incluir_precio:
+            consulta = consulta.bindparams(bindparam("ahora", type_=DateTime))
+        filas = db.session.execute(consulta, parametros).all()
+
+        resultado = []
+        for fila in filas:
+            producto = {
+                "Código del producto": fila[0],
+                "Marca": fila[1],
+                "Código": fila[2],
+                "Nombre": fila[3],
+                "Relevancia": round(-fila[4], 4)
+            }
+            if incluir_precio:
+                fecha, valor = fila[5], fila[6]
+                producto["Precio actual"] = {
+                    "Fecha": datetime.fromisoformat(str(fecha)).isoformat(),
+                    "Valor": valor
+                } if fecha is not None else None
+            if incluir_stock:
+                producto["Stock"] = fila[-1]
+            resultado.append(producto)
+
+        return jsonify({"resultados": resultado}), 200
+    except Exception as e:
+        return jsonify({
+            "message": "Error interno en el servidor",
+            "error": str(e)
+        }), 500
+
+#Convierte el texto del usuario en una consulta FTS5: cada palabra entre comillas (para que los
+#caracteres especiales de FTS5 no se interpreten) y con * para buscarla como prefijo
+def _consulta_fts(texto):
+    palabras = re.findall(r"\w+", texto)[:PALABRAS_BUSQUEDA_MAXIMO]
+    return " ".join(f'"{palabra}"*' for palabra in palabras)
+
+#Ruta para obtener el historial de precios de un producto
+#Filtros opcionales: ?from=<fecha ISO>&to=<fecha ISO>, y paginación con ?limit=N&cursor=<siguiente_cursor>
+@products_bp.route("/products/product/<codigo>/precios", methods=["GET"])
+@solo_lectura
+@con_etag(lambda codigo: ["productos"])
+def get_product_prices(codigo):
+    try:
+        desde, hasta, error = _rango_fechas()
+        if error:
+            return error
+
+        limite = request.args.get("limit", default=LIMITE_PAGINA_POR_DEFECTO, type=int)
+        if limite <= 0 or limite > LIMITE_PAGINA_MAXIMO:
+            return jsonify({
+                "message": "Límite inválido",
+                "error": f"El límite debe estar entre 1 y {LIMITE_PAGINA_MAXIMO}"
+            }), 400
+
+        producto_id = db.session.query(Producto.id).filter_by(codigo_producto=codigo).scalar()
+        if producto_id is None:
+            return jsonify({"message": "Producto no encontrado"}), 404
+
+        #Se recorre el índice (producto_id, fecha) en orden; el id desempata precios con la misma fecha
+        consulta = db.session.query(Precio.id, Precio.fecha, Precio.valor).filter(
+            Precio.producto_id == producto_id
+        ).order_by(Precio.fecha, Precio.id)
+        if desde:
+            consulta = consulta.filter(Precio.fecha >= desde)
+        if hasta:
+            consulta = consulta.filter(Precio.fecha <= hasta)
+
+        cursor = request.args.get("cursor")
+        if cursor:
+            try:
+                fecha_cursor, id_cursor = cursor.rsplit("|", 1)
+                fecha_cursor, id_cursor = datetime.fromisoformat(fecha_cursor), int(id_cursor)
+            except ValueError:
+                return jsonify({
+                    "message": "Cursor inválido",
+                    "error": "Use el valor de siguiente_cursor de la respuesta anterior"
+                }), 400
+            consulta = consulta.filter(tuple_(Precio.fecha, Precio.id) > (fecha_cursor, id_cursor))
+
+        #Se pide un elemento extra para saber si existe una página siguiente
+        filas = consulta.limit(limite + 1).all()
+        hay_mas = len(filas) > limite
+        filas = filas[:limite]
+
+        return jsonify({
+            "Código del producto": codigo,
+            "Precio": [{"Fecha": fecha.isoformat(), "Valor": valor} for _, fecha, valor in filas],
+            "siguiente_cursor": f"{filas[-1].fecha.isoformat()}|{filas[-1].id}" if hay_mas else None
+        }), 200
+    except Exception as e:
+        return jsonify({
+            "message": "Error interno en el servidor",
+            "error": str(e)
+        }), 500
+
+#Ruta para obtener el precio vigente de un producto en una fecha (?fecha=<fecha ISO>, por defecto ahora)
+@products_bp.route("/products/product/<codigo>/precio", methods=["GET"])
+@solo_lectura
+@con_etag(lambda codigo: ["productos"])
+def get_product_price_at(codigo):
+    try:
+        fecha = request.args.get("fecha")
+        try:
+            fecha = datetime.fromisoformat(fecha) if fecha else datetime.now()
+        except ValueError as e:
+            return jsonify({
+                "message": "Fecha inválida",
+                "error": str(e)
+            }), 400
+
+        producto_id = db.session.query(Producto.id).filter_by(codigo_producto=codigo).scalar()
+        if producto_id is None:
+            return jsonify({"message": "Producto no encontrado"}), 404
+
+        #El último precio con fecha anterior o igual a la pedida, leyendo una sola fila del índice
+        precio = db.session.query(Precio.fecha, Precio.valor).filter(
+            Precio.producto_id == producto_id,
+            Precio.fecha <= fecha
+        ).order_by(Precio.fecha.desc(), Precio.id.desc()).first()
+        if not precio:
+            return jsonify({
+                "message": "El producto no tenía precio en esa fecha",
+                "fecha": fecha.isoformat()
+            }), 404
+
+        return jsonify({
+            "Código del producto": codigo,
+            "Fecha consultada": fecha.isoformat(),
+            "Precio": {"Fecha": precio.fecha.isoformat(), "Valor": precio.valor}
         }), 200
     except Exception as e:
         return jsonify({
             "message": "Error interno en el servidor",
             "error": str(e)
-        }), 500
\ No newline at end of file
+        }), 500
+
+#Ruta para obtener mínimo, máximo, promedio y último precio, agrupados por producto o por marca
+#Parámetros opcionales: ?agrupar=producto|marca, ?marca=, ?codigos=COD1,COD2, ?from=, ?to=,
+#y paginación por el valor del grupo con ?limit=N&cursor=<siguiente_cursor>
+@products_bp.route("/products/precios/resumen", methods=["GET"])
+@solo_lectura
+@con_etag(lambda: ["productos"])
+def get_price_summary():
+    try:
+        desde, hasta, error = _rango_fechas()
+        if error:
+            return error
+
+        agrupar = request.args.get("agrupar", default="producto")
+        if agrupar not in ("producto", "marca"):
+            return jsonify({
+                "message": "Agrupación inválida",
+                "error": "agrupar debe ser producto o marca"
+            }), 400
+
+        limite = request.args.get("limit", default=LIMITE_PAGINA_POR_DEFECTO, type=int)
+        if limite <= 0 or limite > LIMITE_PAGINA_MAXIMO:
+            return jsonify({
+                "message": "Límite inválido",
+                "error": f"El límite debe estar entre 1 y {LIMITE_PAGINA_MAXIMO}"
+            }), 400
+
+        clave = Producto.codigo_producto if agrupar == "producto" else Producto.marca
+
+        #Precios filtrados, con el último valor de cada grupo calculado por una función de ventana
+        precios = db.session.query(
+            clave.label("clave"),
+            Precio.valor.label("valor"),
+            Precio.fecha.label("fecha"),
+            func.first_value(Precio.valor).over(
+                partition_by=clave,
+                order_by=(Precio.fecha.desc(), Precio.id.desc())
+            ).label("ultimo")
+        ).join(Producto, Precio.producto_id == Producto.id)
+
+        if request.args.get("marca"):
+            precios = precios.filter(Producto.marca == request.args["marca"])
+        if request.args.get("codigos"):
+            codigos = [codigo.strip() for codigo in request.args["codigos"].split(",") if codigo.strip()]
+            precios = precios.filter(Producto.codigo_producto.in_(codigos))
+        if desde:
+            precios = precios.filter(Precio.fecha >= desde)
+        if hasta:
+            precios = precios.filter(Precio.fecha <= hasta)
+        precios = precios.subquery()
+
+        #Agregados calculados por SQLite con un GROUP BY sobre la subconsulta
+        consulta = db.session.query(
+            precios.c.clave,
+            func.min(precios.c.valor),
+            func.max(precios.c.valor),
+            func.avg(precios.c.valor),
+            func.max(precios.c.ultimo),
+            func.max(precios.c.fecha),
+            func.count()
+        ).group_by(precios.c.clave).order_by(precios.c.clave)
+
+        cursor = request.args.get("cursor")
+        if cursor:
+            consulta = consulta.filter(precios.c.clave > cursor)
+
+        filas = consulta.limit(limite + 1).all()
+        hay_mas = len(filas) > limite
+        filas = filas[:limite]
+
+        nombre_clave = "Código del producto" if agrupar == "producto" else "Marca"
+        resultado = []
+        for valor_clave, minimo, maximo, promedio, ultimo, fecha_ultimo, cantidad in filas:
+            resultado.append({
+                nombre_clave: valor_clave,
+                "Mínimo": minimo,
+                "Máximo": maximo,
+                "Promedio": promedio,
+                "Último": ultimo,
+                "Fecha último": datetime.fromisoformat(str(fecha_ultimo)).isoformat(),
+                "Cantidad de precios": cantidad
+            })
+
+        return jsonify({
+            "resumen": resultado,
+            "siguiente_cursor": filas[-1][0] if hay_mas else None
+        }), 200
+    except Exception as e:
+        return jsonify({
+            "message": "Error interno en el servidor",
+            "error": str(e)
+        }), 500
+
+#Lee los parámetros ?from= y ?to= como fechas ISO; devuelve (desde, hasta, respuesta de error)
+def _rango_fechas():
+    try:
+        desde = datetime.fromisoformat(request.args["from"]) if request.args.get("from") else None
+        hasta = datetime.fromisoformat(request.args["to"]) if request.args.get("to") else None
+    except ValueError as e:
+        return None, None, (jsonify({
+            "message": "Fecha inválida",
+            "error": str(e)
+        }), 400)
+    return desde, hasta, None
+
+#Ruta para importar productos en masa desde un archivo NDJSON o CSV enviado como cuerpo de la petición
+#- NDJSON (Content-Type: application/x-ndjson): un producto por línea, con el mismo formato que /products/add
+#- CSV (Content-Type: text/csv): columnas Código del producto, Marca, Código, Nombre y opcionalmente Fecha y Valor
+#El cuerpo se lee de a una línea y se guarda en lotes de ?lote=N filas (un commit por lote),
+#por lo que nunca se carga el archivo completo en memoria. La respuesta informa el error de cada fila rechazada.
+@products_bp.route("/products/bulk", methods=["POST"])
+def bulk_import_products():
+    formato = request.args.get("formato") or _formato_importacion(request.mimetype)
+    if formato not in ("ndjson", "csv"):
+        return jsonify({
+            "message": "Formato no soportado",
+            "error": "Envíe Content-Type application/x-ndjson o text/csv (o use ?formato=ndjson|csv)"
+        }), 415
+
+    tamano_lote = request.args.get("lote", default=current_app.config["BULK_IMPORT_CHUNK_SIZE"], type=int)
+    if tamano_lote <= 0:
+        return jsonify({
+            "message": "Tamaño de lote inválido",
+            "error": "El lote debe ser mayor que cero"
+        }), 400
+
+    procesados = 0
+    creados = 0
+    errores = []
+    vistos = set()
+    lote = []
+
+    try:
+        texto = io.TextIOWrapper(io.BufferedReader(request.stream), encoding="utf-8-sig", newline="")
+        filas = _filas_ndjson(texto) if formato == "ndjson" else _filas_csv(texto)
+
+        for linea, fila in filas:
+            procesados += 1
+            producto, error = _validar_fila(fila)
+            if error:
+                errores.append({"linea": linea, "Código del producto": _codigo_de(fila), "error": error})
+                continue
+
+            claves = [("codigo_producto", producto["codigo_producto"]), ("codigo", producto["codigo"])]
+            if any(clave in vistos for clave in claves):
+                errores.append({
+                    "linea": linea,
+                    "Código del producto": producto["codigo_producto"],
+                    "error": "Producto duplicado en el archivo"
+                })
+                continue
+            vistos.update(claves)
+
+            lote.append((linea, producto))
+            if len(lote) >= tamano_lote:
+                creados += _importar_lote(lote, errores)
+                lote = []
+
+        if lote:
+            creados += _importar_lote(lote, errores)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            "message": "Error interno en el servidor",
+            "error": str(e),
+            "procesados": procesados,
+            "creados": creados,
+            "errores": errores
+        }), 500
+
+    return jsonify({
+        "message": "Importación finalizada",
+        "procesados": procesados,
+        "creados": creados,
+        "rechazados": len(errores),
+        "errores": errores
+    }), 200
+
+def _formato_importacion(mimetype):
+    if mimetype in ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/json-seq"):
+        return "ndjson"
+    if mimetype in ("text/csv", "application/csv"):
+        return "csv"
+    return None
+
+#Genera (número de línea, producto) leyendo el NDJSON de a una línea
+def _filas_ndjson(texto):
+    for linea, contenido in enumerate(texto, start=1):
+        if not contenido.strip():
+            continue
+        try:
+            yield linea, json.loads(contenido)
+        except ValueError as e:
+            yield linea, ValueError(f"JSON inválido: {e}")
+
+#Genera (número de línea, producto) leyendo el CSV de a una fila; Fecha y Valor forman un único precio
+def _filas_csv(texto):
+    lector = csv.DictReader(texto)
+    for fila in lector:
+        producto = {campo: fila.get(campo) for campo in ["Código del producto", "Marca", "Código", "Nombre"] if fila.get(campo)}
+        producto["Precio"] = []
+        if fila.get("Fecha") or fila.get("Valor"):
+            producto["Precio"].append({"Fecha": fila.get("Fecha"), "Valor": fila.get("Valor")})
+        yield lector.line_num, producto
+
+def _codigo_de(fila):
+    return fila.get("Código del producto") if isinstance(fila, dict) else None
+
+#Valida una fila y devuelve (producto, None) o (None, mensaje de error)
+def _validar_fila(fila):
+    if isinstance(fila, Exception):
+        return None, str(fila)
+    if not isinstance(fila, dict):
+        return None, "Cada línea debe ser un objeto JSON"
+
+    campos_requeridos = ["Código del producto", "Marca", "Código", "Nombre"]
+    campos_faltantes = [campo for campo in campos_requeridos if not fila.get(campo)]
+    if campos_faltantes:
+        return None, f"Faltan campos requeridos: {', '.join(campos_faltantes)}"
+
+    precios = []
+    for precio in fila.get("Precio") or []:
+        if not isinstance(precio, dict) or "Fecha" not in precio or "Valor" not in precio:
+            return None, "Cada precio debe tener Fecha y Valor"
+        try:
+            precios.append({
+                "fecha": datetime.fromisoformat(precio["Fecha"]),
+                "valor": float(precio["Valor"])
+            })
+        except (ValueError, TypeError) as e:
+            return None, f"Error en los datos del precio: {e}"
+
+    return {
+        "codigo_producto": str(fila["Código del producto"]),
+        "marca": str(fila["Marca"]),
+        "codigo": str(fila["Código"]),
+        "nombre": str(fila["Nombre"]),
+        "precios": precios
+    }, None
+
+#Guarda un lote: descarta los códigos que ya existen (una consulta IN) e inserta productos y precios
+#con executemany. Devuelve la cantidad de productos creados y agrega los rechazos a `errores`.
+def _importar_lote(lote, errores):
+    existentes = set()
+    filas = db.session.query(Producto.codigo_producto, Producto.codigo).filter(or_(
+        Producto.codigo_producto.in_([producto["codigo_producto"] for _, producto in lote]),
+        Producto.codigo.in_([producto["codigo"] for _, producto in lote])
+    ))
+    for codigo_producto, codigo in filas:
+        existentes.add(("codigo_producto", codigo_producto))
+        existentes.add(("codigo", codigo))
+
+    nuevos = []
+    for linea, producto in lote:
+        if ("codigo_producto", producto["codigo_producto"]) in existentes or ("codigo", producto["codigo"]) in existentes:
+            errores.append({
+                "linea": linea,
+                "Código del producto": producto["codigo_producto"],
+                "error": "Ya existe un producto con este código"
+            })
+        else:
+            nuevos.append((linea, producto))
+
+    if not nuevos:
+        return 0
+
+    try:
+        _insertar_productos([producto for _, producto in nuevos])
+        db.session.commit()
+        return len(nuevos)
+    except Exception:
+        #Si el lote falla (por ejemplo, por una inserción concurrente) se reintenta fila por fila
+        db.session.rollback()
+
+    creados = 0
+    for linea, producto in nuevos:
+        try:
+            _insertar_productos([producto])
+            db.session.commit()
+            creados += 1
+        except Exception as e:
+            db.session.rollback()
+            errores.append({"linea": linea, "Código del producto": producto["codigo_producto"], "error": str(e)})
+    return creados
+
+def _insertar_productos(productos):
+    columnas = ("codigo_producto", "marca", "codigo", "nombre")
+    #Los ids se asocian por código del producto (único): pedir RETURNING ordenado obligaría a SQLAlchemy
+    #a insertar fila por fila en SQLite, mientras que así envía todo el lote en pocas sentencias
+    tabla = Producto.__table__
+    ids = dict(db.session.execute(
+        insert(tabla).returning(tabla.c.codigo_producto, tabla.c.id),
+        [{columna: producto[columna] for columna in columnas} for producto in productos]
+    ).all())
+
+    precios = [
+        {"producto_id": ids[producto["codigo_producto"]], **precio}
+        for producto in productos
+        for precio in producto["precios"]
+    ]
+    if precios:
+        db.session.execute(insert(Precio.__table__), precios)
+
+#Ruta para exportar el catálogo completo con sus precios en streaming (?formato=ndjson|csv, por defecto ndjson)
+#Las filas se leen de la base de datos por bloques (yield_per) y se envían a medida que se generan,
+#por lo que la memoria usada no depende del tamaño del catálogo.
+#- NDJSON: un producto por línea, con el mismo formato que /products/product/<codigo>
+#- CSV: una fila por precio (o una sin Fecha/Valor si el producto no tiene precios), el formato que acepta /products/bulk
+@products_bp.route("/products/export", methods=["GET"])
+@solo_lectura
+def export_products():
+    formato = request.args.get("formato", default="ndjson")
+    if formato not in TIPOS_EXPORTACION:
+        return jsonify({
+            "message": "Formato no soportado",
+            "error": "El formato debe ser ndjson o csv"
+        }), 400
+
+    consulta = productos_con_precios(select(*COLUMNAS_PRODUCTO)).execution_options(
+        yield_per=current_app.config["EXPORT_BATCH_SIZE"]
+    )
+
+    def generar():
+        filas = db.session.execute(consulta)
+        if formato == "csv":
+            yield linea_csv(["Código del producto", "Marca", "Código", "Nombre", "Fecha", "Valor"])
+            for fila in filas:
+                yield linea_csv([
+                    fila.codigo_producto, fila.marca, fila.codigo, fila.nombre,
+                    fila.fecha.isoformat() if fila.fecha else "", fila.valor if fila.valor is not None else ""
+                ])
+            return
+
+        for producto in productos_json(filas):
+            yield linea_ndjson(producto)
+
+    return Response(
+        stream_with_context(generar()),
+        mimetype=TIPOS_EXPORTACION[formato],
+        headers={"Content-Disposition": f"attachment; filename=productos.{formato}"}
+    )
@@ -0,0 +1,38 @@
+import gzip
+from flask import current_app, request
+
+# brotli es opcional: si no está instalado sólo se ofrece gzip
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Comprimir la respuesta con brotli o gzip según el Accept-Encoding del cliente.
+# Se registra con app.after_request; sólo actúa sobre respuestas completas (no streaming ni SSE)
+# de al menos COMPRESSION_MIN_SIZE bytes. El ETag recibe el sufijo de la codificación para que
+# cada representación tenga su propio ETag fuerte.
+def comprimir_respuesta(respuesta):
+    if (respuesta.direct_passthrough or respuesta.is_streamed
+            or respuesta.status_code != 200 or "Content-Encoding" in respuesta.headers):
+        return respuesta
+
+    cuerpo = respuesta.get_data()
+    if len(cuerpo) < current_app.config["COMPRESSION_MIN_SIZE"]:
+        return respuesta
+
+    respuesta.vary.add("Accept-Encoding")
+    disponibles = ["br", "gzip"] if brotli is not None else ["gzip"]
+    codificacion = request.accept_encodings.best_match(disponibles)
+    if codificacion == "br":
+        cuerpo = brotli.compress(cuerpo, quality=current_app.config["COMPRESSION_BROTLI_QUALITY"])
+    elif codificacion == "gzip":
+        cuerpo = gzip.compress(cuerpo, compresslevel=current_app.config["COMPRESSION_GZIP_LEVEL"])
+    else:
+        return respuesta
+
+    respuesta.set_data(cuerpo)
+    respuesta.headers["Content-Encoding"] = codificacion
+    etag, debil = respuesta.get_etag()
+    if etag:
+        respuesta.set_etag(f"{etag}-{codificacion}", debil)
+    return respuesta
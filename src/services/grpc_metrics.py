@@ -0,0 +1,67 @@
+import grpc
+from services.metrics import metricas
+
+# Interceptor del servidor gRPC (síncrono) que registra en las métricas del proceso cada llamada:
+# latencia, código de estado, consultas SQL y bytes de los mensajes de respuesta.
+# La etiqueta "ruta" es el método completo (/product.ProductService/AddProduct) y "metodo" el tipo de llamada.
+class InterceptorMetricas(grpc.ServerInterceptor):
+    def __init__(self, registro=metricas):
+        self.registro = registro
+
+    def intercept_service(self, continuation, handler_call_details):
+        handler = continuation(handler_call_details)
+        if handler is None:
+            return None
+
+        ruta = handler_call_details.method
+        if handler.unary_unary:
+            return handler._replace(unary_unary=self._respuesta_unica(handler.unary_unary, ruta, "unary"))
+        if handler.stream_unary:
+            return handler._replace(stream_unary=self._respuesta_unica(handler.stream_unary, ruta, "client_stream"))
+        if handler.unary_stream:
+            return handler._replace(unary_stream=self._respuesta_stream(handler.unary_stream, ruta, "server_stream"))
+        return handler._replace(stream_stream=self._respuesta_stream(handler.stream_stream, ruta, "bidi_stream"))
+
+    def _respuesta_unica(self, comportamiento, ruta, tipo):
+        def envoltura(peticion, contexto):
+            medicion = self.registro.iniciar("grpc", ruta, tipo)
+            estado = grpc.StatusCode.OK
+            try:
+                respuesta = comportamiento(peticion, contexto)
+                medicion.bytes = respuesta.ByteSize()
+                estado = _estado(contexto, grpc.StatusCode.OK)
+                return respuesta
+            except Exception:
+                estado = _estado(contexto, grpc.StatusCode.UNKNOWN)
+                raise
+            finally:
+                self.registro.finalizar(medicion, estado.name)
+        return envoltura
+
+    def _respuesta_stream(self, comportamiento, ruta, tipo):
+        def envoltura(peticion, contexto):
+            medicion = self.registro.iniciar("grpc", ruta, tipo)
+            estado = grpc.StatusCode.OK
+            try:
+                for respuesta in comportamiento(peticion, contexto):
+                    medicion.bytes += respuesta.ByteSize()
+                    yield respuesta
+                estado = _estado(contexto, grpc.StatusCode.OK)
+            except GeneratorExit:
+                # El cliente canceló la llamada o cerró el stream
+                estado = grpc.StatusCode.CANCELLED
+                raise
+            except Exception:
+                estado = _estado(contexto, grpc.StatusCode.UNKNOWN)
+                raise
+            finally:
+                self.registro.finalizar(medicion, estado.name)
+        return envoltura
+
+# Código fijado por el servicio con context.set_code o context.abort, si lo hay
+def _estado(contexto, por_defecto):
+    try:
+        codigo = contexto.code()
+    except AttributeError:
+        codigo = None
+    return codigo if isinstance(codigo, grpc.StatusCode) else por_defecto
@@ -0,0 +1,255 @@
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from sqlalchemy import event
+
+logger = logging.getLogger("ferremas.metricas")
+
+# Límites (en segundos) de los buckets del histograma de latencia
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Límites del histograma de consultas SQL por petición
+BUCKETS_CONSULTAS = (1, 2, 3, 5, 10, 20, 50, 100, 500)
+
+CONTENT_TYPE_PROMETHEUS = "text/plain; version=0.0.4; charset=utf-8"
+
+# Medición de la petición (HTTP o gRPC) en curso en este hilo o tarea
+_medicion_actual = ContextVar("medicion_actual", default=None)
+
+class Medicion:
+    def __init__(self, protocolo, ruta, metodo):
+        self.protocolo = protocolo
+        self.ruta = ruta
+        self.metodo = metodo
+        self.inicio = time.perf_counter()
+        self.consultas = 0
+        self.tiempo_sql = 0.0
+        self.bytes = 0
+        self.cerrada = False
+
+class Histograma:
+    def __init__(self, limites):
+        self.limites = limites
+        self.cuentas = [0] * len(limites)
+        self.total = 0
+        self.suma = 0.0
+
+    def observar(self, valor):
+        for i, limite in enumerate(self.limites):
+            if valor <= limite:
+                self.cuentas[i] += 1
+                break
+        self.total += 1
+        self.suma += valor
+
+# Registro de las métricas del proceso, expuestas en formato de texto de Prometheus.
+# Las etiquetas de ruta son la plantilla de la ruta Flask (/products/product/<codigo>)
+# o el nombre completo del método gRPC, para que la cardinalidad no dependa de los datos.
+class RegistroMetricas:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._peticiones = {}
+        self._latencias = {}
+        self._consultas_por_peticion = {}
+        self._consultas = {}
+        self._tiempo_sql = {}
+        self._bytes = {}
+        self._excedidas = {}
+        self._engines = {}
+        self.limite_consultas = 0
+
+    # Umbral de consultas SQL por petición a partir del cual se registra una advertencia (0 lo desactiva)
+    def configurar(self, limite_consultas):
+        self.limite_consultas = limite_consultas
+
+    # Contar las sentencias SQL (y su duración) ejecutadas por este engine, y exponer el estado de su pool
+    def instrumentar_engine(self, nombre, engine):
+        self._engines[nombre] = engine
+        if not event.contains(engine, "before_cursor_execute", _antes_de_consulta):
+            event.listen(engine, "before_cursor_execute", _antes_de_consulta)
+            event.listen(engine, "after_cursor_execute", _despues_de_consulta)
+            event.listen(engine, "handle_error", _error_de_consulta)
+
+    def iniciar(self, protocolo, ruta, metodo):
+        medicion = Medicion(protocolo, ruta, metodo)
+        _medicion_actual.set(medicion)
+        return medicion
+
+    # Cerrar la medición y acumularla. Se puede llamar más de una vez: sólo cuenta la primera.
+    def finalizar(self, medicion, estado):
+        if medicion.cerrada:
+            return
+        medicion.cerrada = True
+        duracion = time.perf_counter() - medicion.inicio
+        clave = (medicion.protocolo, medicion.ruta, medicion.metodo)
+        excedida = 0 < self.limite_consultas < medicion.consultas
+
+        with self._lock:
+            clave_estado = clave + (str(estado),)
+            self._peticiones[clave_estado] = self._peticiones.get(clave_estado, 0) + 1
+            self._latencias.setdefault(clave, Histograma(BUCKETS_LATENCIA)).observar(duracion)
+            self._consultas_por_peticion.setdefault(clave, Histograma(BUCKETS_CONSULTAS)).observar(medicion.consultas)
+            self._consultas[clave] = self._consultas.get(clave, 0) + medicion.consultas
+            self._tiempo_sql[clave] = self._tiempo_sql.get(clave, 0.0) + medicion.tiempo_sql
+            self._bytes[clave] = self._bytes.get(clave, 0) + medicion.bytes
+            if excedida:
+                self._excedidas[clave] = self._excedidas.get(clave, 0) + 1
+
+        if excedida:
+            logger.warning(
+                "%s %s %s ejecutó %d consultas SQL (límite %d) en %.1f ms",
+                medicion.protocolo, medicion.metodo, medicion.ruta,
+                medicion.consultas, self.limite_consultas, duracion * 1000
+            )
+
+    def exportar(self):
+        lineas = []
+        with self._lock:
+            _contador(lineas, "ferremas_peticiones_total", "Peticiones atendidas", self._peticiones,
+                      ("protocolo", "ruta", "metodo", "estado"))
+            _histograma(lineas, "ferremas_peticion_duracion_segundos", "Duración de las peticiones", self._latencias)
+            _histograma(lineas, "ferremas_sql_consultas_por_peticion", "Sentencias SQL por petición",
+                        self._consultas_por_peticion)
+            _contador(lineas, "ferremas_sql_consultas_total", "Sentencias SQL ejecutadas", self._consultas)
+            _contador(lineas, "ferremas_sql_duracion_segundos_total", "Tiempo en sentencias SQL", self._tiempo_sql)
+            _contador(lineas, "ferremas_respuesta_bytes_total", "Bytes serializados en las respuestas", self._bytes)
+            _contador(lineas, "ferremas_sql_consultas_excedidas_total",
+                      "Peticiones que superaron el límite de consultas SQL", self._excedidas)
+
+        # overflow() es negativo mientras el pool no abrió todas sus conexiones base
+        for nombre, descripcion, lectura in (
+            ("ferremas_db_pool_tamano", "Tamaño configurado del pool de conexiones", lambda pool: pool.size()),
+            ("ferremas_db_pool_en_uso", "Conexiones del pool prestadas", lambda pool: pool.checkedout()),
+            ("ferremas_db_pool_libres", "Conexiones del pool disponibles", lambda pool: pool.checkedin()),
+            ("ferremas_db_pool_desbordamiento", "Conexiones abiertas por encima del tamaño del pool",
+             lambda pool: max(pool.overflow(), 0)),
+        ):
+            valores = {
+                (bind,): lectura(engine.pool)
+                for bind, engine in self._engines.items() if hasattr(engine.pool, "overflow")
+            }
+            _metrica(lineas, nombre, descripcion, "gauge", valores, ("bind",))
+        return "\n".join(lineas) + "\n"
+
+ETIQUETAS = ("protocolo", "ruta", "metodo")
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _etiquetas(nombres, valores):
+    return ",".join(f'{nombre}="{_escapar(valor)}"' for nombre, valor in zip(nombres, valores))
+
+def _metrica(lineas, nombre, descripcion, tipo, valores, etiquetas):
+    lineas.append(f"# HELP {nombre} {descripcion}")
+    lineas.append(f"# TYPE {nombre} {tipo}")
+    for clave, valor in sorted(valores.items()):
+        lineas.append(f"{nombre}{{{_etiquetas(etiquetas, clave)}}} {valor}")
+
+def _contador(lineas, nombre, descripcion, valores, etiquetas=ETIQUETAS):
+    _metrica(lineas, nombre, descripcion, "counter", valores, etiquetas)
+
+def _histograma(lineas, nombre, descripcion, histogramas):
+    lineas.append(f"# HELP {nombre} {descripcion}")
+    lineas.append(f"# TYPE {nombre} histogram")
+    for clave, histograma in sorted(histogramas.items()):
+        etiquetas = _etiquetas(ETIQUETAS, clave)
+        acumulado = 0
+        for limite, cuenta in zip(histograma.limites, histograma.cuentas):
+            acumulado += cuenta
+            lineas.append(f'{nombre}_bucket{{{etiquetas},le="{limite}"}} {acumulado}')
+        lineas.append(f'{nombre}_bucket{{{etiquetas},le="+Inf"}} {histograma.total}')
+        lineas.append(f"{nombre}_sum{{{etiquetas}}} {histograma.suma}")
+        lineas.append(f"{nombre}_count{{{etiquetas}}} {histograma.total}")
+
+# Eventos del engine: cada sentencia se suma a la medición en curso del hilo que la ejecuta
+def _antes_de_consulta(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("inicio_consultas", []).append(time.perf_counter())
+
+def _despues_de_consulta(conn, cursor, statement, parameters, context, executemany):
+    inicio = conn.info["inicio_consultas"].pop()
+    medicion = _medicion_actual.get()
+    if medicion is not None and not medicion.cerrada:
+        medicion.consultas += 1
+        medicion.tiempo_sql += time.perf_counter() - inicio
+
+def _error_de_consulta(contexto):
+    inicios = contexto.connection.info.get("inicio_consultas") if contexto.connection is not None else None
+    if inicios:
+        inicio = inicios.pop()
+        medicion = _medicion_actual.get()
+        if medicion is not None and not medicion.cerrada:
+            medicion.consultas += 1
+            medicion.tiempo_sql += time.perf_counter() - inicio
+
+# Registro compartido por la aplicación Flask y el servidor gRPC del mismo proceso
+metricas = RegistroMetricas()
+
+# Instalar en la aplicación Flask la medición de cada petición y la ruta GET /metrics.
+# Las respuestas en streaming se miden al cerrarse (call_on_close), así la latencia, las consultas
+# y los bytes incluyen lo que se genera después de devolver la respuesta.
+def instalar_metricas(app, registro=metricas):
+    from flask import Response, g, request
+
+    registro.configurar(app.config["METRICS_MAX_QUERIES"])
+    with app.app_context():
+        from models import db
+        for bind, engine in db.engines.items():
+            registro.instrumentar_engine(bind or "default", engine)
+
+    @app.before_request
+    def iniciar_medicion():
+        ruta = request.url_rule.rule if request.url_rule is not None else "<sin ruta>"
+        g.medicion = registro.iniciar("http", ruta, request.method)
+
+    # Se registra antes que la compresión, por lo que se ejecuta después (after_request corre en orden inverso)
+    # y cuenta los bytes que realmente se envían
+    @app.after_request
+    def registrar_medicion(respuesta):
+        medicion = g.pop("medicion", None)
+        if medicion is None:
+            return respuesta
+        if respuesta.is_streamed:
+            respuesta.response = _contar_bytes(respuesta.response, medicion)
+        else:
+            medicion.bytes = respuesta.calculate_content_length() or 0
+        estado = respuesta.status_code
+        respuesta.call_on_close(lambda: registro.finalizar(medicion, estado))
+        return respuesta
+
+    # Si la vista lanza una excepción no controlada no se ejecuta after_request
+    @app.teardown_request
+    def cerrar_medicion(error):
+        medicion = g.pop("medicion", None)
+        if medicion is not None:
+            registro.finalizar(medicion, 500)
+
+    @app.route("/metrics", methods=["GET"])
+    def exportar_metricas():
+        return Response(registro.exportar(), content_type=CONTENT_TYPE_PROMETHEUS)
+
+def _contar_bytes(partes, medicion):
+    for parte in partes:
+        medicion.bytes += len(parte)
+        yield parte
+
+# Servidor HTTP mínimo en un hilo para exponer /metrics en procesos sin Flask (servidor gRPC)
+def servir_metricas(puerto, registro=metricas, host="0.0.0.0"):
+    class Manejador(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            cuerpo = registro.exportar().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE_PROMETHEUS)
+            self.send_header("Content-Length", str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+        def log_message(self, formato, *args):
+            pass
+
+    servidor = ThreadingHTTPServer((host, puerto), Manejador)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
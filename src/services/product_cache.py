@@ -0,0 +1,98 @@
+import threading
+import time
+from collections import OrderedDict
+
+# Caché en memoria (por proceso) de las respuestas ya serializadas de /products/product/<codigo>,
+# con clave codigo_producto. Desaloja la entrada usada hace más tiempo (LRU) al superar el
+# tamaño máximo, y descarta las entradas con más de `ttl` segundos al leerlas.
+# Cada entrada guarda la versión 'productos' (services/versiones.py) leída antes de consultar el producto,
+# y sólo se usa mientras esa versión siga vigente: una escritura en otro proceso (otro worker de gunicorn,
+# el servidor gRPC) cambia la versión y la entrada deja de servir, por lo que el ETag calculado con la
+# versión vigente nunca acompaña a un cuerpo anterior a ella. Las rutas que modifican productos en este
+# proceso llaman a invalidar() después del commit.
+class CacheProductos:
+    def __init__(self, tamano_maximo=1024, ttl=60):
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+        self.configurar(tamano_maximo, ttl)
+        self.reiniciar_estadisticas()
+
+    # Cambiar el tamaño máximo y el TTL (tamano_maximo=0 desactiva la caché)
+    def configurar(self, tamano_maximo, ttl):
+        with self._lock:
+            self.tamano_maximo = max(int(tamano_maximo), 0)
+            self.ttl = float(ttl)
+            while len(self._entradas) > self.tamano_maximo:
+                self._entradas.popitem(last=False)
+
+    def obtener(self, codigo, version):
+        with self._lock:
+            entrada = self._entradas.get(codigo)
+            if entrada is None:
+                self.fallos += 1
+                return None
+
+            expira, version_entrada, valor = entrada
+            if expira < time.monotonic():
+                del self._entradas[codigo]
+                self.expirados += 1
+                self.fallos += 1
+                return None
+            if version_entrada != version:
+                del self._entradas[codigo]
+                self.desactualizados += 1
+                self.fallos += 1
+                return None
+
+            self._entradas.move_to_end(codigo)
+            self.aciertos += 1
+            return valor
+
+    # `version`: versión 'productos' leída antes de consultar el producto
+    def guardar(self, codigo, valor, version):
+        with self._lock:
+            if not self.tamano_maximo:
+                return
+            self._entradas[codigo] = (time.monotonic() + self.ttl, version, valor)
+            self._entradas.move_to_end(codigo)
+            while len(self._entradas) > self.tamano_maximo:
+                self._entradas.popitem(last=False)
+                self.desalojos += 1
+
+    def invalidar(self, *codigos):
+        with self._lock:
+            for codigo in codigos:
+                if self._entradas.pop(codigo, None) is not None:
+                    self.invalidaciones += 1
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+
+    def reiniciar_estadisticas(self):
+        with self._lock:
+            self.aciertos = 0
+            self.fallos = 0
+            self.expirados = 0
+            self.desactualizados = 0
+            self.desalojos = 0
+            self.invalidaciones = 0
+
+    def estadisticas(self):
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                "entradas": len(self._entradas),
+                "tamano_maximo": self.tamano_maximo,
+                "ttl": self.ttl,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "tasa_aciertos": self.aciertos / consultas if consultas else 0.0,
+                "expirados": self.expirados,
+                "desactualizados": self.desactualizados,
+                "desalojos": self.desalojos,
+                "invalidaciones": self.invalidaciones
+            }
+
+# Instancia compartida por las rutas de productos y el servidor gRPC del mismo proceso
+cache_productos = CacheProductos()
@@ -0,0 +1,29 @@
+from sqlalchemy import Boolean, DateTime, Integer, String, column, select, table
+from models import Precio, Producto
+
+# Registro de cambios del catálogo (tabla mantenida por triggers, ver migrations/v006_cambios_productos.py):
+# una fila por código de producto con la secuencia de su último cambio
+cambios_productos = table(
+    "cambios_productos",
+    column("secuencia", Integer),
+    column("codigo_producto", String),
+    column("eliminado", Boolean),
+    column("fecha", DateTime),
+)
+
+# Cambios posteriores a la secuencia `desde` (como máximo `limite`), en orden de secuencia, con el estado
+# actual de cada producto y sus precios (LEFT JOIN: los productos eliminados no tienen fila en productos)
+def consulta_cambios(desde, limite):
+    pagina = select(cambios_productos.c.secuencia, cambios_productos.c.codigo_producto).where(
+        cambios_productos.c.secuencia > desde
+    ).order_by(cambios_productos.c.secuencia).limit(limite).subquery()
+
+    return select(
+        pagina.c.secuencia, pagina.c.codigo_producto,
+        Producto.id, Producto.marca, Producto.codigo, Producto.nombre,
+        Precio.fecha, Precio.valor
+    ).outerjoin(
+        Producto, Producto.codigo_producto == pagina.c.codigo_producto
+    ).outerjoin(
+        Precio, Precio.producto_id == Producto.id
+    ).order_by(pagina.c.secuencia, Precio.fecha, Precio.id)
@@ -0,0 +1,200 @@
+import os
+from sqlalchemy import select, or_
+from models import Producto, Sucursal
+from protos import product_pb2
+from services.stock_updates import (
+    SUMA_STOCK, parametros_suma, ids_productos, descontar_stock, cantidades_por_codigo
+)
+
+# Lógica compartida por los servidores gRPC síncrono (grpc_server.py) y asíncrono (grpc_aio_server.py).
+# Este módulo no depende de la aplicación Flask: sólo construye consultas y mensajes,
+# y cada servidor las ejecuta con su propia sesión de base de datos. Las operaciones de stock
+# (vender, transferir) reciben una sesión síncrona; el servidor asíncrono las ejecuta con
+# AsyncSession.run_sync.
+
+# Tamaño de lote por defecto de AddProducts (productos por commit).
+# Cada llamada puede cambiarlo enviando la metadata "batch-size".
+TAMANO_LOTE_GRPC = int(os.environ.get("GRPC_BATCH_SIZE", 500))
+
+# Obtener el tamaño de lote pedido en la metadata de la llamada
+def tamano_lote(metadata):
+    try:
+        tamano = int(dict(metadata).get("batch-size", TAMANO_LOTE_GRPC))
+    except ValueError:
+        tamano = TAMANO_LOTE_GRPC
+    return max(tamano, 1)
+
+# Convertir un Producto en el mensaje Product de gRPC
+def a_mensaje(producto):
+    return product_pb2.Product(
+        product_code=producto.codigo_producto,
+        code=producto.codigo,
+        name=producto.nombre,
+        brand=producto.marca
+    )
+
+# Crear un Producto a partir del mensaje Product de gRPC
+def a_producto(request):
+    return Producto(
+        codigo_producto=request.product_code,
+        marca=request.brand,
+        codigo=request.code,
+        nombre=request.name
+    )
+
+def resultado_creado(producto):
+    return product_pb2.ProductResult(
+        product_code=producto.codigo_producto,
+        success=True,
+        message=f"Producto creado exitosamente con ID: {producto.id}"
+    )
+
+def resultado_error(codigo_producto, mensaje):
+    return product_pb2.ProductResult(product_code=codigo_producto, success=False, message=mensaje)
+
+# Consulta de los códigos de un lote que ya existen en la base de datos
+def consulta_existentes(lote):
+    return select(Producto.codigo_producto, Producto.codigo).where(or_(
+        Producto.codigo_producto.in_([request.product_code for request in lote]),
+        Producto.codigo.in_([request.code for request in lote])
+    ))
+
+# Consulta del catálogo para ListProducts, ordenada por código del producto
+def consulta_listado(request):
+    consulta = select(Producto).order_by(Producto.codigo_producto)
+    if request.brand:
+        consulta = consulta.where(Producto.marca == request.brand)
+    if request.after_product_code:
+        consulta = consulta.where(Producto.codigo_producto > request.after_product_code)
+    if request.limit > 0:
+        consulta = consulta.limit(request.limit)
+    return consulta
+
+# Consulta de productos por código para GetProducts
+def consulta_por_codigos(codigos):
+    return select(Producto).where(Producto.codigo_producto.in_(codigos))
+
+# Valida un lote de AddProducts y descarta duplicados (en la carga o en la base de datos).
+# Devuelve la lista de resultados (None en las posiciones válidas) y los productos a insertar
+# como pares (posición, Producto). `vistos` acumula los códigos ya aceptados en el flujo.
+def clasificar_lote(lote, filas_existentes, vistos):
+    existentes = set()
+    for codigo_producto, codigo in filas_existentes:
+        existentes.add(("product_code", codigo_producto))
+        existentes.add(("code", codigo))
+
+    resultados = [None] * len(lote)
+    nuevos = []
+    for indice, request in enumerate(lote):
+        claves = [("product_code", request.product_code), ("code", request.code)]
+        if not all([request.product_code, request.code, request.name, request.brand]):
+            resultados[indice] = resultado_error(request.product_code, "Faltan campos requeridos")
+        elif any(clave in existentes for clave in claves):
+            resultados[indice] = resultado_error(request.product_code, "Ya existe un producto con este código")
+        elif any(clave in vistos for clave in claves):
+            resultados[indice] = resultado_error(request.product_code, "Producto duplicado en la carga")
+        else:
+            vistos.update(claves)
+            nuevos.append((indice, a_producto(request)))
+    return resultados, nuevos
+
+# Respuesta final de AddProducts
+def respuesta_lote(resultados):
+    creados = sum(1 for resultado in resultados if resultado.success)
+    return product_pb2.AddProductsResponse(
+        created=creados,
+        failed=len(resultados) - creados,
+        results=resultados
+    )
+
+# Validar los StockItem de SellStock/TransferStock sumando los códigos repetidos.
+# Devuelve las cantidades por código y un mensaje de error.
+def _cantidades_de_items(items):
+    if not items:
+        return None, "Se debe enviar al menos un producto"
+    cantidades = {}
+    for item in items:
+        if not item.product_code:
+            return None, "Cada producto debe tener product_code"
+        if item.quantity <= 0:
+            return None, f"La cantidad de {item.product_code} debe ser mayor que cero"
+        cantidades[item.product_code] = cantidades.get(item.product_code, 0) + item.quantity
+    return cantidades, None
+
+def _items(cantidades):
+    return [product_pb2.StockItem(product_code=codigo, quantity=cantidad) for codigo, cantidad in cantidades.items()]
+
+def _error_stock(mensaje, **campos):
+    return product_pb2.StockChangeResponse(success=False, message=mensaje, **campos)
+
+# Validaciones comunes de SellStock y TransferStock; devuelve (cantidades, ids de productos, respuesta de error)
+def _preparar_movimiento(sesion, items, sucursales):
+    cantidades, error = _cantidades_de_items(items)
+    if error:
+        return None, None, _error_stock(error)
+    for sucursal_id in sucursales:
+        if sesion.get(Sucursal, sucursal_id) is None:
+            return None, None, _error_stock(f"Sucursal {sucursal_id} no encontrada")
+    productos, faltantes = ids_productos(sesion, cantidades)
+    if faltantes:
+        return None, None, _error_stock(f"Productos no encontrados: {', '.join(faltantes)}")
+    return cantidades, productos, None
+
+# Descontar con UPDATE condicionales; si algún producto no alcanza se deshace todo
+# y se devuelve la respuesta con las cantidades disponibles
+def _descontar(sesion, sucursal_id, productos, cantidades):
+    restantes, insuficientes = descontar_stock(sesion, sucursal_id, productos, cantidades)
+    if not insuficientes:
+        return restantes, None
+    sesion.rollback()
+    disponibles = cantidades_por_codigo(sesion, sucursal_id, productos, insuficientes)
+    return None, _error_stock("Stock insuficiente; no se modificó el stock", insufficient=_items(disponibles))
+
+# Venta (SellStock): todas las cantidades se descuentan en una transacción, o ninguna
+def vender(sesion, request):
+    cantidades, productos, error = _preparar_movimiento(sesion, request.items, [request.branch_id])
+    if error:
+        return error
+
+    try:
+        restantes, error = _descontar(sesion, request.branch_id, productos, cantidades)
+        if error:
+            return error
+        sesion.commit()
+    except Exception as e:
+        sesion.rollback()
+        return _error_stock(f"Error al registrar la venta: {str(e)}")
+
+    return product_pb2.StockChangeResponse(
+        success=True,
+        message="Venta registrada correctamente",
+        remaining=_items(restantes)
+    )
+
+# Transferencia (TransferStock): descuento condicional en el origen y suma en el destino en una sola transacción
+def transferir(sesion, request):
+    if request.from_branch_id == request.to_branch_id:
+        return _error_stock("La sucursal destino debe ser distinta de la de origen")
+    cantidades, productos, error = _preparar_movimiento(
+        sesion, request.items, [request.from_branch_id, request.to_branch_id]
+    )
+    if error:
+        return error
+
+    try:
+        restantes, error = _descontar(sesion, request.from_branch_id, productos, cantidades)
+        if error:
+            return error
+        sesion.execute(SUMA_STOCK, parametros_suma(request.to_branch_id, productos, cantidades))
+        sesion.commit()
+    except Exception as e:
+        sesion.rollback()
+        return _error_stock(f"Error al transferir el stock: {str(e)}")
+
+    en_destino = cantidades_por_codigo(sesion, request.to_branch_id, productos, list(cantidades))
+    return product_pb2.StockChangeResponse(
+        success=True,
+        message="Transferencia realizada correctamente",
+        remaining=_items(restantes),
+        destination=_items(en_destino)
+    )
@@ -0,0 +1,270 @@
+from operator import itemgetter
+from flask import current_app, jsonify, request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+from models import Precio, Producto, Stock
+from protos import product_pb2
+from utils import agrupar_consecutivas
+
+# orjson es opcional: si no está instalado se usa el codificador JSON por defecto de Flask
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Serialización compartida de productos y stock (rutas REST y exportaciones).
+# Los objetos JSON se construyen a partir de filas (tuplas) de consultas con columnas explícitas,
+# sin instanciar objetos del ORM ni cargar relaciones: cada producto o fila de stock llega con sus
+# precios en filas consecutivas de un LEFT JOIN, ordenadas por fecha.
+
+COLUMNAS_PRODUCTO = (Producto.id, Producto.codigo_producto, Producto.marca, Producto.codigo, Producto.nombre)
+COLUMNAS_STOCK = (
+    Stock.id, Stock.sucursal_id, Stock.cantidad,
+    Producto.codigo_producto, Producto.nombre, Producto.marca
+)
+
+# Precios que incluyen las lecturas de productos y stock (?precio=): todo el historial (por defecto),
+# sólo el precio actual (el de fecha más reciente, en "Precio actual") o ninguno. El precio actual no depende
+# de la hora de la consulta, por lo que sirve la caché de productos y el ETag; el precio vigente en una fecha
+# (sin precios con fecha futura) se consulta en /products/product/<codigo>/precio.
+MODOS_PRECIO = ("historial", "actual", "none")
+
+# Campos que se pueden pedir con ?fields= y su clave en la respuesta. El código del producto se incluye siempre.
+CAMPOS_PRODUCTO = {"marca": "Marca", "codigo": "Código", "nombre": "Nombre", "precio": "Precio"}
+
+# Campos y precios de los productos de una respuesta (?fields=nombre,precio&precio=actual).
+# Sin "precio" en ?fields= no se incluye ningún precio ni se consultan.
+class Proyeccion:
+    def __init__(self, campos=None, precio="historial"):
+        self.campos = campos
+        self.precio = precio
+
+    @classmethod
+    def desde_argumentos(cls, argumentos):
+        precio = argumentos.get("precio", "historial")
+        if precio not in MODOS_PRECIO:
+            raise ValueError(f"precio debe ser uno de: {', '.join(MODOS_PRECIO)}")
+
+        campos = argumentos.get("fields")
+        if campos is None:
+            return cls(precio=precio)
+
+        nombres = [nombre.strip() for nombre in campos.split(",") if nombre.strip()]
+        desconocidos = [nombre for nombre in nombres if nombre not in CAMPOS_PRODUCTO]
+        if desconocidos:
+            raise ValueError(
+                f"Campos desconocidos: {', '.join(desconocidos)}. Campos válidos: {', '.join(CAMPOS_PRODUCTO)}"
+            )
+        if "precio" not in nombres:
+            precio = "none"
+        return cls({CAMPOS_PRODUCTO[nombre] for nombre in nombres if nombre != "precio"}, precio)
+
+    # Todos los campos y todo el historial de precios (el formato de siempre, el que guarda la caché de productos)
+    @property
+    def completa(self):
+        return self.campos is None and self.precio == "historial"
+
+    # Producto con los campos pedidos, a partir de sus datos y de los precios ordenados por fecha
+    def producto(self, datos, precios):
+        producto = {
+            clave: valor for clave, valor in datos.items()
+            if self.campos is None or clave == "Código del producto" or clave in self.campos
+        }
+        if self.precio == "historial":
+            producto["Precio"] = precios
+        elif self.precio == "actual":
+            producto["Precio actual"] = precios[-1] if precios else None
+        return producto
+
+    # Aplicar la proyección a un producto con el formato completo (caché, respuestas de alta y modificación)
+    def aplicar(self, producto):
+        if self.completa:
+            return producto
+        datos = {clave: valor for clave, valor in producto.items() if clave != "Precio"}
+        return self.producto(datos, producto["Precio"])
+
+PROYECCION_COMPLETA = Proyeccion()
+
+# Proyección pedida en la petición en curso; devuelve (proyección, respuesta de error si los parámetros no son válidos)
+def leer_proyeccion():
+    try:
+        return Proyeccion.desde_argumentos(request.args), None
+    except ValueError as e:
+        return None, (jsonify({
+            "message": "Parámetros de proyección inválidos",
+            "error": str(e)
+        }), 400)
+
+# Condición de JOIN con el último precio de cada producto (fecha más reciente y, a igual fecha, el último
+# registrado): una búsqueda por producto en el índice ix_precios_producto_fecha, sin leer el historial
+def _es_precio_actual(producto_id):
+    reciente = aliased(Precio)
+    return Precio.id == select(reciente.id).where(reciente.producto_id == producto_id).order_by(
+        reciente.fecha.desc(), reciente.id.desc()
+    ).limit(1).scalar_subquery()
+
+# Agregar los precios a una consulta de productos (select de COLUMNAS_PRODUCTO, con sus filtros y límite):
+# el historial, sólo el precio actual o ninguno según `precio` (ver MODOS_PRECIO)
+def productos_con_precios(consulta, precio="historial"):
+    productos = consulta.subquery()
+    if precio == "none":
+        return select(productos).order_by(productos.c.codigo_producto)
+
+    consulta = select(productos, Precio.fecha, Precio.valor)
+    if precio == "actual":
+        return consulta.outerjoin(Precio, _es_precio_actual(productos.c.id)).order_by(productos.c.codigo_producto)
+    return consulta.outerjoin(Precio, Precio.producto_id == productos.c.id).order_by(
+        productos.c.codigo_producto, Precio.fecha, Precio.id
+    )
+
+# Agregar los precios a una consulta de stock (select de COLUMNAS_STOCK); el orden de las filas de stock
+# se indica con `orden` y se completa con el de los precios
+def stock_con_precios(consulta, *orden, precio="historial"):
+    if precio == "none":
+        return consulta.order_by(*orden)
+
+    consulta = consulta.add_columns(Precio.fecha, Precio.valor)
+    if precio == "actual":
+        return consulta.outerjoin(Precio, _es_precio_actual(Producto.id)).order_by(*orden)
+    return consulta.outerjoin(Precio, Precio.producto_id == Producto.id).order_by(*orden, Precio.fecha, Precio.id)
+
+# Precios de las filas de un mismo producto (las dos últimas columnas son fecha y valor)
+def _precios(filas):
+    return [{"Fecha": fila[-2].isoformat(), "Valor": fila[-1]} for fila in filas if fila[-2] is not None]
+
+# Productos (con el formato de /products/product/<codigo>) a partir de filas de productos_con_precios
+def productos_json(filas, proyeccion=PROYECCION_COMPLETA):
+    for _, grupo in agrupar_consecutivas(filas, itemgetter(0)):
+        _, codigo_producto, marca, codigo, nombre = grupo[0][:5]
+        datos = {"Código del producto": codigo_producto, "Marca": marca, "Código": codigo, "Nombre": nombre}
+        yield proyeccion.producto(datos, _precios(grupo) if proyeccion.precio != "none" else [])
+
+# Cambios del catálogo (/products/changes) a partir de filas de product_changes.consulta_cambios:
+# cada cambio lleva el producto en su estado actual, o sólo el código si el producto ya no existe
+def cambios_json(filas):
+    for _, grupo in agrupar_consecutivas(filas, itemgetter(0)):
+        secuencia, codigo_producto, producto_id, marca, codigo, nombre = grupo[0][:6]
+        cambio = {"secuencia": secuencia, "Código del producto": codigo_producto, "eliminado": producto_id is None}
+        if producto_id is not None:
+            cambio["producto"] = {
+                "Código del producto": codigo_producto,
+                "Marca": marca,
+                "Código": codigo,
+                "Nombre": nombre,
+                "Precio": _precios(grupo)
+            }
+        yield cambio
+
+# Filas de stock (con el formato de /branches/<id>/stock/all) a partir de filas de stock_con_precios.
+# Con incluir_sucursal=True se agrega el id de la sucursal (exportación de todas las sucursales).
+def stock_json(filas, incluir_sucursal=False, proyeccion=PROYECCION_COMPLETA):
+    for _, grupo in agrupar_consecutivas(filas, itemgetter(0)):
+        _, sucursal_id, cantidad, codigo_producto, nombre, marca = grupo[0][:6]
+        item = {"sucursal": sucursal_id} if incluir_sucursal else {}
+        item["producto"] = proyeccion.producto(
+            {"Código del producto": codigo_producto, "Nombre": nombre, "Marca": marca},
+            _precios(grupo) if proyeccion.precio != "none" else []
+        )
+        item["stock"] = {"Cantidad": cantidad}
+        yield item
+
+# Respuestas protobuf (Accept: application/x-protobuf) de /products/all, /products/product/<codigo> y
+# /branches/<id>/stock/all: una secuencia de mensajes, cada uno precedido por su longitud en un varint
+# (el formato "length-delimited" de writeDelimitedTo / parseDelimitedFrom de las librerías de protobuf).
+# Los mensajes se arman a partir de los mismos objetos que las respuestas JSON.
+TIPO_PROTOBUF = "application/x-protobuf"
+
+# El cliente prefiere protobuf a JSON (ante */* o sin Accept se responde JSON)
+def acepta_protobuf():
+    return request.accept_mimetypes.best_match(["application/json", TIPO_PROTOBUF]) == TIPO_PROTOBUF
+
+# Los campos que no se pidieron con ?fields= quedan vacíos; con ?precio=actual `prices` tiene sólo el precio actual
+def producto_pb(producto):
+    precios = producto.get("Precio", [])
+    if producto.get("Precio actual"):
+        precios = [producto["Precio actual"]]
+    return product_pb2.ProductPrices(
+        product=product_pb2.Product(
+            product_code=producto["Código del producto"],
+            code=producto.get("Código", ""),
+            name=producto.get("Nombre", ""),
+            brand=producto.get("Marca", "")
+        ),
+        prices=[product_pb2.Price(date=precio["Fecha"], value=precio["Valor"]) for precio in precios]
+    )
+
+def stock_pb(item, sucursal_id):
+    return product_pb2.BranchStock(
+        branch_id=sucursal_id, product=producto_pb(item["producto"]), quantity=item["stock"]["Cantidad"]
+    )
+
+def _varint(numero):
+    salida = bytearray()
+    while numero > 0x7F:
+        salida.append((numero & 0x7F) | 0x80)
+        numero >>= 7
+    salida.append(numero)
+    return bytes(salida)
+
+# Cuerpo length-delimited con los mensajes
+def codificar_delimitados(mensajes):
+    partes = []
+    for mensaje in mensajes:
+        datos = mensaje.SerializeToString()
+        partes.append(_varint(len(datos)))
+        partes.append(datos)
+    return b"".join(partes)
+
+# Leer un cuerpo length-delimited como mensajes de tipo `clase` (clientes, benchmarks)
+def leer_delimitados(datos, clase):
+    mensajes = []
+    posicion = 0
+    while posicion < len(datos):
+        longitud = desplazamiento = 0
+        while True:
+            byte = datos[posicion]
+            posicion += 1
+            longitud |= (byte & 0x7F) << desplazamiento
+            desplazamiento += 7
+            if not byte & 0x80:
+                break
+        mensajes.append(clase.FromString(datos[posicion:posicion + longitud]))
+        posicion += longitud
+    return mensajes
+
+def respuesta_protobuf(mensajes):
+    return variar_por_accept(current_app.response_class(codificar_delimitados(mensajes), mimetype=TIPO_PROTOBUF))
+
+# Las rutas con negociación de contenido indican a los cachés que la respuesta depende de Accept
+def variar_por_accept(respuesta):
+    respuesta.vary.add("Accept")
+    return respuesta
+
+# Proveedor JSON de Flask que codifica con orjson. El JSON es equivalente al del proveedor por defecto
+# (claves ordenadas, fechas en formato HTTP, salto de línea final, sangría en modo debug), pero los bytes no
+# son iguales: los caracteres no ASCII se escriben en UTF-8 ("Código") en lugar de escaparse ("C\u00f3digo");
+# la decodificación de las peticiones sigue usando el módulo json.
+class ProveedorJSONRapido(DefaultJSONProvider):
+    def _opciones(self, indentar=False):
+        opciones = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        return opciones | orjson.OPT_INDENT_2 if indentar else opciones
+
+    def _codificar(self, obj, indentar=False):
+        return orjson.dumps(obj, default=self.default, option=self._opciones(indentar))
+
+    def dumps(self, obj, **kwargs):
+        if kwargs.keys() - {"separators", "indent"}:
+            # Opciones que orjson no soporta (por ejemplo cls): se usa el codificador por defecto
+            return super().dumps(obj, **kwargs)
+        return self._codificar(obj, indentar=bool(kwargs.get("indent"))).decode("utf-8")
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indentar = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self._codificar(obj, indentar) + b"\n", mimetype=self.mimetype)
+
+# Usar orjson para las respuestas JSON de la aplicación si está instalado
+def instalar_json(app):
+    if orjson is not None:
+        app.json = ProveedorJSONRapido(app)
@@ -0,0 +1,170 @@
+import queue
+import threading
+from datetime import datetime
+from models import db
+from models.product import Producto
+from models.stock import Stock
+from models.sucursal import Sucursal
+
+# Monitores activos, uno por cada umbral distinto solicitado en /branches/stock-alerts.
+# Un monitor se quita al terminar su hilo (sin suscriptores), por lo que sólo quedan los umbrales en uso.
+_monitores = {}
+_monitores_lock = threading.Lock()
+
+# Monitor de stock bajo compartido por todos los clientes SSE que usan el mismo umbral.
+# Un único hilo consulta la base de datos cada `intervalo` segundos (o antes, si una ruta
+# de escritura de stock lo despierta) y reparte a cada suscriptor sólo los cambios:
+# filas que pasan a estar bajo el umbral (o cambian de cantidad) y filas que se recuperan.
+class MonitorStockBajo:
+    def __init__(self, app, umbral, intervalo):
+        self.app = app
+        self.umbral = umbral
+        self.intervalo = intervalo
+        self._suscriptores = set()
+        self._lock = threading.Lock()
+        self._despertar = threading.Event()
+        self._hilo = None
+        # Alertas vigentes por id de stock; None hasta completar la primera verificación
+        self._estado = None
+
+    # Registrar un suscriptor y devolver la cola por la que recibirá los eventos
+    # (usar suscribir_monitor, que lo hace bajo _monitores_lock)
+    def suscribir(self):
+        cola = queue.Queue()
+        with self._lock:
+            self._suscriptores.add(cola)
+            #Un suscriptor nuevo recibe el estado completo; después sólo recibe cambios
+            if self._estado is not None:
+                for evento in self._eventos_estado_inicial():
+                    cola.put(evento)
+            if self._hilo is None:
+                self._hilo = threading.Thread(
+                    target=self._ejecutar,
+                    name=f"monitor-stock-bajo-{self.umbral}",
+                    daemon=True
+                )
+                self._hilo.start()
+        return cola
+
+    # Quitar un suscriptor; el hilo termina solo cuando ya no quedan suscriptores
+    def cancelar(self, cola):
+        with self._lock:
+            self._suscriptores.discard(cola)
+        self._despertar.set()
+
+    # Forzar una verificación inmediata
+    def despertar(self):
+        self._despertar.set()
+
+    def _ejecutar(self):
+        while True:
+            #Con _monitores_lock tomado ningún cliente puede suscribirse a este monitor mientras se detiene
+            with _monitores_lock, self._lock:
+                if not self._suscriptores:
+                    #Se descarta el estado para que un próximo suscriptor reciba datos frescos
+                    self._hilo = None
+                    self._estado = None
+                    if _monitores.get(self.umbral) is self:
+                        del _monitores[self.umbral]
+                    return
+
+            try:
+                actuales = self._consultar()
+                with self._lock:
+                    eventos = self._diferencias(actuales)
+                    self._estado = actuales
+                    self._publicar(eventos)
+            except Exception as e:
+                with self._lock:
+                    self._publicar([{
+                        "message": "Error en monitoreo",
+                        "error": str(e),
+                        "timestamp": datetime.now().isoformat()
+                    }])
+
+            self._despertar.wait(self.intervalo)
+            self._despertar.clear()
+
+    # Consultar productos con stock bajo en todas las sucursales (una sola consulta para todos los clientes)
+    def _consultar(self):
+        with self.app.app_context():
+            filas = db.session.query(
+                Stock.id, Stock.cantidad, Producto.nombre, Producto.codigo_producto, Sucursal.nombre
+            ).join(
+                Producto, Stock.producto_id == Producto.id
+            ).join(
+                Sucursal, Stock.sucursal_id == Sucursal.id
+            ).filter(Stock.cantidad < self.umbral).all()
+
+        return {
+            stock_id: {
+                "producto": nombre_producto,
+                "codigo": codigo_producto,
+                "sucursal": nombre_sucursal,
+                "cantidad": cantidad
+            }
+            for stock_id, cantidad, nombre_producto, codigo_producto, nombre_sucursal in filas
+        }
+
+    # Comparar con la verificación anterior y generar los eventos a enviar
+    def _diferencias(self, actuales):
+        anteriores = self._estado or {}
+        timestamp = datetime.now().isoformat()
+        eventos = []
+
+        for stock_id, alerta in actuales.items():
+            if anteriores.get(stock_id) != alerta:
+                eventos.append({"message": "Stock Bajo", **alerta, "timestamp": timestamp})
+
+        for stock_id, alerta in anteriores.items():
+            if stock_id not in actuales:
+                eventos.append({
+                    "message": "Stock Recuperado",
+                    "producto": alerta["producto"],
+                    "codigo": alerta["codigo"],
+                    "sucursal": alerta["sucursal"],
+                    "timestamp": timestamp
+                })
+
+        if eventos or self._estado is None:
+            eventos.insert(0, {
+                "type": "info",
+                "message": "Verificación completada",
+                "productos_bajo_stock": len(actuales),
+                "timestamp": timestamp
+            })
+        return eventos
+
+    def _eventos_estado_inicial(self):
+        timestamp = datetime.now().isoformat()
+        eventos = [{
+            "type": "info",
+            "message": "Verificación completada",
+            "productos_bajo_stock": len(self._estado),
+            "timestamp": timestamp
+        }]
+        for alerta in self._estado.values():
+            eventos.append({"message": "Stock Bajo", **alerta, "timestamp": timestamp})
+        return eventos
+
+    def _publicar(self, eventos):
+        for cola in self._suscriptores:
+            for evento in eventos:
+                cola.put(evento)
+
+# Suscribirse al monitor compartido para un umbral (creándolo si no existe); devuelve (monitor, cola)
+def suscribir_monitor(app, umbral, intervalo):
+    with _monitores_lock:
+        monitor = _monitores.get(umbral)
+        if monitor is None:
+            monitor = MonitorStockBajo(app, umbral, intervalo)
+            _monitores[umbral] = monitor
+        return monitor, monitor.suscribir()
+
+# Avisar a los monitores que el stock cambió para que verifiquen sin esperar al siguiente intervalo.
+# Las rutas que modifican stock deben llamarla después de hacer commit.
+def notificar_cambio_stock():
+    with _monitores_lock:
+        monitores = list(_monitores.values())
+    for monitor in monitores:
+        monitor.despertar()
@@ -0,0 +1,202 @@
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import DateTime, Integer, String, and_, column, delete, func, select, table, text, update
+from models import Producto, Stock
+
+logger = logging.getLogger("ferremas.stock")
+
+# Libro de movimientos de stock y sus saldos compactados (ver migrations/v007_movimientos_stock.py)
+movimientos_stock = table(
+    "movimientos_stock",
+    column("id", Integer),
+    column("sucursal_id", Integer),
+    column("producto_id", Integer),
+    column("codigo_producto", String),
+    column("cantidad", Integer),
+    column("fecha", DateTime),
+)
+marcas_stock = table("marcas_stock", column("clave", String), column("movimiento", Integer))
+
+# Versión (tabla versiones, ver migrations/v004_versiones.py) de la que depende el ETag de /branches/<id>/stock/changes
+# además del stock: cambia cuando el mantenimiento agrega ajustes o compacta movimientos
+CLAVE_VERSION = "movimientos_stock"
+
+_incrementar_version = text("""
+    INSERT INTO versiones (clave, version) VALUES (:clave, 1)
+    ON CONFLICT (clave) DO UPDATE SET version = version + 1
+""")
+
+def marca(sesion, clave):
+    return sesion.scalar(select(marcas_stock.c.movimiento).where(marcas_stock.c.clave == clave)) or 0
+
+# Último movimiento registrado: cursor a partir del cual un cliente que acaba de leer el stock pide cambios.
+# Si todos los movimientos se compactaron, el último es el de la marca 'compactado'.
+def ultimo_movimiento(sesion):
+    return max(sesion.scalar(select(func.max(movimientos_stock.c.id))) or 0, marca(sesion, "compactado"))
+
+# Productos de una sucursal con movimientos posteriores a `desde` (como máximo `limite`), en el orden de su
+# último movimiento, con la cantidad vigente (NULL si la fila de stock ya no existe)
+def consulta_cambios_stock(sucursal_id, desde, limite):
+    ultimos = select(
+        movimientos_stock.c.producto_id, func.max(movimientos_stock.c.id).label("movimiento")
+    ).where(
+        movimientos_stock.c.sucursal_id == sucursal_id,
+        movimientos_stock.c.id > desde
+    ).group_by(movimientos_stock.c.producto_id).order_by(func.max(movimientos_stock.c.id)).limit(limite).subquery()
+
+    return select(
+        ultimos.c.movimiento,
+        func.coalesce(Producto.codigo_producto, movimientos_stock.c.codigo_producto),
+        Stock.cantidad
+    ).select_from(ultimos).join(
+        movimientos_stock, movimientos_stock.c.id == ultimos.c.movimiento
+    ).outerjoin(
+        Producto, Producto.id == ultimos.c.producto_id
+    ).outerjoin(
+        Stock, and_(Stock.sucursal_id == sucursal_id, Stock.producto_id == ultimos.c.producto_id)
+    ).order_by(ultimos.c.movimiento)
+
+# Stock vigente de toda la sucursal (sincronización inicial)
+def consulta_stock_actual(sucursal_id):
+    return select(Producto.codigo_producto, Stock.cantidad).join(
+        Producto, Producto.id == Stock.producto_id
+    ).where(Stock.sucursal_id == sucursal_id).order_by(Stock.id)
+
+# Avanzar una marca de `actual` a `nueva` sólo si nadie la movió antes (dos tareas simultáneas no procesan
+# los mismos movimientos). Al ser una escritura, además abre la transacción antes de leer los movimientos.
+def _tomar_marca(sesion, clave, actual, nueva):
+    return sesion.execute(
+        update(marcas_stock).where(marcas_stock.c.clave == clave, marcas_stock.c.movimiento == actual)
+        .values(movimiento=nueva)
+    ).rowcount == 1
+
+# Filas de stock que se verifican: las que tienen movimientos nuevos (posteriores a la última conciliación) y las
+# que se están compactando, o todas (también las que no tuvieron movimientos) en una verificación completa
+_PARES_NUEVOS = """
+    SELECT DISTINCT sucursal_id, producto_id FROM movimientos_stock
+    WHERE id > :conciliado OR (id > :compactado AND id <= :hasta)
+"""
+_PARES_TODOS = """
+    SELECT sucursal_id, producto_id FROM stock
+    UNION SELECT sucursal_id, producto_id FROM saldos_stock
+    UNION SELECT sucursal_id, producto_id FROM movimientos_stock
+"""
+
+# Cantidad según el libro (saldo compactado + movimientos que quedan sin compactar, posteriores a :hasta)
+# comparada con la cantidad vigente. Se ejecuta después de acumular en saldos_stock los movimientos hasta :hasta
+# y antes de borrarlos, por lo que verifica el resultado de la compactación.
+def _consulta_diferencias(pares):
+    return text(f"""
+        SELECT sucursal_id, producto_id, libro, actual FROM (
+            SELECT t.sucursal_id, t.producto_id, COALESCE(s.cantidad, 0) AS actual,
+                   COALESCE(b.cantidad, 0) + COALESCE((
+                       SELECT SUM(m.cantidad) FROM movimientos_stock m
+                       WHERE m.sucursal_id = t.sucursal_id AND m.producto_id = t.producto_id AND m.id > :hasta
+                   ), 0) AS libro
+            FROM ({pares}) t
+            LEFT JOIN stock s ON s.sucursal_id = t.sucursal_id AND s.producto_id = t.producto_id
+            LEFT JOIN saldos_stock b ON b.sucursal_id = t.sucursal_id AND b.producto_id = t.producto_id
+        )
+        WHERE libro != actual
+    """)
+
+_insertar_ajuste = text("""
+    INSERT INTO movimientos_stock (sucursal_id, producto_id, codigo_producto, cantidad, fecha)
+    VALUES (:sucursal_id, :producto_id,
+            COALESCE((SELECT codigo_producto FROM productos WHERE id = :producto_id), ''),
+            :cantidad, CURRENT_TIMESTAMP)
+""")
+
+# Conciliación: verifica que saldos_stock más los movimientos sin compactar coincidan con la tabla stock.
+# Los movimientos se escriben con triggers sobre stock, por lo que las escrituras normales (API, gRPC, SQL)
+# no producen diferencias: sólo aparecen si la tabla stock se modifica sin los triggers (por ejemplo al
+# restaurar un respaldo de la tabla o con los triggers eliminados), si se modifican a mano las tablas del
+# libro o si la compactación acumula mal los saldos. Por eso se ejecuta después de acumular los saldos y cubre
+# las filas compactadas; las filas sin movimientos sólo se verifican con `completa`.
+# Cada diferencia se registra en el log y se corrige agregando un movimiento de ajuste (la cantidad de stock es
+# la vigente). Devuelve la lista de diferencias (sucursal_id, producto_id, cantidad según el libro, cantidad
+# en stock). No hace commit.
+def conciliar_stock(sesion, conciliado, compactado, hasta, completa=False):
+    consulta = _consulta_diferencias(_PARES_TODOS if completa else _PARES_NUEVOS)
+    diferencias = []
+    for fila in sesion.execute(consulta, {"conciliado": conciliado, "compactado": compactado, "hasta": hasta}):
+        logger.warning(
+            "Stock de la sucursal %s, producto %s: %s según los movimientos y %s en stock",
+            fila.sucursal_id, fila.producto_id, fila.libro, fila.actual
+        )
+        diferencias.append((fila.sucursal_id, fila.producto_id, fila.libro, fila.actual))
+    if diferencias:
+        sesion.execute(_insertar_ajuste, [
+            {"sucursal_id": sucursal_id, "producto_id": producto_id, "cantidad": actual - libro}
+            for sucursal_id, producto_id, libro, actual in diferencias
+        ])
+    return diferencias
+
+_acumular_saldos = text("""
+    INSERT INTO saldos_stock (sucursal_id, producto_id, cantidad)
+    SELECT sucursal_id, producto_id, SUM(cantidad) FROM movimientos_stock
+    WHERE id > :compactado AND id <= :hasta
+    GROUP BY sucursal_id, producto_id
+    ON CONFLICT (sucursal_id, producto_id) DO UPDATE SET cantidad = saldos_stock.cantidad + excluded.cantidad
+""")
+
+# Saldos en cero de filas de stock que ya no existen (producto eliminado), entre las filas compactadas
+_borrar_saldos_vacios = text("""
+    DELETE FROM saldos_stock
+    WHERE cantidad = 0
+      AND (sucursal_id, producto_id) IN (
+          SELECT sucursal_id, producto_id FROM movimientos_stock WHERE id > :compactado AND id <= :hasta
+      )
+      AND NOT EXISTS (
+          SELECT 1 FROM stock s WHERE s.sucursal_id = saldos_stock.sucursal_id AND s.producto_id = saldos_stock.producto_id
+      )
+""")
+
+# Último movimiento a compactar: el anterior al primero registrado desde `antes_de` (UTC). Los movimientos
+# tienen fecha creciente con el id, por lo que sólo se recorren los que se compactan.
+def _limite_compactacion(sesion, compactado, antes_de, ultimo):
+    primero_vigente = sesion.scalar(
+        select(movimientos_stock.c.id).where(
+            movimientos_stock.c.id > compactado, movimientos_stock.c.fecha >= antes_de
+        ).order_by(movimientos_stock.c.id).limit(1)
+    )
+    return max(primero_vigente - 1 if primero_vigente is not None else ultimo, compactado)
+
+# Tarea periódica (python manage.py compactar-stock), en una sola transacción:
+# 1. acumula en saldos_stock los movimientos con más de `horas_retencion` horas,
+# 2. concilia saldos y movimientos con la tabla stock (conciliar_stock), incluidas las filas compactadas,
+# 3. borra los movimientos compactados.
+# Con `completa` la conciliación verifica todas las filas de stock. Devuelve las diferencias corregidas y la
+# cantidad de movimientos compactados.
+def mantener_libro_stock(sesion, horas_retencion, completa=False):
+    try:
+        compactado = marca(sesion, "compactado")
+        conciliado = marca(sesion, "conciliado")
+        ultimo = ultimo_movimiento(sesion)
+        hasta = _limite_compactacion(sesion, compactado, datetime.utcnow() - timedelta(hours=horas_retencion), ultimo)
+        if hasta == compactado and ultimo == conciliado and not completa:
+            return [], 0
+        if not (_tomar_marca(sesion, "compactado", compactado, hasta)
+                and _tomar_marca(sesion, "conciliado", conciliado, ultimo)):
+            #Otra tarea procesó los mismos movimientos
+            sesion.rollback()
+            return [], 0
+
+        parametros = {"compactado": compactado, "hasta": hasta}
+        if hasta > compactado:
+            sesion.execute(_acumular_saldos, parametros)
+        diferencias = conciliar_stock(sesion, conciliado, compactado, hasta, completa)
+        compactados = 0
+        if hasta > compactado:
+            sesion.execute(_borrar_saldos_vacios, parametros)
+            compactados = sesion.execute(
+                delete(movimientos_stock).where(movimientos_stock.c.id > compactado, movimientos_stock.c.id <= hasta)
+            ).rowcount
+
+        if diferencias or compactados:
+            sesion.execute(_incrementar_version, {"clave": CLAVE_VERSION})
+        sesion.commit()
+    except Exception:
+        sesion.rollback()
+        raise
+    return diferencias, compactados
@@ -0,0 +1,77 @@
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models import Producto, Stock
+from utils import en_lotes
+
+# Sentencias de stock compartidas por la API (routes/branches.py) y los servidores gRPC.
+# Las modificaciones las calcula SQLite sobre el valor actual de la fila (cantidad = cantidad ± n),
+# sin cargarla antes, por lo que las escrituras simultáneas no pierden actualizaciones.
+
+_stock = Stock.__table__
+
+# Suma de stock (POST /stock/add, destino de una transferencia): crea la fila o incrementa la existente
+# con un único INSERT ... ON CONFLICT DO UPDATE. Se ejecuta con una lista de filas
+# {"producto_id", "sucursal_id", "cantidad"}.
+SUMA_STOCK = sqlite_insert(_stock)
+SUMA_STOCK = SUMA_STOCK.on_conflict_do_update(
+    index_elements=[_stock.c.producto_id, _stock.c.sucursal_id],
+    set_={"cantidad": _stock.c.cantidad + SUMA_STOCK.excluded.cantidad}
+)
+
+# Descuento condicional (ventas, origen de una transferencia): sólo modifica la fila si alcanza el stock,
+# y devuelve la cantidad restante. Si no alcanza (o no hay fila) no devuelve nada y no cambia nada.
+# Parámetros: producto, sucursal y unidades.
+DESCUENTO_STOCK = update(_stock).where(
+    _stock.c.producto_id == bindparam("producto"),
+    _stock.c.sucursal_id == bindparam("sucursal"),
+    _stock.c.cantidad >= bindparam("unidades")
+).values(cantidad=_stock.c.cantidad - bindparam("unidades")).returning(_stock.c.cantidad)
+
+# Ids de los productos con esos códigos
+def consulta_ids_productos(codigos):
+    return select(Producto.codigo_producto, Producto.id).where(Producto.codigo_producto.in_(codigos))
+
+# Resolver los ids de los productos con consultas IN (una por lote).
+# Devuelve los ids por código y la lista de códigos que no existen.
+def ids_productos(sesion, codigos):
+    productos = {}
+    for lote in en_lotes(codigos):
+        productos.update(sesion.execute(consulta_ids_productos(lote)).all())
+    return productos, [codigo for codigo in codigos if codigo not in productos]
+
+# Cantidades actuales de esos productos en una sucursal
+def consulta_cantidades(sucursal_id, producto_ids):
+    return select(_stock.c.producto_id, _stock.c.cantidad).where(
+        _stock.c.sucursal_id == sucursal_id,
+        _stock.c.producto_id.in_(producto_ids)
+    )
+
+def parametros_suma(sucursal_id, productos, cantidades):
+    return [
+        {"producto_id": productos[codigo], "sucursal_id": sucursal_id, "cantidad": cantidad}
+        for codigo, cantidad in cantidades.items()
+    ]
+
+def parametros_descuento(sucursal_id, producto_id, cantidad):
+    return {"producto": producto_id, "sucursal": sucursal_id, "unidades": cantidad}
+
+# Descontar `cantidades` (por código) del stock de una sucursal dentro de la transacción de `sesion`.
+# `productos` relaciona cada código con su id. Devuelve las cantidades restantes por código y la lista
+# de códigos sin stock suficiente; si esta no está vacía, quien llama debe deshacer la transacción.
+def descontar_stock(sesion, sucursal_id, productos, cantidades):
+    restantes = {}
+    insuficientes = []
+    for codigo, cantidad in cantidades.items():
+        restante = sesion.execute(
+            DESCUENTO_STOCK, parametros_descuento(sucursal_id, productos[codigo], cantidad)
+        ).scalar()
+        if restante is None:
+            insuficientes.append(codigo)
+        else:
+            restantes[codigo] = restante
+    return restantes, insuficientes
+
+# Cantidades actuales por código (0 si el producto no tiene stock en la sucursal)
+def cantidades_por_codigo(sesion, sucursal_id, productos, codigos):
+    actuales = dict(sesion.execute(consulta_cantidades(sucursal_id, [productos[codigo] for codigo in codigos])).all())
+    return {codigo: actuales.get(productos[codigo], 0) for codigo in codigos}
@@ -0,0 +1,68 @@
+import hashlib
+from functools import wraps
+from flask import current_app, make_response, request
+from sqlalchemy import bindparam, text
+from models import db
+from services.serializers import acepta_protobuf
+
+# Sufijos que services/compression.py agrega al ETag de las respuestas comprimidas
+SUFIJOS_CODIFICACION = ("-gzip", "-br")
+
+_consulta_versiones = text(
+    "SELECT clave, version FROM versiones WHERE clave IN :claves"
+).bindparams(bindparam("claves", expanding=True))
+
+# Obtener los contadores de versión (mantenidos por triggers, ver migrations/v004_versiones.py)
+def obtener_versiones(claves):
+    versiones = dict.fromkeys(claves, 0)
+    versiones.update(db.session.execute(_consulta_versiones, {"claves": list(claves)}).all())
+    return versiones
+
+# Versión de una clave para la petición en curso: la misma que usó su ETag si ya se calculó
+# (así la caché de productos usa exactamente la versión que describe el ETag)
+def version_de(clave):
+    versiones = getattr(request, "versiones", {})
+    if clave in versiones:
+        return versiones[clave]
+    return obtener_versiones([clave])[clave]
+
+# ETag de la petición en curso: depende de la ruta, los parámetros y las versiones de las claves
+# y, si el cliente pide protobuf (ver services/serializers.py), del formato de la respuesta.
+# Las versiones leídas quedan en la petición (ver version_de).
+def calcular_etag(claves):
+    versiones = obtener_versiones(claves)
+    request.versiones = versiones
+    firma = "|".join([request.full_path] + [f"{clave}={versiones[clave]}" for clave in claves])
+    if acepta_protobuf():
+        firma += "|protobuf"
+    return hashlib.sha1(firma.encode("utf-8")).hexdigest()[:24]
+
+# Decorador de GET condicional: si el If-None-Match del cliente coincide con el ETag calculado a
+# partir de los contadores de versión, responde 304 sin ejecutar la ruta. Si no, ejecuta la ruta
+# y agrega el ETag a la respuesta. `claves` recibe los argumentos de la ruta y devuelve la lista
+# de claves de versión de las que depende la respuesta.
+def con_etag(claves):
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(*args, **kwargs):
+            etag = calcular_etag(claves(**kwargs))
+
+            for recibido in request.if_none_match.as_set():
+                if _sin_sufijo(recibido) == etag:
+                    respuesta = current_app.response_class(status=304)
+                    respuesta.set_etag(recibido)
+                    respuesta.vary.add("Accept-Encoding")
+                    return respuesta
+
+            respuesta = make_response(vista(*args, **kwargs))
+            if respuesta.status_code == 200:
+                respuesta.set_etag(etag)
+            return respuesta
+        return envoltura
+    return decorador
+
+def _sin_sufijo(etag):
+    for sufijo in SUFIJOS_CODIFICACION:
+        if etag.endswith(sufijo):
+            return etag[:-len(sufijo)]
+    return etag
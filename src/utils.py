@@ -0,0 +1,45 @@
+import csv
+import io
+import json
+from itertools import groupby
+
+# orjson es opcional: si no está instalado se usa el módulo json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Cantidad máxima de valores por cada consulta IN (SQLite limita los parámetros por sentencia)
+TAMANO_LOTE_SQL = 500
+
+# Divide una secuencia en lotes de tamaño fijo
+def en_lotes(elementos, tamano=TAMANO_LOTE_SQL):
+    elementos = list(elementos)
+    for inicio in range(0, len(elementos), tamano):
+        yield elementos[inicio:inicio + tamano]
+
+# Convierte parámetros de consulta como ?disponible=true en booleanos
+def es_verdadero(valor):
+    return valor.lower() in ("1", "true", "si", "sí")
+
+# Serializar una fila CSV (con su salto de línea) para respuestas en streaming
+def linea_csv(valores):
+    salida = io.StringIO()
+    csv.writer(salida, lineterminator="\n").writerow(valores)
+    return salida.getvalue()
+
+# Serializar un objeto como una línea NDJSON
+def linea_ndjson(objeto):
+    if orjson is not None:
+        return orjson.dumps(objeto, option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS).decode("utf-8")
+    return json.dumps(objeto, ensure_ascii=False) + "\n"
+
+# Agrupar filas consecutivas con la misma clave (las filas deben venir ordenadas por esa clave)
+def agrupar_consecutivas(filas, clave):
+    return ((valor, list(grupo)) for valor, grupo in groupby(filas, key=clave))
+
+# Tipo de contenido de cada formato de exportación
+TIPOS_EXPORTACION = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}